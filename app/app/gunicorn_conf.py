@@ -0,0 +1,105 @@
+"""Gunicorn config of production server
+
+    gunicorn -c python:app.gunicorn_conf
+
+App is preloaded in the master, so forked workers share its memory
+copy-on-write, and workers are recycled after a number of requests to
+bound memory growth. Every setting can be overridden from environment.
+"""
+import os
+import shutil
+import tempfile
+from gunicorn.workers.gthread import ThreadWorker
+
+
+def get_cpu_count():
+    """Return number of CPUs this process may run on"""
+    try:
+        # Respects CPU sets of containers, unlike os.cpu_count()
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+
+def get_workers(cpu_count):
+    # Requests mostly wait on the database, threads cover the rest
+    return int(os.environ.get("WEB_CONCURRENCY", cpu_count + 1))
+
+
+class RecyclingThreadWorker(ThreadWorker):
+    """Thread worker that stops accepting once it's going to be recycled
+
+    Stock worker keeps accepting connections after its last request and
+    drops them on exit, clients get an empty reply. Left in the listen
+    queue they're accepted by other workers instead.
+    """
+
+    def accept(self, server, listener):
+        if self.alive:
+            super().accept(server, listener)
+
+
+def reset_multiproc_dir(path):
+    """Remove metrics of workers of a previous run"""
+    shutil.rmtree(path, ignore_errors=True)
+    os.makedirs(path)
+
+
+wsgi_app = "app.wsgi:application"
+bind = os.environ.get("GUNICORN_BIND", "0.0.0.0:8000")
+workers = get_workers(get_cpu_count())
+threads = int(os.environ.get("GUNICORN_THREADS", 4))
+worker_class = RecyclingThreadWorker if threads > 1 else "sync"
+preload_app = True
+max_requests = int(os.environ.get("GUNICORN_MAX_REQUESTS", 1000))
+# Keeps workers started together from restarting at the same time
+max_requests_jitter = int(os.environ.get("GUNICORN_MAX_REQUESTS_JITTER", 100))
+timeout = int(os.environ.get("GUNICORN_TIMEOUT", 30))
+# Time for in-flight requests to finish after SIGTERM, keep it below
+# the grace period of the container runtime (10s for docker stop)
+graceful_timeout = int(os.environ.get("GUNICORN_GRACEFUL_TIMEOUT", 8))
+keepalive = int(os.environ.get("GUNICORN_KEEPALIVE", 5))
+# Heartbeat and metrics files on a disk backed /tmp can block workers
+worker_tmp_dir = "/dev/shm" if os.path.isdir("/dev/shm") else tempfile.gettempdir()
+# Built-in worker stats (requests, workers, latency) are sent if set
+statsd_host = os.environ.get("GUNICORN_STATSD_HOST") or None
+statsd_prefix = "recipe-app-api"
+
+# Must be set before the preloaded app imports prometheus_client
+multiproc_dir = os.environ.setdefault(
+    "PROMETHEUS_MULTIPROC_DIR", os.path.join(worker_tmp_dir, "prometheus")
+)
+reset_multiproc_dir(multiproc_dir)
+
+
+def when_ready(server):
+    from django.urls import reverse
+    from prometheus_client import multiprocess
+    from core import schema
+
+    # URLconf, and so every view, is otherwise imported by each worker on
+    # its first request, again after every recycle
+    reverse("healthz")
+    schema.get_schema()
+    # Preloading the app created gauges of the master, which serves nothing
+    multiprocess.mark_process_dead(os.getpid())
+
+
+def post_fork(server, worker):
+    from core import metrics
+
+    metrics.WORKER_STARTED.set_to_current_time()
+
+
+def post_request(worker, req, environ, resp):
+    from core import metrics
+
+    metrics.WORKER_REQUESTS.set(worker.nr)
+
+
+def child_exit(server, worker):
+    from core import metrics
+    from prometheus_client import multiprocess
+
+    metrics.WORKER_EXITS.inc()
+    multiprocess.mark_process_dead(worker.pid)
@@ -12,6 +12,7 @@ https://docs.djangoproject.com/en/4.2/ref/settings/
 
 from pathlib import Path
 import os
+from django.core.exceptions import ImproperlyConfigured
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -20,13 +21,20 @@ BASE_DIR = Path(__file__).resolve().parent.parent
 # Quick-start development settings - unsuitable for production
 # See https://docs.djangoproject.com/en/4.2/howto/deployment/checklist/
 
-# SECURITY WARNING: keep the secret key used in production secret!
-SECRET_KEY = "django-insecure-n^blq-3klrzs^_nw(a*6%et5cq3f9&!q55c-djy&x*hudbszy("
-
 # SECURITY WARNING: don't run with debug turned on in production!
-DEBUG = True
+DEBUG = os.environ.get("DEBUG", "false") == "true"
+
+# SECURITY WARNING: keep the secret key used in production secret!
+SECRET_KEY = os.environ.get("SECRET_KEY", "")
+if not SECRET_KEY:
+    if not DEBUG:
+        raise ImproperlyConfigured("SECRET_KEY must be set when DEBUG is off")
+    SECRET_KEY = "django-insecure-n^blq-3klrzs^_nw(a*6%et5cq3f9&!q55c-djy&x*hudbszy("
 
-ALLOWED_HOSTS = []
+# Comma separated, localhost is allowed in debug mode when it's empty
+ALLOWED_HOSTS = list(filter(None, os.environ.get("ALLOWED_HOSTS", "").split(",")))
+# Orchestrators probe pods by IP address, these paths don't validate Host
+HEALTH_CHECK_PATHS = ["/healthz", "/readyz"]
 
 
 # Application definition
@@ -47,14 +55,31 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    "core.middleware.MetricsMiddleware",
+    "core.middleware.CompressionMiddleware",
+    "core.middleware.ProfilerMiddleware",
+    "core.middleware.TracingMiddleware",
+    "core.middleware.AccessLogMiddleware",
+    "core.middleware.ConcurrencyLimitMiddleware",
     "django.middleware.security.SecurityMiddleware",
-    "django.contrib.sessions.middleware.SessionMiddleware",
-    "django.middleware.common.CommonMiddleware",
-    "django.middleware.csrf.CsrfViewMiddleware",
-    "django.contrib.auth.middleware.AuthenticationMiddleware",
-    "django.contrib.messages.middleware.MessageMiddleware",
+    "core.middleware.LeanSessionMiddleware",
+    "core.middleware.ProbeCommonMiddleware",
+    "core.middleware.LeanCsrfViewMiddleware",
+    "core.middleware.LeanAuthenticationMiddleware",
+    "core.middleware.LeanMessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
+    "core.middleware.ReplicaRoutingMiddleware",
+    "core.middleware.NPlusOneMiddleware",
+    "core.middleware.DeadlineMiddleware",
 ]
+# Token authenticated API and health probes don't use sessions, CSRF or
+# messages, so their middleware only runs outside these paths (e.g. admin)
+LEAN_MIDDLEWARE_PATHS = list(
+    filter(
+        None,
+        os.environ.get("LEAN_MIDDLEWARE_PATHS", "/api/,/healthz,/readyz").split(","),
+    )
+)
 
 ROOT_URLCONF = "app.urls"
 
@@ -87,9 +112,71 @@ DATABASES = {
         "NAME": os.environ.get("DB_NAME"),
         "USER": os.environ.get("DB_USER"),
         "PASSWORD": os.environ.get("DB_PASS"),
+        # Keep connection open between requests for this many seconds
+        "CONN_MAX_AGE": int(os.environ.get("DB_CONN_MAX_AGE", 60)),
+        # Check persistent connection is alive before reusing it
+        "CONN_HEALTH_CHECKS": os.environ.get("DB_CONN_HEALTH_CHECKS", "true") == "true",
     }
 }
 
+# Share connections between threads of a worker through a client-side pool
+if os.environ.get("DB_POOL", "false") == "true":
+    DATABASES["default"].update(
+        {
+            "ENGINE": "core.db.backends.postgresql",
+            # Connections go back to the pool after each request
+            "CONN_MAX_AGE": 0,
+            "OPTIONS": {
+                "pool": {
+                    "max_size": int(os.environ.get("DB_POOL_MAX_SIZE", 10)),
+                    "timeout": float(os.environ.get("DB_POOL_TIMEOUT", 30)),
+                    "max_lifetime": float(os.environ.get("DB_POOL_MAX_LIFETIME", 1800)),
+                    "health_check_interval": float(
+                        os.environ.get("DB_POOL_HEALTH_CHECK_INTERVAL", 10)
+                    ),
+                },
+            },
+        }
+    )
+
+# Read replicas of default database, comma separated hosts
+DATABASE_REPLICAS = []
+for index, host in enumerate(
+    filter(None, os.environ.get("DB_REPLICA_HOSTS", "").split(",")), start=1
+):
+    alias = f"replica_{index}"
+    DATABASES[alias] = {
+        **DATABASES["default"],
+        "HOST": host.strip(),
+        "TEST": {"MIRROR": "default"},
+    }
+    DATABASE_REPLICAS.append(alias)
+
+DATABASE_ROUTERS = ["core.db.routers.PrimaryReplicaRouter"]
+# Reads of a client go to primary for this many seconds after its write
+DATABASE_REPLICA_PIN_SECONDS = int(os.environ.get("DB_REPLICA_PIN_SECONDS", 5))
+# Failed replica is not used for this many seconds
+DATABASE_REPLICA_RETRY_SECONDS = int(os.environ.get("DB_REPLICA_RETRY_SECONDS", 30))
+
+
+# Cache
+# https://docs.djangoproject.com/en/4.2/topics/cache/
+
+# Shared between workers when Redis is configured, per process otherwise
+if os.environ.get("REDIS_URL"):
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.redis.RedisCache",
+            "LOCATION": os.environ.get("REDIS_URL"),
+        }
+    }
+else:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        }
+    }
+
 
 # Password validation
 # https://docs.djangoproject.com/en/4.2/ref/settings/#auth-password-validators
@@ -140,9 +227,173 @@ AUTH_USER_MODEL = "core.User"
 
 REST_FRAMEWORK = {
     "DEFAULT_SCHEMA_CLASS": "drf_spectacular.openapi.AutoSchema",
+    # JSON first so it stays default for clients not asking for a format
+    "DEFAULT_RENDERER_CLASSES": [
+        "core.renderers.ORJSONRenderer",
+        "core.renderers.MessagePackRenderer",
+    ],
+    "DEFAULT_PARSER_CLASSES": [
+        "core.parsers.ORJSONParser",
+        "core.parsers.MessagePackParser",
+        "rest_framework.parsers.FormParser",
+        "rest_framework.parsers.MultiPartParser",
+    ],
+    "DEFAULT_THROTTLE_CLASSES": [
+        "core.throttling.ReadThrottle",
+        "core.throttling.WriteThrottle",
+    ],
+    # Burst size and average rate of every client, empty value disables
+    "DEFAULT_THROTTLE_RATES": {
+        "login": os.environ.get("THROTTLE_RATE_LOGIN", "10/min") or None,
+        "upload": os.environ.get("THROTTLE_RATE_UPLOAD", "30/min") or None,
+        "write": os.environ.get("THROTTLE_RATE_WRITE", "120/min") or None,
+        "read": os.environ.get("THROTTLE_RATE_READ", "600/min") or None,
+    },
+    # Proxies in front of the app, client IP is taken from X-Forwarded-For
+    "NUM_PROXIES": int(os.environ.get("NUM_PROXIES", 0)),
 }
+# Browsable API renders HTML templates, so it's only for development
+BROWSABLE_API = os.environ.get("BROWSABLE_API", str(DEBUG).lower()) == "true"
+if BROWSABLE_API:
+    REST_FRAMEWORK["DEFAULT_RENDERER_CLASSES"].append(
+        "rest_framework.renderers.BrowsableAPIRenderer"
+    )
 
 SPECTACULAR_SETTINGS = {
     # This lets to use file input in swagger
     "COMPONENT_SPLIT_REQUEST": True,
 }
+# Built by `manage.py build_schema`, served at /api/schema/
+OPENAPI_SCHEMA_PATH = BASE_DIR / "app" / "openapi.json"
+
+# Token Prometheus must send to read /api/metrics. Without it the endpoint
+# is only served with DEBUG
+METRICS_TOKEN = os.environ.get("METRICS_TOKEN", "")
+
+# Adaptive limit of concurrent requests of every worker, see core.concurrency
+CONCURRENCY_LIMIT = os.environ.get("CONCURRENCY_LIMIT", "true") == "true"
+# A gunicorn worker runs at most GUNICORN_THREADS requests at once, a
+# higher limit would never be reached. Raise it when serving over ASGI
+CONCURRENCY_LIMIT_MAX = int(
+    os.environ.get("CONCURRENCY_LIMIT_MAX", os.environ.get("GUNICORN_THREADS", 4))
+)
+CONCURRENCY_LIMIT_INITIAL = int(
+    os.environ.get("CONCURRENCY_LIMIT_INITIAL", CONCURRENCY_LIMIT_MAX)
+)
+CONCURRENCY_LIMIT_MIN = int(
+    os.environ.get("CONCURRENCY_LIMIT_MIN", min(2, CONCURRENCY_LIMIT_MAX))
+)
+# Slower requests (in seconds) shrink the limit
+CONCURRENCY_LATENCY_TARGET = float(os.environ.get("CONCURRENCY_LATENCY_TARGET", 1))
+CONCURRENCY_BACKOFF_RATIO = float(os.environ.get("CONCURRENCY_BACKOFF_RATIO", 0.9))
+# Priority of routes, optionally of one method, others are "normal"
+CONCURRENCY_PRIORITIES = {
+    "healthz": "critical",
+    "metrics": "critical",
+    "readyz": "high",
+    "GET user:me": "high",
+    "POST recipe:recipe-upload-image": "low",
+    "POST recipe:recipe-upload-images": "low",
+}
+
+# Seconds a request has for its database work, statements still running at
+# the deadline are canceled and request gets 504. 0 means no deadline
+REQUEST_DEADLINE = float(os.environ.get("REQUEST_DEADLINE", 10))
+# Deadlines of routes, optionally of one method, see REQUEST_DEADLINE
+REQUEST_DEADLINES = {
+    "readyz": 2,
+    "GET user:me": 2,
+}
+
+# Queries slower than this are logged and shown at /admin/slow-queries/
+SLOW_QUERY_THRESHOLD_MS = float(os.environ.get("SLOW_QUERY_THRESHOLD_MS", 200))
+# Share of slow queries to get EXPLAIN (ANALYZE, BUFFERS) plan for
+SLOW_QUERY_EXPLAIN_SAMPLE_RATE = float(
+    os.environ.get("SLOW_QUERY_EXPLAIN_SAMPLE_RATE", 0.1)
+)
+# Number of latest slow queries each worker keeps
+SLOW_QUERY_BUFFER_SIZE = int(os.environ.get("SLOW_QUERY_BUFFER_SIZE", 500))
+
+# Report requests running same statement more than NPLUSONE_THRESHOLD times
+# with different parameters. Test runner turns reports into errors
+NPLUSONE_DETECTION = os.environ.get("NPLUSONE_DETECTION", str(DEBUG).lower()) == "true"
+NPLUSONE_THRESHOLD = int(os.environ.get("NPLUSONE_THRESHOLD", 5))
+NPLUSONE_RAISE = False
+
+# Share of requests to profile, plus any request sending
+# `X-Profile-Token: <PROFILER_TOKEN>`. Profiler is off when both are empty
+PROFILER_SAMPLE_RATE = float(os.environ.get("PROFILER_SAMPLE_RATE", 0))
+PROFILER_TOKEN = os.environ.get("PROFILER_TOKEN", "")
+PROFILER_INTERVAL = float(os.environ.get("PROFILER_INTERVAL", 0.005))
+PROFILER_DIR = os.environ.get("PROFILER_DIR", "/tmp/profiles")
+PROFILER_MAX_FILES = int(os.environ.get("PROFILER_MAX_FILES", 200))
+
+# Frames kept per allocation traced by tracemalloc, turned on from
+# /admin/memory/. Snapshots are dumped to MEMORY_SNAPSHOT_DIR
+TRACEMALLOC_FRAMES = int(os.environ.get("TRACEMALLOC_FRAMES", 10))
+MEMORY_SNAPSHOT_DIR = os.environ.get("MEMORY_SNAPSHOT_DIR", "/tmp/memory-snapshots")
+MEMORY_SNAPSHOT_MAX_FILES = int(os.environ.get("MEMORY_SNAPSHOT_MAX_FILES", 10))
+
+# Share of requests to trace, spans are exported to TRACING_FILE as JSON
+# lines ("file") or to OTLP/HTTP collector ("otlp"). Empty turns tracing off
+TRACING_EXPORTER = os.environ.get("TRACING_EXPORTER", "")
+TRACING_SAMPLE_RATE = float(os.environ.get("TRACING_SAMPLE_RATE", 0.01))
+TRACING_FILE = os.environ.get("TRACING_FILE", "/tmp/traces.jsonl")
+TRACING_OTLP_ENDPOINT = os.environ.get(
+    "TRACING_OTLP_ENDPOINT", "http://localhost:4318/v1/traces"
+)
+# Traces waiting for export, more are dropped instead of slowing requests
+TRACING_QUEUE_SIZE = int(os.environ.get("TRACING_QUEUE_SIZE", 1000))
+
+# JSON access log of every request, written by a background thread to
+# ACCESS_LOG_FILE or standard output
+ACCESS_LOG = os.environ.get("ACCESS_LOG", "true") == "true"
+
+LOGGING = {
+    "version": 1,
+    "disable_existing_loggers": False,
+    "formatters": {
+        "json": {"()": "core.access_log.JSONFormatter"},
+    },
+    "handlers": {
+        "access": {
+            "class": "core.access_log.NonBlockingQueueHandler",
+            "formatter": "json",
+            "queue_size": int(os.environ.get("ACCESS_LOG_QUEUE_SIZE", 10000)),
+            "filename": os.environ.get("ACCESS_LOG_FILE"),
+        },
+        "json_console": {
+            "class": "logging.StreamHandler",
+            "formatter": "json",
+        },
+    },
+    "loggers": {
+        # Entries carry fingerprint, origin and plan of the query
+        "core.db.slow_queries": {
+            "handlers": ["json_console"],
+            "level": "INFO",
+            "propagate": False,
+        },
+        "core.access": {
+            "handlers": ["access"],
+            "level": "INFO",
+            "propagate": False,
+        },
+    },
+}
+
+# Responses smaller than this aren't worth compressing
+COMPRESSION_MIN_SIZE = int(os.environ.get("COMPRESSION_MIN_SIZE", 1024))
+# Levels by media type. Bodies compressed once and cached can afford
+# slower levels than ones changing on every request
+COMPRESSION_LEVELS = {
+    "default": {"gzip": 6, "br": 5, "zstd": 6},
+    "application/json": {"gzip": 6, "br": 6, "zstd": 9},
+    # Already compact binary format gains less from harder work
+    "application/msgpack": {"gzip": 4, "br": 4, "zstd": 3},
+    "text/plain": {"gzip": 4, "br": 4, "zstd": 3},
+}
+# Compressed bodies kept per worker, keyed by hash of the original body
+COMPRESSION_CACHE_SIZE = int(os.environ.get("COMPRESSION_CACHE_SIZE", 256))
+
+TEST_RUNNER = "core.test_runner.TestRunner"
@@ -18,11 +18,22 @@ from django.contrib import admin
 from django.urls import path, include
 from django.conf import settings
 from django.conf.urls.static import static
-from drf_spectacular.views import SpectacularAPIView, SpectacularSwaggerView
+from drf_spectacular.views import SpectacularSwaggerView
+from core import views as core_views
 
 urlpatterns = [
+    path(
+        "admin/slow-queries/",
+        admin.site.admin_view(core_views.slow_queries_view),
+        name="admin-slow-queries",
+    ),
+    path(
+        "admin/memory/",
+        admin.site.admin_view(core_views.memory_view),
+        name="admin-memory",
+    ),
     path("admin/", admin.site.urls),
-    path("api/schema/", SpectacularAPIView.as_view(), name="api-schema"),
+    path("api/schema/", core_views.schema_view, name="api-schema"),
     path(
         "api/docs/",
         SpectacularSwaggerView.as_view(url_name="api-schema"),
@@ -30,6 +41,9 @@ urlpatterns = [
     ),
     path("api/user/", include("user.urls")),
     path("api/recipe/", include("recipe.urls")),
+    path("api/metrics", core_views.metrics_view, name="metrics"),
+    path("healthz", core_views.healthz_view, name="healthz"),
+    path("readyz", core_views.readyz_view, name="readyz"),
 ]
 
 # Add url to serve media files when debug mode is active
@@ -0,0 +1,97 @@
+"""Structured access log written off the request thread
+
+Records are handed to a background thread through a bounded queue and
+dropped, counted by `access_log_dropped_total`, when the queue is full,
+so slow log storage never adds latency to requests.
+"""
+import json
+import logging
+import os
+import queue
+import sys
+import threading
+from datetime import datetime, timezone
+from core.metrics import ACCESS_LOG_DROPPED
+
+
+class JSONFormatter(logging.Formatter):
+    """Format record as one JSON object per line
+
+    Fields passed as `extra={"fields": {...}}` are merged into the object.
+    """
+
+    def format(self, record):
+        entry = {
+            "time": datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+            **getattr(record, "fields", {}),
+        }
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+class NonBlockingQueueHandler(logging.Handler):
+    """Queue records for a handler running in a background thread
+
+    Writes to `filename` or, by default, standard output. Not a subclass of
+    `logging.handlers.QueueHandler`, which `dictConfig` of Python 3.12+
+    configures by its own rules, rejecting these arguments.
+    """
+
+    def __init__(self, queue_size=10000, filename=None):
+        super().__init__()
+        self.queue = queue.Queue(queue_size)
+        if filename:
+            self.target = logging.FileHandler(filename)
+        else:
+            self.target = logging.StreamHandler(sys.stdout)
+        self.dropped = 0
+        self._thread = None
+        self._pid = None
+
+    def setFormatter(self, fmt):
+        # Formatting is done by the background thread
+        self.target.setFormatter(fmt)
+
+    def emit(self, record):
+        # Thread of a parent process doesn't survive fork
+        if self._pid != os.getpid():
+            self._start_thread()
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+            ACCESS_LOG_DROPPED.inc()
+
+    def _start_thread(self):
+        self._pid = os.getpid()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        while True:
+            record = self.queue.get()
+            try:
+                if record is None:
+                    return
+                self.target.handle(record)
+            finally:
+                self.queue.task_done()
+
+    def flush(self):
+        """Wait until queued records are written"""
+        if self._pid == os.getpid():
+            self.queue.join()
+        self.target.flush()
+
+    def close(self):
+        # Called by logging on interpreter exit
+        if self._pid == os.getpid():
+            self.queue.put(None)
+            self._thread.join()
+            self._pid = None
+        self.target.close()
+        super().close()
@@ -0,0 +1,58 @@
+"""Helpers for native async API views"""
+import functools
+from django.http import JsonResponse
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+
+TOKEN_KEYWORD = "token"
+
+
+async def aauthenticate_token(request):
+    """Return active user owning token from Authorization header or None"""
+    # Same header format as DRF TokenAuthentication: `Token <key>`
+    auth = request.headers.get("Authorization", "").split()
+    if len(auth) != 2 or auth[0].lower() != TOKEN_KEYWORD:
+        return None
+    try:
+        token = await Token.objects.select_related("user").aget(key=auth[1])
+    except Token.DoesNotExist:
+        return None
+    if not token.user.is_active:
+        return None
+    return token.user
+
+
+def async_token_required(view):
+    """Authenticate async view request by token or respond with 401"""
+
+    @functools.wraps(view)
+    async def wrapper(request, *args, **kwargs):
+        user = await aauthenticate_token(request)
+        if user is None:
+            response = JsonResponse(
+                {"detail": "Authentication credentials were not provided."},
+                status=status.HTTP_401_UNAUTHORIZED,
+            )
+            response["WWW-Authenticate"] = "Token"
+            return response
+        request.user = user
+        return await view(request, *args, **kwargs)
+
+    return wrapper
+
+
+def async_require_GET(view):
+    """Allow only GET and HEAD requests to async view"""
+
+    @functools.wraps(view)
+    async def wrapper(request, *args, **kwargs):
+        if request.method not in ("GET", "HEAD"):
+            response = JsonResponse(
+                {"detail": f'Method "{request.method}" not allowed.'},
+                status=status.HTTP_405_METHOD_NOT_ALLOWED,
+            )
+            response["Allow"] = "GET, HEAD"
+            return response
+        return await view(request, *args, **kwargs)
+
+    return wrapper
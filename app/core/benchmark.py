@@ -0,0 +1,141 @@
+"""Helpers for benchmark fixtures and measurements"""
+import math
+import statistics
+import uuid
+from contextlib import ExitStack, contextmanager
+from decimal import Decimal
+from django.contrib.auth import get_user_model
+from django.db import connections
+from django.test.utils import override_settings
+from core.models import Recipe, Tag, Ingredient
+from core.throttling import get_unthrottled_settings
+
+# Metrics where bigger number is better, all others should stay low
+HIGHER_IS_BETTER = ("rps", "objects_per_sec")
+
+
+def in_process_settings():
+    """Return settings override for benchmarking app with the test client
+
+    Test client must get past ALLOWED_HOSTS, its requests all come from one
+    client and would be throttled, and access log would flood the report.
+    """
+    return override_settings(
+        ALLOWED_HOSTS=["testserver"],
+        REST_FRAMEWORK=get_unthrottled_settings(),
+        ACCESS_LOG=False,
+    )
+
+
+def create_fixtures(recipes_count):
+    """Create throwaway user owning recipes with tags and ingredients"""
+    user = get_user_model().objects.create_user(
+        email=f"benchmark-{uuid.uuid4().hex}@example.com",
+        password=uuid.uuid4().hex,
+    )
+    tags = Tag.objects.bulk_create(Tag(user=user, name=f"tag {i}") for i in range(10))
+    ingredients = Ingredient.objects.bulk_create(
+        Ingredient(user=user, name=f"ingredient {i}") for i in range(10)
+    )
+    recipes = Recipe.objects.bulk_create(
+        Recipe(
+            user=user,
+            title=f"recipe {i}",
+            time_minutes=Decimal("10.5"),
+            price=Decimal("9.99"),
+            description="benchmark recipe",
+        )
+        for i in range(recipes_count)
+    )
+    for recipe in recipes:
+        recipe.tags.add(*tags[:3])
+        recipe.ingredients.add(*ingredients[:5])
+    return user
+
+
+class QueryCounter:
+    """Execute wrapper counting queries"""
+
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+
+@contextmanager
+def count_queries():
+    """Count queries of every database made inside the block
+
+    Unlike `CaptureQueriesContext` it isn't affected by the query log
+    being reset when a request starts.
+    """
+    counter = QueryCounter()
+    with ExitStack() as stack:
+        for connection in connections.all():
+            stack.enter_context(connection.execute_wrapper(counter))
+        yield counter
+
+
+def percentile(values, pct):
+    """Return `pct`-th percentile of values using nearest-rank method"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(math.ceil(pct / 100 * len(ordered)), 1)
+    return ordered[rank - 1]
+
+
+def summarize(latencies, elapsed, errors=0):
+    """Return throughput and latency percentiles (in ms) of a run"""
+    latencies_ms = [latency * 1000 for latency in latencies]
+    return {
+        "requests": len(latencies_ms),
+        "errors": errors,
+        "rps": round(len(latencies_ms) / elapsed, 2) if elapsed else 0.0,
+        "mean_ms": round(statistics.fmean(latencies_ms), 3) if latencies_ms else 0.0,
+        "p50_ms": round(percentile(latencies_ms, 50), 3),
+        "p95_ms": round(percentile(latencies_ms, 95), 3),
+        "p99_ms": round(percentile(latencies_ms, 99), 3),
+        "max_ms": round(max(latencies_ms, default=0.0), 3),
+    }
+
+
+def format_summary(name, summary):
+    """Return one line report of a run summary"""
+    return (
+        f"{name:<34} {summary['rps']:>9.1f} req/s"
+        f"  p50 {summary['p50_ms']:>8.2f}ms"
+        f"  p95 {summary['p95_ms']:>8.2f}ms"
+        f"  p99 {summary['p99_ms']:>8.2f}ms"
+        f"  errors {summary['errors']}"
+    )
+
+
+def compare(results, baseline, tolerances):
+    """Return regressions of results outside tolerance bands of baseline
+
+    `tolerances` maps metric to allowed relative change, metrics without
+    one (e.g. query counts) may not get any worse.
+    """
+    regressions = []
+    for name, metrics in baseline.items():
+        for metric, expected in metrics.items():
+            actual = results.get(name, {}).get(metric)
+            if actual is None:
+                regressions.append(f"{name}: {metric} is missing")
+                continue
+            tolerance = tolerances.get(metric, 0)
+            if metric in HIGHER_IS_BETTER:
+                limit = expected * (1 - tolerance)
+                regressed = actual < limit
+            else:
+                limit = expected * (1 + tolerance)
+                regressed = actual > limit
+            if regressed:
+                regressions.append(
+                    f"{name}: {metric} {actual} exceeds limit {limit:.3f} "
+                    f"(baseline {expected})"
+                )
+    return regressions
@@ -0,0 +1,163 @@
+"""Negotiated compression of API responses
+
+Brotli and zstd are used when their packages are installed, gzip always.
+Compressed bodies are cached by content hash, so a hot response that
+doesn't change (e.g. a popular recipe list) is compressed once, not on
+every hit.
+"""
+import collections
+import gzip
+import hashlib
+import threading
+from django.conf import settings
+from django.utils.cache import patch_vary_headers
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+# HTML isn't compressed, it may contain CSRF tokens exposed by BREACH
+COMPRESSIBLE_TYPES = (
+    "application/json",
+    "application/msgpack",
+    "application/vnd.oai.openapi",
+    "text/plain",
+)
+
+
+def compress_gzip(body, level):
+    # Fixed mtime keeps output, and so ETags of it, deterministic
+    return gzip.compress(body, compresslevel=level, mtime=0)
+
+
+def compress_brotli(body, level):
+    return brotli.compress(body, quality=level)
+
+
+def compress_zstd(body, level):
+    return zstandard.ZstdCompressor(level=level).compress(body)
+
+
+# Server preference when client accepts several equally
+ENCODERS = {
+    name: encoder
+    for name, encoder, module in (
+        ("zstd", compress_zstd, zstandard),
+        ("br", compress_brotli, brotli),
+        ("gzip", compress_gzip, gzip),
+    )
+    if module is not None
+}
+
+
+def parse_accept_encoding(header):
+    """Return encodings client accepts mapped to their q-values"""
+    accepted = {}
+    for item in header.split(","):
+        name, *params = [part.strip() for part in item.split(";")]
+        if not name:
+            continue
+        quality = 1.0
+        for param in params:
+            key, _, value = param.partition("=")
+            if key.strip() == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        accepted[name.lower()] = quality
+    return accepted
+
+
+def choose_encoding(header):
+    """Return best encoding accepted by client or None"""
+    accepted = parse_accept_encoding(header)
+    wildcard = accepted.get("*", 0.0)
+    candidates = [
+        (accepted.get(name, wildcard), -index, name)
+        for index, name in enumerate(ENCODERS)
+    ]
+    quality, _, name = max(candidates)
+    return name if quality > 0 else None
+
+
+def get_level(content_type, encoding):
+    """Return compression level for content type from COMPRESSION_LEVELS"""
+    levels = settings.COMPRESSION_LEVELS
+    media_type = content_type.split(";")[0].strip()
+    return levels.get(media_type, levels["default"])[encoding]
+
+
+def is_compressible(content_type):
+    return content_type.split(";")[0].strip().startswith(COMPRESSIBLE_TYPES)
+
+
+class CompressedCache:
+    """Thread safe LRU of compressed bodies keyed by hash of original body"""
+
+    def __init__(self, max_entries):
+        self.max_entries = max_entries
+        self._entries = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    def compress(self, body, encoding, level):
+        key = (hashlib.blake2b(body, digest_size=16).digest(), encoding, level)
+        with self._lock:
+            compressed = self._entries.get(key)
+            if compressed is not None:
+                self._entries.move_to_end(key)
+                return compressed
+        compressed = ENCODERS[encoding](body, level)
+        with self._lock:
+            self._entries[key] = compressed
+            if len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return compressed
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+_cache = None
+
+
+def get_cache():
+    global _cache
+    if _cache is None:
+        _cache = CompressedCache(settings.COMPRESSION_CACHE_SIZE)
+    return _cache
+
+
+def compress_response(request, response):
+    """Compress response body with best encoding accepted by client"""
+    if response.streaming or response.has_header("Content-Encoding"):
+        return response
+    if not is_compressible(response.get("Content-Type", "")):
+        return response
+    if len(response.content) < settings.COMPRESSION_MIN_SIZE:
+        return response
+
+    patch_vary_headers(response, ("Accept-Encoding",))
+    encoding = choose_encoding(request.headers.get("Accept-Encoding", ""))
+    if encoding is None:
+        return response
+    level = get_level(response["Content-Type"], encoding)
+    compressed = get_cache().compress(response.content, encoding, level)
+    if len(compressed) >= len(response.content):
+        return response
+
+    response.content = compressed
+    response.headers["Content-Length"] = str(len(compressed))
+    response.headers["Content-Encoding"] = encoding
+    # Strong ETag must differ between encodings
+    etag = response.get("ETag")
+    if etag and etag.startswith('"'):
+        response.headers["ETag"] = "W/" + etag
+    return response
@@ -0,0 +1,85 @@
+"""Adaptive limit of concurrent requests of a worker
+
+The limit follows AIMD (additive increase, multiplicative decrease): it
+grows by about one for every `limit` requests completing within
+CONCURRENCY_LATENCY_TARGET while the limit is in use, and shrinks by
+CONCURRENCY_BACKOFF_RATIO for every request that is slower or fails with
+503/504. So when the database slows down, the worker quickly admits fewer
+requests and rejects the rest right away instead of queuing them.
+
+Requests get a share of the limit by priority of their route (see
+CONCURRENCY_PRIORITIES), so heavy requests are shed first.
+"""
+import threading
+from django.conf import settings
+from core.metrics import CONCURRENCY_INFLIGHT, CONCURRENCY_LIMIT, get_route_setting
+
+CRITICAL = "critical"
+HIGH = "high"
+NORMAL = "normal"
+LOW = "low"
+
+# Share of the limit requests of a priority may use, critical ones (e.g.
+# liveness probe) are never rejected
+PRIORITY_SHARES = {CRITICAL: None, HIGH: 1.0, NORMAL: 0.8, LOW: 0.5}
+
+
+class AIMDLimiter:
+    """Thread safe concurrency limit adapted to latency of requests"""
+
+    def __init__(
+        self, initial_limit, min_limit, max_limit, latency_target, backoff_ratio
+    ):
+        self.limit = float(initial_limit)
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.latency_target = latency_target
+        self.backoff_ratio = backoff_ratio
+        self.inflight = 0
+        self._lock = threading.Lock()
+        CONCURRENCY_LIMIT.set(self.limit)
+
+    def acquire(self, priority):
+        """Take a slot for request of priority, return False to reject it"""
+        share = PRIORITY_SHARES[priority]
+        with self._lock:
+            # At least one request of every priority runs when worker is idle
+            if share is not None and self.inflight >= max(1, int(self.limit * share)):
+                return False
+            self.inflight += 1
+        CONCURRENCY_INFLIGHT.inc()
+        return True
+
+    def release(self, latency, overloaded=False):
+        """Free the slot and adapt limit to how the request went"""
+        with self._lock:
+            if overloaded or latency > self.latency_target:
+                self.limit = max(self.min_limit, self.limit * self.backoff_ratio)
+            # Growing an unused limit wouldn't tell anything about capacity
+            elif self.inflight * 2 >= self.limit:
+                self.limit = min(self.max_limit, self.limit + 1 / self.limit)
+            self.inflight -= 1
+            limit = self.limit
+        CONCURRENCY_INFLIGHT.dec()
+        CONCURRENCY_LIMIT.set(limit)
+
+
+def get_priority(request):
+    """Return priority of resolved request from CONCURRENCY_PRIORITIES"""
+    return get_route_setting(request, settings.CONCURRENCY_PRIORITIES, NORMAL)
+
+
+_limiter = None
+
+
+def get_limiter():
+    global _limiter
+    if _limiter is None:
+        _limiter = AIMDLimiter(
+            settings.CONCURRENCY_LIMIT_INITIAL,
+            settings.CONCURRENCY_LIMIT_MIN,
+            settings.CONCURRENCY_LIMIT_MAX,
+            settings.CONCURRENCY_LATENCY_TARGET,
+            settings.CONCURRENCY_BACKOFF_RATIO,
+        )
+    return _limiter
@@ -0,0 +1,60 @@
+"""PostgreSQL backend taking connections from a process-wide pool
+
+Enabled with `"ENGINE": "core.db.backends.postgresql"` and configured by
+`OPTIONS["pool"]`, see `core.db.pool.ConnectionPool` for the options.
+"""
+import functools
+from django.db.backends.postgresql import base
+from psycopg2 import extensions
+from core.db.pool import get_pool
+from core.metrics import DB_POOL_WAIT
+from .creation import DatabaseCreation
+
+
+def check_connection(connection):
+    """Raise if connection can't run queries anymore"""
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT 1")
+
+
+def reset_connection(connection):
+    """Roll back transaction left open on connection"""
+    status = connection.get_transaction_status()
+    if status != extensions.TRANSACTION_STATUS_IDLE:
+        connection.rollback()
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    creation_class = DatabaseCreation
+
+    @property
+    def pool(self):
+        return get_pool(
+            self.settings_dict,
+            check=check_connection,
+            reset=reset_connection,
+            on_checkout=DB_POOL_WAIT.labels(self.alias).observe,
+        )
+
+    def get_connection_params(self):
+        conn_params = super().get_connection_params()
+        conn_params.pop("pool", None)
+        return conn_params
+
+    def get_new_connection(self, conn_params):
+        connect = functools.partial(super().get_new_connection, conn_params)
+        connection = self.pool.getconn(connect)
+        # Normally set while connecting, but connection may come from the pool
+        isolation_level = self.settings_dict["OPTIONS"].get("isolation_level")
+        self.isolation_level = (
+            base.IsolationLevel.READ_COMMITTED
+            if isolation_level is None
+            else base.IsolationLevel(isolation_level)
+        )
+        return connection
+
+    def _close(self):
+        if self.connection is not None:
+            # Hand connection back to the pool instead of closing it
+            with self.wrap_database_errors:
+                self.pool.putconn(self.connection)
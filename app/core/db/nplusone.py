@@ -0,0 +1,103 @@
+"""Detection of N+1 queries
+
+The same statement run many times with different parameters within one
+request usually means related objects are loaded one by one instead of
+with `select_related` / `prefetch_related` or bulk operations.
+"""
+import traceback
+from contextlib import asynccontextmanager, contextmanager
+from pathlib import Path
+from django.conf import settings
+from core.db.sql import fingerprint
+from core.db.wrappers import async_execute_wrapper, execute_wrapper
+
+# Instrumentation frames are left out of reported stacks
+IGNORED_PATHS = ("/core/db/", "/core/metrics.py", "/core/middleware.py")
+
+
+class NPlusOneError(Exception):
+    """Request made N+1 queries"""
+
+
+class RepeatedQuery:
+    """Statement run repeatedly along with the stack that ran it"""
+
+    def __init__(self, fingerprint):
+        self.fingerprint = fingerprint
+        self.count = 0
+        self.params = set()
+        self.stack = None
+
+    def __str__(self):
+        stack = "".join(traceback.format_list(self.stack or []))
+        return (
+            f"{self.fingerprint}\n"
+            f"ran {self.count} times with {len(self.params)} different "
+            f"parameters, last from:\n{stack}"
+        )
+
+
+class NPlusOneDetector:
+    """Execute wrapper finding statements repeated more than `threshold` times"""
+
+    def __init__(self, threshold=None):
+        self.threshold = threshold or settings.NPLUSONE_THRESHOLD
+        self._queries = {}
+
+    def __call__(self, execute, sql, params, many, context):
+        result = execute(sql, params, many, context)
+        if many:
+            return result
+        key = fingerprint(sql)
+        query = self._queries.get(key)
+        if query is None:
+            query = self._queries[key] = RepeatedQuery(key)
+        query.count += 1
+        query.params.add(repr(params))
+        # Capturing stack is expensive, it's done only once statement
+        # turns out to be repeated
+        if query.count > self.threshold:
+            query.stack = get_project_stack()
+        return result
+
+    def get_violations(self):
+        """Return statements repeated too often with different parameters"""
+        return [
+            query
+            for query in self._queries.values()
+            if query.count > self.threshold and len(query.params) > 1
+        ]
+
+    def get_report(self):
+        violations = self.get_violations()
+        if not violations:
+            return ""
+        details = "\n\n".join(str(query) for query in violations)
+        return f"Detected {len(violations)} N+1 queries:\n\n{details}"
+
+
+def get_project_stack():
+    """Return stack frames of project code leading to current query"""
+    base_dir = str(Path(settings.BASE_DIR))
+    return [
+        frame
+        for frame in traceback.extract_stack()[:-2]
+        if frame.filename.startswith(base_dir)
+        and not any(path in frame.filename for path in IGNORED_PATHS)
+    ]
+
+
+@contextmanager
+def detect_n_plus_one(threshold=None):
+    """Watch queries of every database made inside the block"""
+    detector = NPlusOneDetector(threshold)
+    with execute_wrapper(detector):
+        yield detector
+
+
+@asynccontextmanager
+async def adetect_n_plus_one(threshold=None):
+    """Async version of `detect_n_plus_one`"""
+    detector = NPlusOneDetector(threshold)
+    async with async_execute_wrapper(detector):
+        yield detector
@@ -0,0 +1,247 @@
+"""Client-side pool of DB-API connections"""
+import collections
+import logging
+import os
+import threading
+import time
+from django.db.utils import OperationalError
+
+logger = logging.getLogger(__name__)
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+class PoolTimeout(OperationalError):
+    """No connection became available in time"""
+
+
+class PooledConnection:
+    """Connection kept by the pool along with its timestamps"""
+
+    def __init__(self, connection, created_at):
+        self.connection = connection
+        self.created_at = created_at
+        self.returned_at = created_at
+
+
+class ConnectionPool:
+    """Thread-safe pool of connections shared by all threads of one process
+
+    Connections older than `max_lifetime` seconds are closed instead of being
+    reused. Connections idle for more than `health_check_interval` seconds are
+    checked with `check` before being handed out. `on_checkout` gets seconds
+    spent getting each connection.
+    """
+
+    def __init__(
+        self,
+        max_size=10,
+        timeout=30.0,
+        max_lifetime=1800.0,
+        health_check_interval=10.0,
+        check=None,
+        reset=None,
+        on_checkout=None,
+    ):
+        self.max_size = max_size
+        self.timeout = timeout
+        self.max_lifetime = max_lifetime
+        self.health_check_interval = health_check_interval
+        self._check = check
+        self._reset = reset
+        self._on_checkout = on_checkout
+        # Most recently returned connection is reused first,
+        # so unneeded connections get old and recycled
+        self._idle = collections.deque()
+        self._in_use = {}
+        self._size = 0
+        self._condition = threading.Condition()
+        self._stats = collections.Counter()
+        self._wait_seconds_max = 0.0
+
+    def getconn(self, connect):
+        """Check out idle connection or create new one using `connect`"""
+        start = time.monotonic()
+        deadline = start + self.timeout
+        waited = False
+        while True:
+            with self._condition:
+                pooled = None
+                while True:
+                    if self._idle:
+                        pooled = self._idle.pop()
+                        break
+                    if self._size < self.max_size:
+                        self._size += 1
+                        break
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self._stats["timeouts"] += 1
+                        raise PoolTimeout(
+                            f"No connection available in {self.timeout} seconds"
+                        )
+                    waited = True
+                    self._condition.wait(remaining)
+
+            if pooled is None:
+                pooled = self._create(connect)
+            elif not self._is_reusable(pooled):
+                self._discard(pooled)
+                continue
+
+            self._record_checkout(time.monotonic() - start, waited)
+            with self._condition:
+                self._in_use[id(pooled.connection)] = pooled
+            return pooled.connection
+
+    def putconn(self, connection):
+        """Return connection to the pool"""
+        with self._condition:
+            pooled = self._in_use.pop(id(connection), None)
+        if pooled is None:
+            # Not ours (e.g. checked out before a fork), just get rid of it
+            self._close_connection(connection)
+            return
+
+        try:
+            if self._reset is not None and not self._is_closed(connection):
+                self._reset(connection)
+        except Exception:
+            logger.warning("Failed to reset pooled connection", exc_info=True)
+            self._discard(pooled)
+            return
+
+        now = time.monotonic()
+        if self._is_closed(connection):
+            self._discard(pooled)
+            return
+        if self._is_expired(pooled, now):
+            with self._condition:
+                self._stats["recycled"] += 1
+            self._discard(pooled)
+            return
+
+        pooled.returned_at = now
+        with self._condition:
+            self._idle.append(pooled)
+            self._condition.notify()
+
+    def close(self):
+        """Close all idle connections"""
+        with self._condition:
+            idle, self._idle = list(self._idle), collections.deque()
+        for pooled in idle:
+            self._discard(pooled)
+
+    def stats(self):
+        """Return snapshot of pool counters"""
+        with self._condition:
+            return {
+                "size": self._size,
+                "idle": len(self._idle),
+                "in_use": len(self._in_use),
+                "max_size": self.max_size,
+                "checkouts": self._stats["checkouts"],
+                "waits": self._stats["waits"],
+                "wait_seconds_total": self._stats["wait_seconds_total"],
+                "wait_seconds_max": self._wait_seconds_max,
+                "timeouts": self._stats["timeouts"],
+                "created": self._stats["created"],
+                "recycled": self._stats["recycled"],
+                "failed_checks": self._stats["failed_checks"],
+            }
+
+    def _create(self, connect):
+        try:
+            connection = connect()
+        except Exception:
+            with self._condition:
+                self._size -= 1
+                self._condition.notify()
+            raise
+        with self._condition:
+            self._stats["created"] += 1
+        return PooledConnection(connection, time.monotonic())
+
+    def _is_reusable(self, pooled):
+        now = time.monotonic()
+        if self._is_closed(pooled.connection):
+            return False
+        if self._is_expired(pooled, now):
+            with self._condition:
+                self._stats["recycled"] += 1
+            return False
+        idle_for = now - pooled.returned_at
+        if self._check is not None and idle_for > self.health_check_interval:
+            try:
+                self._check(pooled.connection)
+            except Exception:
+                logger.info("Discarding pooled connection failed health check")
+                with self._condition:
+                    self._stats["failed_checks"] += 1
+                return False
+        return True
+
+    def _is_expired(self, pooled, now):
+        return now - pooled.created_at > self.max_lifetime
+
+    def _is_closed(self, connection):
+        return bool(getattr(connection, "closed", False))
+
+    def _discard(self, pooled):
+        self._close_connection(pooled.connection)
+        with self._condition:
+            self._size -= 1
+            self._condition.notify()
+
+    def _close_connection(self, connection):
+        try:
+            connection.close()
+        except Exception:
+            pass
+
+    def _record_checkout(self, wait_seconds, waited):
+        with self._condition:
+            self._stats["checkouts"] += 1
+            if waited:
+                self._stats["waits"] += 1
+            self._stats["wait_seconds_total"] += wait_seconds
+            self._wait_seconds_max = max(self._wait_seconds_max, wait_seconds)
+        if self._on_checkout is not None:
+            self._on_checkout(wait_seconds)
+
+
+def get_pool(settings_dict, **kwargs):
+    """Return pool for database settings, created once per process"""
+    # Pid is part of the key so forked workers never share sockets
+    # inherited from their parent
+    key = (
+        os.getpid(),
+        settings_dict["NAME"],
+        settings_dict["HOST"],
+        settings_dict["PORT"],
+        settings_dict["USER"],
+    )
+    pool = _pools.get(key)
+    if pool is None:
+        with _pools_lock:
+            pool = _pools.get(key)
+            if pool is None:
+                options = settings_dict["OPTIONS"].get("pool", {})
+                pool = ConnectionPool(**options, **kwargs)
+                _pools[key] = pool
+    return pool
+
+
+def get_pools_stats():
+    """Return stats of every pool of current process by database name"""
+    pid = os.getpid()
+    return {key[1]: pool.stats() for key, pool in list(_pools.items()) if key[0] == pid}
+
+
+def close_pools(database_name):
+    """Close idle connections to database in pools of current process"""
+    for key, pool in list(_pools.items()):
+        if key[1] == database_name:
+            pool.close()
@@ -0,0 +1,125 @@
+"""Routing of reads between primary database and its replicas"""
+import contextvars
+import hashlib
+import logging
+import random
+import time
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.db.utils import OperationalError
+
+logger = logging.getLogger(__name__)
+
+PIN_CACHE_KEY = "db-primary-pin:{}"
+
+_routing = contextvars.ContextVar("db_read_routing", default=None)
+# Replicas that failed recently, alias -> time to retry them at
+_replicas_down_until = {}
+
+
+class ReadRouting:
+    """Routing decisions of one request"""
+
+    def __init__(self):
+        self.use_replica = False
+        self.alias = None
+
+    def get_read_alias(self):
+        """Return replica alias for reads of the request or None"""
+        if not self.use_replica:
+            return None
+        if self.alias is None:
+            # One replica per request so all its reads see the same snapshot
+            self.alias = get_replica()
+            if self.alias is None:
+                self.use_replica = False
+        return self.alias
+
+
+def start_routing():
+    """Start routing of current request and return its state and reset token"""
+    routing = ReadRouting()
+    return routing, _routing.set(routing)
+
+
+def stop_routing(token):
+    _routing.reset(token)
+
+
+def get_routing():
+    return _routing.get()
+
+
+def get_replica():
+    """Return alias of available replica or None"""
+    replicas = list(settings.DATABASE_REPLICAS)
+    random.shuffle(replicas)
+    now = time.monotonic()
+    for alias in replicas:
+        if _replicas_down_until.get(alias, 0) > now:
+            continue
+        try:
+            connections[alias].ensure_connection()
+        except OperationalError:
+            mark_replica_down(alias)
+            continue
+        return alias
+    return None
+
+
+def mark_replica_down(alias):
+    """Stop using replica for a while"""
+    logger.warning("Database replica %s is unavailable", alias)
+    retry_at = time.monotonic() + settings.DATABASE_REPLICA_RETRY_SECONDS
+    _replicas_down_until[alias] = retry_at
+
+
+def get_client_key(request):
+    """Return key identifying client by its credentials or None"""
+    authorization = request.headers.get("Authorization")
+    if not authorization:
+        return None
+    return hashlib.sha256(authorization.encode()).hexdigest()
+
+
+def get_token_client_key(token_key):
+    """Return key of client which will authenticate with token `token_key`"""
+    return hashlib.sha256(f"Token {token_key}".encode()).hexdigest()
+
+
+def pin_to_primary(client_key):
+    """Send reads of client to primary until replicas catch up on its writes"""
+    cache.set(
+        PIN_CACHE_KEY.format(client_key),
+        True,
+        timeout=settings.DATABASE_REPLICA_PIN_SECONDS,
+    )
+
+
+def is_pinned_to_primary(client_key):
+    return cache.get(PIN_CACHE_KEY.format(client_key), False)
+
+
+class PrimaryReplicaRouter:
+    """Send reads to replicas when current request allows it
+
+    Writes always go to primary. Requests allow replica reads only when
+    `core.middleware.ReplicaRoutingMiddleware` says so.
+    """
+
+    def db_for_read(self, model, **hints):
+        routing = get_routing()
+        if routing is None:
+            return None
+        return routing.get_read_alias()
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Replicas hold the same data as primary
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == DEFAULT_DB_ALIAS
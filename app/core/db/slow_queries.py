@@ -0,0 +1,176 @@
+"""Log of slow database queries
+
+Every connection gets an execute wrapper that times its queries. Queries
+slower than SLOW_QUERY_THRESHOLD_MS are kept in a bounded in-memory buffer
+and logged. A sampled subset also gets its `EXPLAIN (ANALYZE, BUFFERS)` plan.
+"""
+import collections
+import logging
+import random
+import sys
+import threading
+import time
+from pathlib import Path
+from django.apps import apps
+from django.conf import settings
+from django.db import models
+from django.utils import timezone
+from core.db.sql import fingerprint
+
+logger = logging.getLogger(__name__)
+
+# Instrumentation modules are never the origin of a query
+IGNORED_MODULES = ("core.db", "core.metrics", "core.middleware")
+MAX_SQL_LENGTH = 2000
+
+_buffer = collections.deque(maxlen=settings.SLOW_QUERY_BUFFER_SIZE)
+_buffer_lock = threading.Lock()
+_local = threading.local()
+
+
+def install(sender, connection, **kwargs):
+    """Add slow query wrapper to connection, used as `connection_created` receiver"""
+    # Connection may be created inside `execute_wrapper()` of a request,
+    # which pops the last wrapper on exit, so this one must go first
+    if record_slow_queries not in connection.execute_wrappers:
+        connection.execute_wrappers.insert(0, record_slow_queries)
+
+
+def record_slow_queries(execute, sql, params, many, context):
+    """Database execute wrapper recording queries above threshold"""
+    start = time.perf_counter()
+    result = execute(sql, params, many, context)
+    duration_ms = (time.perf_counter() - start) * 1000
+    # Plans of slow queries are slow queries too, they're not recorded
+    explaining = getattr(_local, "explaining", False)
+    if duration_ms >= settings.SLOW_QUERY_THRESHOLD_MS and not explaining:
+        record(context["connection"], sql, params, many, duration_ms)
+    return result
+
+
+def record(connection, sql, params, many, duration_ms):
+    """Save slow query to buffer and log it"""
+    origin, lineno = find_origin()
+    entry = {
+        "time": timezone.now().isoformat(),
+        "database": connection.alias,
+        "fingerprint": fingerprint(sql),
+        "sql": sql[:MAX_SQL_LENGTH],
+        "duration_ms": round(duration_ms, 3),
+        "origin": origin,
+        "lineno": lineno,
+        "plan": None,
+    }
+    if not many and random.random() < settings.SLOW_QUERY_EXPLAIN_SAMPLE_RATE:
+        entry["plan"] = explain(connection, sql, params)
+
+    with _buffer_lock:
+        _buffer.append(entry)
+    logger.warning(
+        "Slow query took %.1fms in %s",
+        duration_ms,
+        origin,
+        # Merged into the JSON line by core.access_log.JSONFormatter
+        extra={"fields": entry},
+    )
+
+
+def explain(connection, sql, params):
+    """Return plan of query or None if it can't be explained safely"""
+    # ANALYZE runs the statement, so only plain reads are explained. Failing
+    # EXPLAIN inside a transaction would break the rest of the transaction
+    if connection.vendor != "postgresql" or connection.in_atomic_block:
+        return None
+    if not sql.lstrip().upper().startswith("SELECT"):
+        return None
+    _local.explaining = True
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute(f"EXPLAIN (ANALYZE, BUFFERS) {sql}", params)
+            return "\n".join(row[0] for row in cursor.fetchall())
+    except Exception:
+        logger.info("Failed to explain slow query", exc_info=True)
+        return None
+    finally:
+        _local.explaining = False
+
+
+def find_origin():
+    """Return name and line of the innermost project code running the query"""
+    project_modules = get_project_modules()
+    frame = sys._getframe(1)
+    while frame is not None:
+        module = frame.f_globals.get("__name__", "")
+        if is_project_module(module, project_modules):
+            return f"{module}.{frame.f_code.co_qualname}", frame.f_lineno
+        # Project views and serializers called from framework code,
+        # e.g. `list` of DRF mixin running on RecipeViewSet
+        # type() is used as isinstance() would evaluate lazy objects
+        owner_class = type(frame.f_locals.get("self"))
+        owner_module = owner_class.__module__
+        # Framework code of project models, e.g. `save`, says nothing useful
+        if issubclass(owner_class, models.Model):
+            owner_module = ""
+        if is_project_module(owner_module, project_modules):
+            name = f"{owner_class.__qualname__}.{frame.f_code.co_name}"
+            return f"{owner_module}.{name}", frame.f_lineno
+        frame = frame.f_back
+    return "unknown", None
+
+
+def get_project_modules():
+    """Return names of apps living in the project directory"""
+    base_dir = str(Path(settings.BASE_DIR))
+    return tuple(
+        app_config.name
+        for app_config in apps.get_app_configs()
+        if app_config.path.startswith(base_dir)
+    )
+
+
+def is_project_module(module, project_modules):
+    if module.startswith(IGNORED_MODULES):
+        return False
+    return module.split(".")[0] in project_modules
+
+
+def get_slow_queries():
+    """Return recorded slow queries, newest first"""
+    with _buffer_lock:
+        return list(reversed(_buffer))
+
+
+def get_worst_queries(limit=50):
+    """Return slow queries grouped by fingerprint, most total time first"""
+    groups = {}
+    for entry in get_slow_queries():
+        group = groups.setdefault(
+            entry["fingerprint"],
+            {
+                "fingerprint": entry["fingerprint"],
+                "count": 0,
+                "total_ms": 0.0,
+                "max_ms": 0.0,
+                "origins": set(),
+                "sample": entry,
+                "plan": None,
+            },
+        )
+        group["count"] += 1
+        group["total_ms"] += entry["duration_ms"]
+        group["max_ms"] = max(group["max_ms"], entry["duration_ms"])
+        group["origins"].add(entry["origin"])
+        # Entries are newest first, so this keeps the latest plan
+        if group["plan"] is None:
+            group["plan"] = entry["plan"]
+    worst = sorted(groups.values(), key=lambda group: group["total_ms"], reverse=True)
+    for group in worst:
+        group["origins"] = sorted(group["origins"])
+        group["total_ms"] = round(group["total_ms"], 3)
+        group["mean_ms"] = round(group["total_ms"] / group["count"], 3)
+    return worst[:limit]
+
+
+def clear():
+    with _buffer_lock:
+        _buffer.clear()
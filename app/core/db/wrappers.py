@@ -0,0 +1,29 @@
+"""Database execute wrappers installed for the duration of a request
+
+Connections are per thread. Under ASGI sync code of a request (sync views,
+ORM calls of async views) runs in a thread of its own, so async middleware
+installs wrappers on connections of that thread, not of the event loop.
+"""
+from contextlib import ExitStack, asynccontextmanager, contextmanager
+from asgiref.sync import sync_to_async
+from django.db import connections
+
+
+@contextmanager
+def execute_wrapper(wrapper):
+    """Wrap statements made by this thread on every database inside the block"""
+    with ExitStack() as stack:
+        for connection in connections.all():
+            stack.enter_context(connection.execute_wrapper(wrapper))
+        yield
+
+
+@asynccontextmanager
+async def async_execute_wrapper(wrapper):
+    """Wrap statements made by sync code of current request inside the block"""
+    stack = ExitStack()
+    await sync_to_async(stack.enter_context)(execute_wrapper(wrapper))
+    try:
+        yield
+    finally:
+        await sync_to_async(stack.close)()
@@ -0,0 +1,103 @@
+"""Request deadlines enforced on database statements
+
+A request has REQUEST_DEADLINE seconds, or the time its route has in
+REQUEST_DEADLINES. Every PostgreSQL statement of the request is sent with
+`SET LOCAL statement_timeout` of the time left, in the same round trip.
+The two statements run in one (implicit) transaction, so the timeout
+applies to the statement only, and the server cancels it at the deadline.
+No statement is started after the deadline passed.
+
+Statements of server-side cursors (`QuerySet.iterator()`) can't be
+prefixed, they are only checked against the deadline before they start.
+"""
+import contextvars
+import time
+from contextlib import asynccontextmanager, contextmanager
+from django.conf import settings
+from django.db.utils import OperationalError
+from psycopg2 import errorcodes
+from core.db.wrappers import async_execute_wrapper, execute_wrapper
+from core.metrics import get_route_setting
+
+
+class DeadlineExceeded(Exception):
+    """Statement wasn't started because the request ran out of time"""
+
+
+class Deadline:
+    """Time left for one request, runs from its start once route is known"""
+
+    __slots__ = ("started", "expires_at")
+
+    def __init__(self):
+        self.started = time.monotonic()
+        self.expires_at = None
+
+    def start(self, timeout):
+        if timeout:
+            self.expires_at = self.started + timeout
+
+    def get_remaining(self):
+        """Return seconds left or None when request has no deadline"""
+        if self.expires_at is None:
+            return None
+        return self.expires_at - time.monotonic()
+
+
+_deadline = contextvars.ContextVar("deadline", default=None)
+
+
+def get_timeout(request):
+    """Return deadline in seconds of resolved request, 0 is none"""
+    return get_route_setting(
+        request, settings.REQUEST_DEADLINES, settings.REQUEST_DEADLINE
+    )
+
+
+@contextmanager
+def track():
+    """Enforce deadline yielded on statements of the block"""
+    deadline = Deadline()
+    token = _deadline.set(deadline)
+    try:
+        with execute_wrapper(enforce_deadline):
+            yield deadline
+    finally:
+        _deadline.reset(token)
+
+
+@asynccontextmanager
+async def atrack():
+    """Async version of `track`"""
+    deadline = Deadline()
+    token = _deadline.set(deadline)
+    try:
+        async with async_execute_wrapper(enforce_deadline):
+            yield deadline
+    finally:
+        _deadline.reset(token)
+
+
+def enforce_deadline(execute, sql, params, many, context):
+    """Database execute wrapper limiting statements to time left"""
+    deadline = _deadline.get()
+    remaining = deadline.get_remaining() if deadline is not None else None
+    if remaining is None:
+        return execute(sql, params, many, context)
+    if remaining <= 0:
+        raise DeadlineExceeded(f"Deadline passed {-remaining:.3f}s ago")
+    server_side = getattr(context["cursor"].cursor, "name", None)
+    if context["connection"].vendor == "postgresql" and not server_side:
+        timeout_ms = max(1, int(remaining * 1000))
+        sql = f"SET LOCAL statement_timeout = {timeout_ms}; {sql}"
+    return execute(sql, params, many, context)
+
+
+def is_deadline_error(exception):
+    """Return whether exception means a statement ran out of time"""
+    if isinstance(exception, DeadlineExceeded):
+        return True
+    return (
+        isinstance(exception, OperationalError)
+        and getattr(exception.__cause__, "pgcode", None) == errorcodes.QUERY_CANCELED
+    )
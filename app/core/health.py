@@ -0,0 +1,27 @@
+"""Cheap probes of services the app depends on"""
+from django.core.cache import cache
+from django.db import connections
+
+READINESS_CACHE_KEY = "readyz"
+
+
+def check_database(alias="default"):
+    """Run trivial query, raise OperationalError if database is unreachable"""
+    with connections[alias].cursor() as cursor:
+        cursor.execute("SELECT 1")
+
+
+def check_cache():
+    """Round trip to the cache, raise its error if it's unreachable"""
+    cache.get(READINESS_CACHE_KEY)
+
+
+def get_readiness():
+    """Return whether app can serve requests and error of every probe"""
+    errors = {}
+    for name, probe in (("database", check_database), ("cache", check_cache)):
+        try:
+            probe()
+        except Exception as error:
+            errors[name] = f"{type(error).__name__}: {error}"
+    return not errors, errors
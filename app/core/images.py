@@ -0,0 +1,34 @@
+"""Helpers for processing uploaded images"""
+import base64
+import io
+from PIL import Image, ImageOps
+
+PLACEHOLDER_SIZE = 20
+PLACEHOLDER_QUALITY = 60
+PALETTE_SIZE = 8
+
+
+def generate_image_placeholder(image_file, size=PLACEHOLDER_SIZE):
+    """Return tiny base64 thumbnail and dominant color of image file"""
+    with Image.open(image_file) as img:
+        # Let JPEG decoder downscale while decoding, it's much cheaper
+        # than decoding full image and resizing it afterwards
+        img.draft("RGB", (size, size))
+        img = ImageOps.exif_transpose(img).convert("RGB")
+        img.thumbnail((size, size))
+
+    buffer = io.BytesIO()
+    img.save(buffer, format="JPEG", quality=PLACEHOLDER_QUALITY, optimize=True)
+    encoded = base64.b64encode(buffer.getvalue()).decode("ascii")
+    placeholder = f"data:image/jpeg;base64,{encoded}"
+
+    # Most frequent color of reduced palette
+    palette_img = img.quantize(colors=PALETTE_SIZE)
+    palette = palette_img.getpalette()
+    count, index = max(palette_img.getcolors())
+    red, green, blue = palette[index * 3 : index * 3 + 3]
+    color = f"#{red:02x}{green:02x}{blue:02x}"
+
+    if hasattr(image_file, "seek"):
+        image_file.seek(0)
+    return placeholder, color
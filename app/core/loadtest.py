@@ -0,0 +1,182 @@
+"""Load test scenario driving the API over HTTP"""
+import collections
+import http.client
+import io
+import json
+import threading
+import time
+import urllib.error
+import urllib.request
+import uuid
+from PIL import Image
+from core.benchmark import summarize
+
+
+def create_jpeg(size=(64, 64)):
+    """Return bytes of a small JPEG image to upload"""
+    image_file = io.BytesIO()
+    Image.new("RGB", size, color=(200, 120, 40)).save(image_file, format="JPEG")
+    return image_file.getvalue()
+
+
+def encode_multipart(field, filename, content, content_type):
+    """Return body and content type of multipart form with one file"""
+    boundary = uuid.uuid4().hex
+    body = b"".join(
+        [
+            f"--{boundary}\r\n".encode(),
+            (
+                f'Content-Disposition: form-data; name="{field}"; '
+                f'filename="{filename}"\r\n'
+            ).encode(),
+            f"Content-Type: {content_type}\r\n\r\n".encode(),
+            content,
+            f"\r\n--{boundary}--\r\n".encode(),
+        ]
+    )
+    return body, f"multipart/form-data; boundary={boundary}"
+
+
+class Recorder:
+    """Collect latencies and errors of every endpoint from many threads"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.latencies = collections.defaultdict(list)
+        self.errors = collections.Counter()
+
+    def add(self, endpoint, latency, ok):
+        with self._lock:
+            self.latencies[endpoint].append(latency)
+            if not ok:
+                self.errors[endpoint] += 1
+
+    def summarize(self, elapsed):
+        """Return summary of every endpoint, throughput is over whole run"""
+        return {
+            endpoint: summarize(latencies, elapsed, errors=self.errors[endpoint])
+            for endpoint, latencies in sorted(self.latencies.items())
+        }
+
+
+class APIClient:
+    """Minimal JSON client of the API recording every request"""
+
+    def __init__(self, base_url, recorder, timeout=30):
+        self.base_url = base_url.rstrip("/")
+        self.recorder = recorder
+        self.timeout = timeout
+        self.token = None
+
+    def request(self, endpoint, method, path, data=None, files=None):
+        """Send request, record it under `endpoint` and return decoded body"""
+        headers = {"Accept": "application/json"}
+        if self.token:
+            headers["Authorization"] = f"Token {self.token}"
+        body = None
+        if files:
+            body, headers["Content-Type"] = encode_multipart(*files)
+        elif data is not None:
+            body = json.dumps(data).encode()
+            headers["Content-Type"] = "application/json"
+        request = urllib.request.Request(
+            self.base_url + path,
+            data=body,
+            headers=headers,
+            method=method,
+        )
+        start = time.perf_counter()
+        try:
+            with urllib.request.urlopen(request, timeout=self.timeout) as res:
+                content = res.read()
+            ok = True
+        # URLError, timeouts and resets are OSErrors, a server dropping the
+        # connection mid-response raises HTTPException
+        except (OSError, http.client.HTTPException) as error:
+            content = error.read() if isinstance(error, urllib.error.HTTPError) else b""
+            ok = False
+        self.recorder.add(endpoint, time.perf_counter() - start, ok)
+        return json.loads(content) if ok and content else None
+
+
+class Scenario:
+    """Requests one virtual user makes
+
+    Every client signs up (or logs in as seeded user) and then repeatedly
+    browses and edits its recipes.
+    """
+
+    def __init__(self, client, image, credentials=None):
+        self.client = client
+        self.image = image
+        self.credentials = credentials
+
+    def login(self):
+        if self.credentials is None:
+            self.credentials = {
+                "email": f"loadtest-{uuid.uuid4().hex}@example.com",
+                "password": uuid.uuid4().hex,
+            }
+            payload = dict(self.credentials, name="Load test")
+            self.client.request("register", "POST", "/api/user/register/", payload)
+        res = self.client.request("token", "POST", "/api/user/token/", self.credentials)
+        self.client.token = res and res["token"]
+        return bool(self.client.token)
+
+    def run_iteration(self):
+        client = self.client
+        client.request("me", "GET", "/api/user/me/")
+        client.request("tag list", "GET", "/api/recipe/tags/")
+        client.request("ingredient list", "GET", "/api/recipe/ingredients/")
+        recipe = client.request(
+            "recipe create",
+            "POST",
+            "/api/recipe/recipes/",
+            {
+                "title": "Load test recipe",
+                "time_minutes": "12.5",
+                "price": "9.99",
+                "tags": [{"name": "dinner"}, {"name": "quick"}],
+                "ingredients": [{"name": "salt"}, {"name": "pepper"}],
+            },
+        )
+        client.request("recipe list", "GET", "/api/recipe/recipes/")
+        if recipe is None:
+            return
+        path = f"/api/recipe/recipes/{recipe['id']}/"
+        client.request("recipe detail", "GET", path)
+        client.request("recipe update", "PATCH", path, {"title": "Updated"})
+        client.request(
+            "recipe image upload",
+            "POST",
+            f"{path}upload-image/",
+            files=("image", "image.jpg", self.image, "image/jpeg"),
+        )
+        client.request("recipe delete", "DELETE", path)
+
+
+def run(base_url, clients=10, iterations=10, credentials=None, timeout=30):
+    """Run scenario from concurrent clients and return summary per endpoint
+
+    `credentials` is a list of existing users to log in as instead of
+    registering new ones, used round robin.
+    """
+    recorder = Recorder()
+    image = create_jpeg()
+
+    def run_client(index):
+        user = credentials[index % len(credentials)] if credentials else None
+        scenario = Scenario(APIClient(base_url, recorder, timeout), image, user)
+        if scenario.login():
+            for _ in range(iterations):
+                scenario.run_iteration()
+
+    threads = [
+        threading.Thread(target=run_client, args=(index,)) for index in range(clients)
+    ]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return recorder.summarize(time.perf_counter() - start)
@@ -0,0 +1,163 @@
+import json
+import time
+from pathlib import Path
+from django.core.management.base import BaseCommand, CommandError
+from django.test import Client
+from django.urls import reverse
+from rest_framework.authtoken.models import Token
+from core.benchmark import (
+    compare,
+    count_queries,
+    create_fixtures,
+    summarize,
+    in_process_settings,
+)
+from core.models import Recipe
+from recipe.serializers import RecipeSerializer, RecipeDetailSerializer
+
+BASELINE_PATH = Path(__file__).resolve().parents[2] / "benchmark_baseline.json"
+# Timings differ a lot between machines and runs, only gross slowdowns
+# fail. Query counts have no tolerance
+DEFAULT_TOLERANCES = {"objects_per_sec": 0.75, "p50_ms": 3, "p95_ms": 4}
+
+
+class Command(BaseCommand):
+    """Run fixed benchmark suite and fail on regression against baseline
+
+    Measures serializer throughput, queries per endpoint and latency
+    through the test client. Runs offline against the configured database
+    using a throwaway user.
+
+    After an intended change refresh the baseline on the reference setup
+    (docker-compose, PostgreSQL) with `--update-baseline` and commit it,
+    tolerances of the existing baseline are kept. With `--queries-only`
+    only query counts are gated, e.g. on shared CI runners.
+    """
+
+    help = __doc__
+
+    def add_arguments(self, parser):
+        parser.add_argument("--baseline", default=BASELINE_PATH, type=Path)
+        parser.add_argument(
+            "--update-baseline",
+            action="store_true",
+            help="Save results as new baseline instead of comparing",
+        )
+        parser.add_argument("--recipes", type=int, default=100)
+        parser.add_argument("--requests", type=int, default=50)
+        parser.add_argument("--repeat", type=int, default=20)
+        parser.add_argument("--output", help="Save results to JSON file")
+        parser.add_argument(
+            "--queries-only",
+            action="store_true",
+            help="Fail only on query counts, not on timings",
+        )
+
+    def handle(self, *args, **options):
+        with in_process_settings():
+            user = create_fixtures(options["recipes"])
+            try:
+                results = self._run_suite(user, options)
+            finally:
+                user.delete()
+
+        for name, metrics in results.items():
+            values = "  ".join(f"{metric} {value}" for metric, value in metrics.items())
+            self.stdout.write(f"{name:<34} {values}")
+        if options["output"]:
+            with open(options["output"], "w") as output_file:
+                json.dump(results, output_file, indent=2)
+
+        if options["update_baseline"]:
+            self._save_baseline(Path(options["baseline"]), results)
+            return
+        baseline = json.loads(Path(options["baseline"]).read_text())
+        expected = baseline["results"]
+        if options["queries_only"]:
+            expected = {
+                name: {"queries": metrics["queries"]}
+                for name, metrics in expected.items()
+                if "queries" in metrics
+            }
+        regressions = compare(results, expected, baseline["tolerances"])
+        if regressions:
+            raise CommandError(
+                "Performance regressions:\n" + "\n".join(regressions),
+            )
+        self.stdout.write(self.style.SUCCESS("No regressions"))
+
+    def _save_baseline(self, path, results):
+        """Save results keeping tolerances of existing baseline"""
+        tolerances = DEFAULT_TOLERANCES
+        if path.exists():
+            tolerances = json.loads(path.read_text())["tolerances"]
+        baseline = {"tolerances": tolerances, "results": results}
+        path.write_text(json.dumps(baseline, indent=2) + "\n")
+        self.stdout.write(f"Baseline saved to {path}")
+
+    def _run_suite(self, user, options):
+        results = {}
+        recipes = list(
+            Recipe.objects.filter(user=user)
+            .order_by("id")
+            .prefetch_related("tags", "ingredients", "images")
+        )
+        for serializer_class in (RecipeSerializer, RecipeDetailSerializer):
+            name = f"serializer {serializer_class.__name__}"
+            results[name] = self._measure_serializer(
+                serializer_class, recipes, options["repeat"]
+            )
+
+        token = Token.objects.create(user=user)
+        headers = {"Authorization": f"Token {token.key}"}
+        detail_url = reverse("recipe:recipe-detail", kwargs={"pk": recipes[0].id})
+        recipe_payload = {
+            "title": "benchmark recipe",
+            "time_minutes": "10.5",
+            "price": "9.99",
+            "tags": [{"name": "tag 0"}, {"name": "new tag"}],
+            "ingredients": [{"name": "ingredient 0"}],
+        }
+        endpoints = [
+            ("recipe list", "get", reverse("recipe:recipe-list"), None),
+            ("recipe detail", "get", detail_url, None),
+            ("recipe create", "post", reverse("recipe:recipe-list"), recipe_payload),
+            ("recipe update", "patch", detail_url, {"title": "updated"}),
+            ("tag list", "get", reverse("recipe:tag-list"), None),
+            ("ingredient list", "get", reverse("recipe:ingredient-list"), None),
+            ("me", "get", reverse("user:me"), None),
+        ]
+        for name, method, url, data in endpoints:
+            results[name] = self._measure_endpoint(
+                getattr(Client(), method), url, data, headers, options["requests"]
+            )
+        return results
+
+    def _measure_serializer(self, serializer_class, recipes, repeat):
+        start = time.perf_counter()
+        for _ in range(repeat):
+            serializer_class(recipes, many=True).data
+        elapsed = time.perf_counter() - start
+        return {"objects_per_sec": round(len(recipes) * repeat / elapsed, 1)}
+
+    def _measure_endpoint(self, send, url, data, headers, requests):
+        """Return queries of one request and latency of many"""
+        kwargs = {"headers": headers}
+        if data:
+            kwargs.update(data=data, content_type="application/json")
+        with count_queries() as queries:
+            res = send(url, **kwargs)
+        if res.status_code >= 400:
+            raise CommandError(f"{url} responded with {res.status_code}")
+
+        latencies = []
+        for _ in range(requests):
+            start = time.perf_counter()
+            send(url, **kwargs)
+            latencies.append(time.perf_counter() - start)
+        summary = summarize(latencies, sum(latencies))
+        return {
+            "queries": queries.count,
+            "p50_ms": summary["p50_ms"],
+            "p95_ms": summary["p95_ms"],
+        }
@@ -0,0 +1,115 @@
+import asyncio
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+from asgiref.sync import ThreadSensitiveContext
+from django.core.management.base import BaseCommand
+from django.test import AsyncClient, Client
+from django.urls import reverse
+from rest_framework.authtoken.models import Token
+from core.benchmark import (
+    create_fixtures,
+    format_summary,
+    summarize,
+    in_process_settings,
+)
+from core.models import Recipe
+
+
+class Command(BaseCommand):
+    """Compare sync (WSGI) and native async (ASGI) read endpoints"""
+
+    help = __doc__
+
+    def add_arguments(self, parser):
+        parser.add_argument("--requests", type=int, default=500)
+        parser.add_argument("--concurrency", type=int, default=50)
+        parser.add_argument("--recipes", type=int, default=50)
+        parser.add_argument("--output", help="Save results to JSON file")
+
+    def handle(self, *args, **options):
+        with in_process_settings():
+            results = self._run_benchmark(options)
+
+        if options["output"]:
+            with open(options["output"], "w") as output_file:
+                json.dump(results, output_file, indent=2)
+
+    def _run_benchmark(self, options):
+        user = create_fixtures(options["recipes"])
+        token = Token.objects.create(user=user)
+        headers = {"Authorization": f"Token {token.key}"}
+        recipe_id = Recipe.objects.filter(user=user).order_by("id").first().id
+        endpoints = [
+            (
+                "recipe list",
+                reverse("recipe:recipe-list"),
+                reverse("recipe:async-recipe-list"),
+            ),
+            (
+                "recipe detail",
+                reverse("recipe:recipe-detail", kwargs={"pk": recipe_id}),
+                reverse("recipe:async-recipe-detail", kwargs={"pk": recipe_id}),
+            ),
+            ("tag list", reverse("recipe:tag-list"), reverse("recipe:async-tag-list")),
+            (
+                "ingredient list",
+                reverse("recipe:ingredient-list"),
+                reverse("recipe:async-ingredient-list"),
+            ),
+            ("me", reverse("user:me"), reverse("user:async-me")),
+        ]
+        results = {}
+        try:
+            for name, sync_url, async_url in endpoints:
+                runs = [
+                    (f"{name} [wsgi]", self._run_sync, sync_url),
+                    (f"{name} [asgi, sync view]", self._run_async, sync_url),
+                    (f"{name} [asgi, async view]", self._run_async, async_url),
+                ]
+                for run_name, run, url in runs:
+                    results[run_name] = run(url, headers, options)
+                    self.stdout.write(format_summary(run_name, results[run_name]))
+        finally:
+            user.delete()
+        return results
+
+    def _run_sync(self, url, headers, options):
+        """Send requests from a pool of threads like a threaded WSGI server"""
+
+        def send(_):
+            start = time.perf_counter()
+            res = Client().get(url, headers=headers)
+            return time.perf_counter() - start, res.status_code
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=options["concurrency"]) as executor:
+            responses = list(executor.map(send, range(options["requests"])))
+        return self._summarize(responses, time.perf_counter() - start)
+
+    def _run_async(self, url, headers, options):
+        """Send concurrent requests from one event loop through ASGI handler"""
+
+        async def run():
+            client = AsyncClient()
+            semaphore = asyncio.Semaphore(options["concurrency"])
+
+            async def send():
+                # Like ASGIHandler, so sync code of concurrent requests
+                # runs in threads of their own
+                async with semaphore, ThreadSensitiveContext():
+                    start = time.perf_counter()
+                    res = await client.get(url, headers=headers)
+                    return time.perf_counter() - start, res.status_code
+
+            tasks = [send() for _ in range(options["requests"])]
+            return await asyncio.gather(*tasks)
+
+        start = time.perf_counter()
+        responses = asyncio.run(run())
+        return self._summarize(responses, time.perf_counter() - start)
+
+    def _summarize(self, responses, elapsed):
+        latencies = [latency for latency, status_code in responses]
+        errors = sum(1 for latency, status_code in responses if status_code >= 400)
+        return summarize(latencies, elapsed, errors=errors)
@@ -0,0 +1,75 @@
+import json
+import time
+from django.core.management.base import BaseCommand
+from django.test import Client
+from django.test.utils import override_settings
+from django.urls import reverse
+from rest_framework.authtoken.models import Token
+from core.benchmark import (
+    create_fixtures,
+    format_summary,
+    summarize,
+    in_process_settings,
+)
+
+
+class Command(BaseCommand):
+    """Compare per request overhead of full and lean middleware stacks
+
+    The full stack runs session, CSRF, authentication and message middleware
+    for API requests too, the lean one skips them for LEAN_MIDDLEWARE_PATHS.
+    """
+
+    help = __doc__
+
+    def add_arguments(self, parser):
+        parser.add_argument("--requests", type=int, default=1000)
+        parser.add_argument("--output", help="Save results to JSON file")
+
+    def handle(self, *args, **options):
+        with in_process_settings():
+            user = create_fixtures(recipes_count=1)
+            try:
+                results = self._run_benchmark(user, options["requests"])
+            finally:
+                user.delete()
+
+        if options["output"]:
+            with open(options["output"], "w") as output_file:
+                json.dump(results, output_file, indent=2)
+
+    def _run_benchmark(self, user, requests):
+        token = Token.objects.create(user=user)
+        headers = {"Authorization": f"Token {token.key}"}
+        endpoints = [
+            ("schema", reverse("api-schema")),
+            ("me", reverse("user:me")),
+            ("tag list", reverse("recipe:tag-list")),
+        ]
+        stacks = [("full", []), ("lean", ["/api/"])]
+        results = {}
+        for name, url in endpoints:
+            for stack, lean_paths in stacks:
+                with override_settings(LEAN_MIDDLEWARE_PATHS=lean_paths):
+                    run_name = f"{name} [{stack}]"
+                    results[run_name] = self._run(url, headers, requests)
+                    self.stdout.write(format_summary(run_name, results[run_name]))
+            saved = (
+                results[f"{name} [full]"]["p50_ms"]
+                - results[f"{name} [lean]"]["p50_ms"]
+            )
+            self.stdout.write(f"{name:<34} lean saves {saved:.3f}ms at p50")
+        return results
+
+    def _run(self, url, headers, requests):
+        # New client loads middleware configured by current settings
+        client = Client()
+        client.get(url, headers=headers)
+        latencies = []
+        errors = 0
+        for _ in range(requests):
+            start = time.perf_counter()
+            res = client.get(url, headers=headers)
+            latencies.append(time.perf_counter() - start)
+            errors += res.status_code >= 400
+        return summarize(latencies, sum(latencies), errors=errors)
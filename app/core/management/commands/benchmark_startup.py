@@ -0,0 +1,113 @@
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+from collections import defaultdict
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+# Run in a fresh interpreter, measures what a new worker goes through
+STARTUP_SCRIPT = """
+import json, time
+start = time.perf_counter()
+from django.core.wsgi import get_wsgi_application
+application = get_wsgi_application()
+setup = time.perf_counter() - start
+statuses = []
+environ = {
+    "REQUEST_METHOD": "GET",
+    "PATH_INFO": "/healthz",
+    "SERVER_NAME": "localhost",
+    "SERVER_PORT": "80",
+    "HTTP_HOST": "localhost",
+    "wsgi.url_scheme": "http",
+    "wsgi.input": __import__("io").BytesIO(),
+    "wsgi.errors": __import__("sys").stderr,
+}
+b"".join(application(environ, lambda status, headers: statuses.append(status)))
+first_request = time.perf_counter() - start
+print(json.dumps(
+    {"setup": setup, "first_request": first_request, "status": statuses[0]}
+))
+"""
+
+
+def parse_importtime(output):
+    """Return time (ms) spent importing modules of every top level package
+
+    Only own time of modules is summed, time of their imports is
+    attributed to the packages imported.
+    """
+    totals = defaultdict(float)
+    for line in output.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        own, _, name = line.removeprefix("import time:").split("|")
+        # Skips header line
+        if own.strip().isdigit():
+            totals[name.strip().split(".")[0]] += int(own) / 1000
+    return totals
+
+
+class Command(BaseCommand):
+    """Measure startup of a fresh process up to its first request
+
+    Reports median interpreter + Django setup time and time to first
+    response of /healthz over several runs, and which packages take
+    longest to import (`python -X importtime`).
+    """
+
+    help = __doc__
+
+    def add_arguments(self, parser):
+        parser.add_argument("--runs", type=int, default=5)
+        parser.add_argument("--top", type=int, default=15)
+        parser.add_argument("--output", help="Save results to JSON file")
+
+    def handle(self, *args, **options):
+        runs = [self._run() for _ in range(options["runs"])]
+        results = {
+            metric: round(statistics.median(run[metric] for run in runs), 1)
+            for metric in ("process_ms", "setup_ms", "first_request_ms")
+        }
+        imports = parse_importtime(self._run(importtime=True)["stderr"])
+        top = sorted(imports.items(), key=lambda item: item[1], reverse=True)
+        results["imports_ms"] = {
+            package: round(ms, 1) for package, ms in top[: options["top"]]
+        }
+
+        for metric in ("process_ms", "setup_ms", "first_request_ms"):
+            self.stdout.write(f"{metric:<34} {results[metric]:>9.1f}")
+        self.stdout.write("Slowest imports:")
+        for package, ms in results["imports_ms"].items():
+            self.stdout.write(f"  {package:<32} {ms:>9.1f}")
+        if options["output"]:
+            with open(options["output"], "w") as output_file:
+                json.dump(results, output_file, indent=2)
+
+    def _run(self, importtime=False):
+        command = [sys.executable]
+        if importtime:
+            command += ["-X", "importtime"]
+        start = time.perf_counter()
+        process = subprocess.run(
+            command + ["-c", STARTUP_SCRIPT],
+            cwd=settings.BASE_DIR,
+            env={**os.environ, "ACCESS_LOG": "false"},
+            capture_output=True,
+            text=True,
+        )
+        elapsed = time.perf_counter() - start
+        if process.returncode:
+            raise CommandError(f"Startup failed:\n{process.stderr[-2000:]}")
+        result = json.loads(process.stdout.splitlines()[-1])
+        if not result["status"].startswith("200"):
+            raise CommandError(f"/healthz responded with {result['status']}")
+        return {
+            "process_ms": elapsed * 1000,
+            "setup_ms": result["setup"] * 1000,
+            "first_request_ms": result["first_request"] * 1000,
+            "stderr": process.stderr,
+        }
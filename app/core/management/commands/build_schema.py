@@ -0,0 +1,34 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from core import schema
+
+
+class Command(BaseCommand):
+    """Build OpenAPI schema artifact served at /api/schema/
+
+    With --check fails if the artifact is missing or differs from the
+    schema of current code.
+    """
+
+    help = __doc__
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--check",
+            action="store_true",
+            help="Fail if artifact is stale instead of writing it",
+        )
+
+    def handle(self, *args, **options):
+        path = settings.OPENAPI_SCHEMA_PATH
+        content = schema.generate_schema()
+        version = schema.get_version(content)
+        if options["check"]:
+            if not path.exists() or path.read_bytes() != content:
+                raise CommandError(
+                    f"{path} is stale, run `manage.py build_schema` and commit it"
+                )
+            self.stdout.write(f"Schema {version} is up to date")
+            return
+        path.write_bytes(content)
+        self.stdout.write(self.style.SUCCESS(f"Schema {version} written to {path}"))
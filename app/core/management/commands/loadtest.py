@@ -0,0 +1,65 @@
+import json
+import platform
+from datetime import datetime, timezone
+from django.core.management.base import BaseCommand
+from core import loadtest
+from core.benchmark import format_summary
+from core.management.commands.seed_perf_data import EMAIL_DOMAIN, PASSWORD
+
+
+class Command(BaseCommand):
+    """Load test running API with concurrent clients
+
+    Drives register, token, recipe CRUD, image upload, tag and ingredient
+    endpoints and reports latency percentiles and throughput per endpoint.
+    Clients share an IP address, run the server with THROTTLE_RATE_* set
+    empty to not measure throttling.
+    """
+
+    help = __doc__
+
+    def add_arguments(self, parser):
+        parser.add_argument("url", help="Base URL, e.g. http://localhost:8000")
+        parser.add_argument("--clients", type=int, default=10)
+        parser.add_argument(
+            "--iterations",
+            type=int,
+            default=10,
+            help="Scenario runs per client",
+        )
+        parser.add_argument(
+            "--seeded-users",
+            type=int,
+            default=0,
+            help="Log in as this many users created by seed_perf_data",
+        )
+        parser.add_argument("--timeout", type=float, default=30)
+        parser.add_argument("--output", help="Save results to JSON file")
+
+    def handle(self, *args, **options):
+        credentials = [
+            {"email": f"user{i}@{EMAIL_DOMAIN}", "password": PASSWORD}
+            for i in range(options["seeded_users"])
+        ]
+        endpoints = loadtest.run(
+            options["url"],
+            clients=options["clients"],
+            iterations=options["iterations"],
+            credentials=credentials,
+            timeout=options["timeout"],
+        )
+        for name, summary in endpoints.items():
+            self.stdout.write(format_summary(name, summary))
+
+        if options["output"]:
+            results = {
+                "finished_at": datetime.now(timezone.utc).isoformat(),
+                "python": platform.python_version(),
+                "options": {
+                    name: options[name]
+                    for name in ("url", "clients", "iterations", "seeded_users")
+                },
+                "endpoints": endpoints,
+            }
+            with open(options["output"], "w") as output_file:
+                json.dump(results, output_file, indent=2)
@@ -0,0 +1,61 @@
+from django.core.management.base import BaseCommand, CommandError
+from core import memory
+
+
+class Command(BaseCommand):
+    """Report top allocation sites of tracemalloc snapshots
+
+    With two snapshots (by default two latest in MEMORY_SNAPSHOT_DIR of the
+    worker which dumped the newest one) shows where memory grew between them,
+    with one shows its top allocation sites, like /admin/memory/ does.
+    Snapshots are taken at /admin/memory/.
+    """
+
+    help = __doc__
+
+    def add_arguments(self, parser):
+        parser.add_argument("snapshots", nargs="*", help="At most two paths")
+        parser.add_argument("--pid", type=int, help="Latest snapshots of worker")
+        parser.add_argument(
+            "--group-by",
+            choices=["lineno", "filename", "traceback"],
+            default="lineno",
+        )
+        parser.add_argument("--limit", type=int, default=20)
+
+    def handle(self, *args, **options):
+        paths = options["snapshots"] or self.get_latest_paths(options["pid"])
+        if len(paths) > 2:
+            raise CommandError("Pass at most two snapshots")
+
+        snapshots = [memory.load_snapshot(path) for path in paths]
+        old_snapshot = snapshots[0] if len(snapshots) == 2 else None
+        top_stats = memory.get_top_stats(
+            snapshots[-1],
+            old_snapshot,
+            group_by=options["group_by"],
+            limit=options["limit"],
+        )
+        if old_snapshot is None:
+            self.stdout.write(f"Top allocation sites of {paths[0]}")
+        else:
+            self.stdout.write(f"Top growth from {paths[0]} to {paths[1]}")
+        for stat in top_stats:
+            self.stdout.write(str(stat))
+            if options["group_by"] == "traceback":
+                for line in stat.traceback.format():
+                    self.stdout.write(line)
+
+    def get_latest_paths(self, pid):
+        """Return two latest snapshots of `pid`, or of newest worker"""
+        if pid is not None:
+            paths = memory.list_snapshots(pid)[-2:]
+            if not paths:
+                raise CommandError(f"No snapshots of worker {pid} found")
+            return paths
+        all_paths = memory.list_snapshots()
+        if not all_paths:
+            raise CommandError("No snapshots found")
+        # Heaps of different workers aren't comparable
+        pid = memory.get_snapshot_pid(all_paths[-1])
+        return memory.list_snapshots(pid)[-2:]
@@ -0,0 +1,154 @@
+import functools
+import random
+import time
+from decimal import Decimal
+from django.core.management.base import BaseCommand
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.db import transaction
+from core.models import Recipe, Tag, Ingredient
+
+EMAIL_DOMAIN = "perf.example.com"
+PASSWORD = "perf-password"
+
+
+@functools.lru_cache
+def zipf_weights(count, exponent=1.1):
+    """Return weights making first items far more popular than the rest"""
+    return [1 / rank**exponent for rank in range(1, count + 1)]
+
+
+class Command(BaseCommand):
+    """Seed database with synthetic users, recipes, tags and ingredients
+
+    Recipes per user and tag/ingredient popularity follow a Zipf-like
+    distribution, so a few users own most recipes like in real data.
+    Same `--seed` always generates same dataset.
+    """
+
+    help = __doc__
+
+    def add_arguments(self, parser):
+        parser.add_argument("--users", type=int, default=100)
+        parser.add_argument("--recipes", type=int, default=5000)
+        parser.add_argument("--tags", type=int, default=20, help="Per user")
+        parser.add_argument("--ingredients", type=int, default=50, help="Per user")
+        parser.add_argument(
+            "--max-links",
+            type=int,
+            default=8,
+            help="Max tags and ingredients per recipe",
+        )
+        parser.add_argument("--seed", type=int, default=42)
+        parser.add_argument("--batch-size", type=int, default=1000)
+        parser.add_argument(
+            "--clear",
+            action="store_true",
+            help="Delete previously seeded data first",
+        )
+
+    def handle(self, *args, **options):
+        start = time.perf_counter()
+        self.rng = random.Random(options["seed"])
+        self.batch_size = options["batch_size"]
+        if options["clear"]:
+            deleted, _ = self._get_seeded_users().delete()
+            self.stdout.write(f"Deleted {deleted} objects")
+
+        with transaction.atomic():
+            counts = self._seed(options)
+
+        elapsed = time.perf_counter() - start
+        summary = ", ".join(f"{count} {name}" for name, count in counts.items())
+        self.stdout.write(self.style.SUCCESS(f"Created {summary} in {elapsed:.1f}s"))
+
+    def _get_seeded_users(self):
+        return get_user_model().objects.filter(email__endswith=f"@{EMAIL_DOMAIN}")
+
+    def _seed(self, options):
+        users = self._create_users(options["users"])
+        tags = self._create_attrs(Tag, "tag", users, options["tags"])
+        ingredients = self._create_attrs(
+            Ingredient, "ingredient", users, options["ingredients"]
+        )
+        recipes = self._create_recipes(users, options["recipes"])
+        max_links = options["max_links"]
+        recipe_tags = self._link(Recipe.tags.through, "tag", recipes, tags, max_links)
+        recipe_ingredients = self._link(
+            Recipe.ingredients.through,
+            "ingredient",
+            recipes,
+            ingredients,
+            max_links,
+        )
+        return {
+            "users": len(users),
+            "tags": sum(len(objs) for objs in tags.values()),
+            "ingredients": sum(len(objs) for objs in ingredients.values()),
+            "recipes": len(recipes),
+            "recipe tags": recipe_tags,
+            "recipe ingredients": recipe_ingredients,
+        }
+
+    def _create_users(self, count):
+        # Hashing is slow by design, so every user shares one hash
+        password = make_password(PASSWORD)
+        offset = self._get_seeded_users().count()
+        users = (
+            get_user_model()(
+                email=f"user{offset + i}@{EMAIL_DOMAIN}",
+                name=f"Perf user {offset + i}",
+                password=password,
+            )
+            for i in range(count)
+        )
+        return get_user_model().objects.bulk_create(users, self.batch_size)
+
+    def _create_attrs(self, model, name, users, count):
+        """Create `count` objects for every user, return them by user id"""
+        objs = model.objects.bulk_create(
+            (
+                model(user=user, name=f"{name} {i}")
+                for user in users
+                for i in range(count)
+            ),
+            self.batch_size,
+        )
+        objs_by_user = {user.id: [] for user in users}
+        for obj in objs:
+            objs_by_user[obj.user_id].append(obj)
+        return objs_by_user
+
+    def _create_recipes(self, users, count):
+        owners = self.rng.choices(users, zipf_weights(len(users)), k=count)
+        recipes = (
+            Recipe(
+                user=owner,
+                title=f"Recipe {i}",
+                time_minutes=Decimal(self.rng.randint(5, 1800)) / 10,
+                price=Decimal(self.rng.randint(100, 99999)) / 100,
+                description="Synthetic recipe " * self.rng.randint(1, 30),
+                link=f"https://example.com/recipes/{i}",
+            )
+            for i, owner in enumerate(owners)
+        )
+        return Recipe.objects.bulk_create(recipes, self.batch_size)
+
+    def _link(self, through, name, recipes, objs_by_user, max_links):
+        """Link recipes to popular objects of their owner"""
+        links = []
+        for recipe in recipes:
+            objs = objs_by_user[recipe.user_id]
+            if not objs:
+                continue
+            picked = self.rng.choices(
+                objs,
+                zipf_weights(len(objs)),
+                k=self.rng.randint(0, max_links),
+            )
+            links.extend(
+                through(recipe_id=recipe.id, **{f"{name}_id": obj.id})
+                for obj in {obj.id: obj for obj in picked}.values()
+            )
+        through.objects.bulk_create(links, self.batch_size)
+        return len(links)
@@ -1,22 +1,85 @@
-from django.core.management.base import BaseCommand
+import math
+import random
+import time
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
 from django.db.utils import OperationalError
 from psycopg2 import OperationalError as Psycopg2Error
-import time
+from core import health
 
 
 class Command(BaseCommand):
-    """Django command to wait for database"""
+    """Django command to wait for database
+
+    Probes every database with a connection and trivial query, retrying
+    with exponential backoff and jitter until the deadline. A probe can't
+    take longer than the time left.
+    """
+
+    help = __doc__
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--database",
+            action="append",
+            dest="databases",
+            help="Alias of database to wait for, may be repeated (default: default)",
+        )
+        parser.add_argument(
+            "--timeout",
+            type=float,
+            default=60,
+            help="Seconds to wait for all databases before failing",
+        )
+        parser.add_argument("--initial-delay", type=float, default=0.1)
+        parser.add_argument("--max-delay", type=float, default=5)
 
     def handle(self, *args, **options):
         self.stdout.write("Waiting for db...")
-        is_db_ready = False
+        pending = list(options["databases"] or ["default"])
+        deadline = time.monotonic() + options["timeout"]
+        delay = options["initial_delay"]
+        remaining = options["timeout"]
 
-        while is_db_ready is False:
-            try:
-                self.check(databases=["default"])
-                is_db_ready = True
-            except (Psycopg2Error, OperationalError):
-                self.stdout.write("Database is unavailable, wating for 2 seconds..")
-                time.sleep(2)
+        while True:
+            pending = [
+                alias for alias in pending if not self._is_ready(alias, remaining)
+            ]
+            if not pending:
+                break
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise CommandError(
+                    f"Database {', '.join(pending)} unavailable after "
+                    f"{options['timeout']}s"
+                )
+            # Jitter keeps replicas started together from probing in lockstep
+            sleep = min(random.uniform(delay / 2, delay), remaining)
+            self.stdout.write(
+                f"Database {', '.join(pending)} unavailable, "
+                f"waiting for {sleep:.2f} seconds.."
+            )
+            time.sleep(sleep)
+            remaining -= sleep
+            delay = min(delay * 2, options["max_delay"])
 
         self.stdout.write(self.style.SUCCESS("Database is available!"))
+
+    def _is_ready(self, alias, timeout):
+        connection = connections[alias]
+        options = connection.settings_dict["OPTIONS"]
+        if connection.vendor == "postgresql":
+            # Without it libpq waits for the OS TCP timeout, often minutes
+            connect_timeout = min(timeout, options.get("connect_timeout", timeout))
+            connection.settings_dict["OPTIONS"] = {
+                **options,
+                "connect_timeout": max(math.ceil(connect_timeout), 1),
+            }
+        try:
+            health.check_database(alias)
+        except (Psycopg2Error, OperationalError):
+            return False
+        finally:
+            connection.close()
+            connection.settings_dict["OPTIONS"] = options
+        return True
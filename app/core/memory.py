@@ -0,0 +1,84 @@
+"""Diagnostics of worker memory growth
+
+Tracing is turned on in a running worker from the admin, snapshots are
+dumped to MEMORY_SNAPSHOT_DIR and can then be compared there or with
+`manage.py memory_report`.
+"""
+import os
+import resource
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+from django.conf import settings
+
+SNAPSHOT_SUFFIX = ".tracemalloc"
+# Allocations made by tracing and importing itself are noise
+SNAPSHOT_FILTERS = (
+    tracemalloc.Filter(False, tracemalloc.__file__),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>"),
+    tracemalloc.Filter(False, "<unknown>"),
+)
+
+
+def get_peak_rss():
+    """Return peak resident set size of this process in bytes"""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def start():
+    """Start tracing allocations if not tracing yet"""
+    if not tracemalloc.is_tracing():
+        tracemalloc.start(settings.TRACEMALLOC_FRAMES)
+
+
+def stop():
+    """Stop tracing and free traces"""
+    tracemalloc.stop()
+
+
+def take_snapshot():
+    """Dump snapshot of traced allocations and return its path
+
+    Only newest MEMORY_SNAPSHOT_MAX_FILES snapshots of each worker are kept.
+    """
+    snapshot = tracemalloc.take_snapshot().filter_traces(SNAPSHOT_FILTERS)
+    directory = Path(settings.MEMORY_SNAPSHOT_DIR)
+    directory.mkdir(parents=True, exist_ok=True)
+    pid = os.getpid()
+    path = directory / f"{pid}-{time.time_ns()}{SNAPSHOT_SUFFIX}"
+    snapshot.dump(str(path))
+    for old_path in list_snapshots(pid)[: -settings.MEMORY_SNAPSHOT_MAX_FILES]:
+        old_path.unlink(missing_ok=True)
+    return path
+
+
+def list_snapshots(pid=None):
+    """Return snapshot paths, of one worker if `pid` given, oldest first"""
+    directory = Path(settings.MEMORY_SNAPSHOT_DIR)
+    pattern = f"{pid or '*'}-*{SNAPSHOT_SUFFIX}"
+    return sorted(
+        directory.glob(pattern),
+        key=lambda path: int(path.stem.split("-")[1]),
+    )
+
+
+def get_snapshot_pid(path):
+    """Return pid of worker which dumped snapshot at `path`"""
+    return int(Path(path).stem.split("-")[0])
+
+
+def get_top_stats(snapshot, old_snapshot=None, group_by="lineno", limit=20):
+    """Return top allocation sites, or top growth since `old_snapshot`"""
+    if old_snapshot is None:
+        stats = snapshot.statistics(group_by)
+    else:
+        stats = snapshot.compare_to(old_snapshot, group_by)
+    return stats[:limit]
+
+
+def load_snapshot(path):
+    return tracemalloc.Snapshot.load(str(path))
@@ -0,0 +1,273 @@
+"""Prometheus metrics of API requests
+
+Metrics of all worker processes are aggregated when PROMETHEUS_MULTIPROC_DIR
+environment variable points to a directory shared by the workers.
+"""
+import contextvars
+import os
+import threading
+import time
+from core import memory, tracing
+from core.db.wrappers import async_execute_wrapper, execute_wrapper
+from prometheus_client import (
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    multiprocess,
+)
+
+UNMATCHED_ROUTE = "unmatched"
+
+REQUESTS = Counter(
+    "api_requests_total",
+    "Requests by route, method and response status",
+    ["route", "method", "status"],
+)
+REQUEST_DURATION = Histogram(
+    "api_request_duration_seconds",
+    "Time spent handling request",
+    ["route", "method"],
+)
+REQUEST_DB_QUERIES = Histogram(
+    "api_request_db_queries",
+    "Database queries made while handling request",
+    ["route", "method"],
+    buckets=(0, 1, 2, 3, 5, 10, 20, 50, 100, 200),
+)
+REQUEST_DB_DURATION = Histogram(
+    "api_request_db_duration_seconds",
+    "Time spent in database queries while handling request",
+    ["route", "method"],
+)
+REQUEST_SERIALIZER_DURATION = Histogram(
+    "api_request_serializer_duration_seconds",
+    "Time spent serializing instances while handling request",
+    ["route", "method"],
+)
+RESPONSE_SIZE = Histogram(
+    "api_response_size_bytes",
+    "Size of response body",
+    ["route", "method"],
+    buckets=(100, 1_000, 10_000, 100_000, 1_000_000, 10_000_000),
+)
+DB_POOL_WAIT = Histogram(
+    "db_pool_wait_seconds",
+    "Time spent getting connection from the pool",
+    ["database"],
+    buckets=(0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1, 5, 30),
+)
+
+REQUEST_PEAK_RSS_GROWTH = Counter(
+    "api_request_peak_rss_growth_bytes",
+    "Growth of worker peak RSS while handling request, routes with steadily "
+    "growing totals likely leak. Peak RSS is per process, so only requests "
+    "the worker handled alone are counted",
+    ["route", "method"],
+)
+ACCESS_LOG_DROPPED = Counter(
+    "access_log_dropped",
+    "Access log records dropped because the log queue was full",
+)
+TRACES_DROPPED = Counter(
+    "traces_dropped",
+    "Sampled traces dropped because the export queue was full",
+)
+THROTTLED = Counter(
+    "api_throttled_requests",
+    "Requests rejected by throttle of a scope",
+    ["scope"],
+)
+CONCURRENCY_LIMIT = Gauge(
+    "api_concurrency_limit",
+    "Adaptive limit of concurrent requests, summed over workers",
+    multiprocess_mode="livesum",
+)
+CONCURRENCY_INFLIGHT = Gauge(
+    "api_concurrency_inflight",
+    "Requests being handled under the concurrency limit",
+    multiprocess_mode="livesum",
+)
+REQUESTS_SHED = Counter(
+    "api_requests_shed",
+    "Requests rejected because the concurrency limit was reached",
+    ["route", "priority"],
+)
+REQUESTS_DEADLINE_EXCEEDED = Counter(
+    "api_requests_deadline_exceeded",
+    "Requests whose database work was canceled at their deadline",
+    ["route", "method"],
+)
+# Set by hooks of app.gunicorn_conf, have a pid label for every worker
+WORKER_STARTED = Gauge(
+    "worker_start_time_seconds",
+    "Start time of worker process",
+    multiprocess_mode="liveall",
+)
+WORKER_REQUESTS = Gauge(
+    "worker_requests",
+    "Requests handled by worker process, it's recycled after max_requests",
+    multiprocess_mode="liveall",
+)
+WORKER_EXITS = Counter(
+    "worker_exits",
+    "Worker processes that exited, e.g. recycled or killed on timeout",
+)
+
+_request_stats = contextvars.ContextVar("request_stats", default=None)
+
+
+class RequestStats:
+    """Counters collected while handling one request"""
+
+    __slots__ = (
+        "queries",
+        "db_seconds",
+        "serializer_seconds",
+        "serializing",
+        "peak_rss_growth",
+    )
+
+    def __init__(self):
+        self.queries = 0
+        self.db_seconds = 0.0
+        self.serializer_seconds = 0.0
+        self.serializing = False
+        self.peak_rss_growth = 0
+
+    def record_query(self, execute, sql, params, many, context):
+        """Database execute wrapper counting queries and their time"""
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries += 1
+            self.db_seconds += time.perf_counter() - start
+
+
+class RunningRequests:
+    """Count requests running in this process to tell which ran alone"""
+
+    def __init__(self):
+        self.running = 0
+        self.started = 0
+        self._lock = threading.Lock()
+
+    def start(self):
+        """Return token of the request for `finish`"""
+        with self._lock:
+            self.running += 1
+            self.started += 1
+            return self.started if self.running == 1 else None
+
+    def finish(self, token):
+        """Return whether no other request ran since the request started"""
+        with self._lock:
+            self.running -= 1
+            return token is not None and token == self.started
+
+
+_running_requests = RunningRequests()
+
+
+def get_request_stats():
+    """Return stats of current request or None outside of request"""
+    return _request_stats.get()
+
+
+class InstrumentedSerializerMixin:
+    """Add serializer's `to_representation` time to request stats and trace"""
+
+    def to_representation(self, instance):
+        stats = _request_stats.get()
+        # Nested serializers are already measured by the outermost one
+        if stats is None or stats.serializing:
+            return super().to_representation(instance)
+        stats.serializing = True
+        start = time.perf_counter()
+        try:
+            with tracing.span("serialize", serializer=type(self).__name__):
+                return super().to_representation(instance)
+        finally:
+            stats.serializer_seconds += time.perf_counter() - start
+            stats.serializing = False
+
+
+def get_route(request):
+    """Return low cardinality name of route the request was resolved to"""
+    resolver_match = getattr(request, "resolver_match", None)
+    if resolver_match is None:
+        return UNMATCHED_ROUTE
+    return resolver_match.view_name
+
+
+def get_route_setting(request, values, default):
+    """Return value for route of request from a setting mapping routes
+
+    Keys are route names, optionally prefixed by method, e.g. "GET user:me".
+    """
+    route = get_route(request)
+    return values.get(f"{request.method} {route}", values.get(route, default))
+
+
+def observe_request(request, response, duration, stats):
+    route = get_route(request)
+    method = request.method
+    REQUESTS.labels(route, method, response.status_code).inc()
+    REQUEST_DURATION.labels(route, method).observe(duration)
+    REQUEST_DB_QUERIES.labels(route, method).observe(stats.queries)
+    REQUEST_DB_DURATION.labels(route, method).observe(stats.db_seconds)
+    REQUEST_SERIALIZER_DURATION.labels(route, method).observe(stats.serializer_seconds)
+    REQUEST_PEAK_RSS_GROWTH.labels(route, method).inc(stats.peak_rss_growth)
+    if not response.streaming:
+        RESPONSE_SIZE.labels(route, method).observe(len(response.content))
+
+
+def track_request(get_response, request):
+    """Handle request collecting its stats and record them as metrics"""
+    stats = RequestStats()
+    token = _request_stats.set(stats)
+    running_token = _running_requests.start()
+    peak_rss = memory.get_peak_rss()
+    start = time.perf_counter()
+    try:
+        with execute_wrapper(stats.record_query):
+            response = get_response(request)
+    finally:
+        _request_stats.reset(token)
+        ran_alone = _running_requests.finish(running_token)
+    # Peak is per process, growth during concurrent requests can't be
+    # attributed to one of them
+    if ran_alone:
+        stats.peak_rss_growth = memory.get_peak_rss() - peak_rss
+    observe_request(request, response, time.perf_counter() - start, stats)
+    return response
+
+
+async def atrack_request(get_response, request):
+    """Async version of `track_request` for async `get_response`"""
+    stats = RequestStats()
+    token = _request_stats.set(stats)
+    running_token = _running_requests.start()
+    peak_rss = memory.get_peak_rss()
+    start = time.perf_counter()
+    try:
+        async with async_execute_wrapper(stats.record_query):
+            response = await get_response(request)
+    finally:
+        _request_stats.reset(token)
+        ran_alone = _running_requests.finish(running_token)
+    if ran_alone:
+        stats.peak_rss_growth = memory.get_peak_rss() - peak_rss
+    observe_request(request, response, time.perf_counter() - start, stats)
+    return response
+
+
+def get_registry():
+    """Return registry with metrics of every worker process"""
+    if "PROMETHEUS_MULTIPROC_DIR" not in os.environ:
+        return REGISTRY
+    registry = CollectorRegistry()
+    multiprocess.MultiProcessCollector(registry)
+    return registry
@@ -0,0 +1,441 @@
+import logging
+import time
+from contextlib import AsyncExitStack, ExitStack
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.contrib.auth.middleware import AuthenticationMiddleware
+from django.contrib.messages.middleware import MessageMiddleware
+from django.contrib.sessions.middleware import SessionMiddleware
+from django.core.exceptions import MiddlewareNotUsed
+from django.http import JsonResponse
+from django.middleware.common import CommonMiddleware
+from django.middleware.csrf import CsrfViewMiddleware
+from django.db.utils import OperationalError
+from core import compression, concurrency, deadlines, metrics, profiling, tracing
+from core.db import routers
+from core.db.nplusone import NPlusOneError, adetect_n_plus_one, detect_n_plus_one
+from core.db.wrappers import async_execute_wrapper, execute_wrapper
+
+logger = logging.getLogger(__name__)
+access_logger = logging.getLogger("core.access")
+
+SAFE_METHODS = ("GET", "HEAD", "OPTIONS")
+# Responses telling that the worker or its database can't keep up
+OVERLOADED_STATUSES = (503, 504)
+
+
+class AsyncCapableMiddleware:
+    """Base of middleware running natively in sync and async stacks
+
+    In an async stack (ASGI) `__call__` of subclasses returns `__acall__`
+    coroutine, so Django doesn't run the rest of the stack in a thread.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+
+class LeanPathMixin:
+    """Skip middleware for paths in LEAN_MIDDLEWARE_PATHS
+
+    Subclasses stay subclasses of the Django middleware, so checks of
+    apps requiring it (e.g. admin) still pass.
+    """
+
+    def __init__(self, get_response):
+        super().__init__(get_response)
+        self.lean_paths = tuple(settings.LEAN_MIDDLEWARE_PATHS)
+
+    def is_lean(self, request):
+        return bool(self.lean_paths) and request.path_info.startswith(self.lean_paths)
+
+    def __call__(self, request):
+        if self.is_lean(request):
+            return self.get_response(request)
+        return super().__call__(request)
+
+
+class LeanSessionMiddleware(LeanPathMixin, SessionMiddleware):
+    pass
+
+
+class LeanCsrfViewMiddleware(LeanPathMixin, CsrfViewMiddleware):
+    def process_view(self, request, callback, callback_args, callback_kwargs):
+        # Called by the handler, not by __call__
+        if self.is_lean(request):
+            return None
+        return super().process_view(request, callback, callback_args, callback_kwargs)
+
+
+class LeanAuthenticationMiddleware(LeanPathMixin, AuthenticationMiddleware):
+    pass
+
+
+class LeanMessageMiddleware(LeanPathMixin, MessageMiddleware):
+    pass
+
+
+class ProbeCommonMiddleware(CommonMiddleware):
+    """CommonMiddleware not validating Host of health probes
+
+    Orchestrators send the pod IP address as Host, which isn't one of
+    ALLOWED_HOSTS. Probes are answered without building any URL from Host.
+    """
+
+    def __init__(self, get_response):
+        super().__init__(get_response)
+        self.probe_paths = frozenset(settings.HEALTH_CHECK_PATHS)
+
+    def __call__(self, request):
+        if request.path_info in self.probe_paths:
+            return self.get_response(request)
+        return super().__call__(request)
+
+
+class ConcurrencyLimitMiddleware(AsyncCapableMiddleware):
+    """Reject requests over the adaptive concurrency limit with 503
+
+    Enabled by CONCURRENCY_LIMIT setting. Rejecting happens after URL
+    resolution, so the limit applies by priority of the route.
+    """
+
+    def __init__(self, get_response):
+        if not settings.CONCURRENCY_LIMIT:
+            raise MiddlewareNotUsed
+        super().__init__(get_response)
+        self.limiter = concurrency.get_limiter()
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        response = None
+        try:
+            response = self.get_response(request)
+            return response
+        finally:
+            self._release(request, response)
+
+    async def __acall__(self, request):
+        response = None
+        try:
+            response = await self.get_response(request)
+            return response
+        finally:
+            self._release(request, response)
+
+    def _release(self, request, response):
+        started = getattr(request, "concurrency_started", None)
+        if started is not None:
+            self.limiter.release(
+                time.perf_counter() - started,
+                overloaded=response is None
+                or response.status_code in OVERLOADED_STATUSES,
+            )
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        priority = concurrency.get_priority(request)
+        if not self.limiter.acquire(priority):
+            metrics.REQUESTS_SHED.labels(metrics.get_route(request), priority).inc()
+            response = JsonResponse(
+                {"detail": "Server is overloaded, try again later."}, status=503
+            )
+            response["Retry-After"] = "1"
+            # Counted by REQUESTS_SHED, logging each one would flood logs
+            # exactly when the worker is overloaded
+            response._has_been_logged = True
+            return response
+        request.concurrency_started = time.perf_counter()
+        return None
+
+
+class DeadlineMiddleware(AsyncCapableMiddleware):
+    """Cancel database work of requests past their deadline, return 504
+
+    Must be the last middleware, so wrappers of others (e.g. N+1 detection)
+    see statements without the timeout, and the replica retry doesn't take
+    a canceled statement for a failed replica.
+    """
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        with deadlines.track() as request.deadline:
+            return self.get_response(request)
+
+    async def __acall__(self, request):
+        async with deadlines.atrack() as request.deadline:
+            return await self.get_response(request)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        request.deadline.start(deadlines.get_timeout(request))
+        return None
+
+    def process_exception(self, request, exception):
+        deadline = getattr(request, "deadline", None)
+        if deadline is None or deadline.expires_at is None:
+            return None
+        if not deadlines.is_deadline_error(exception):
+            return None
+        route = metrics.get_route(request)
+        metrics.REQUESTS_DEADLINE_EXCEEDED.labels(route, request.method).inc()
+        return JsonResponse(
+            {"detail": "Request took too long, try again later."}, status=504
+        )
+
+
+class ReplicaRoutingMiddleware(AsyncCapableMiddleware):
+    """Route reads of safe requests to replicas for views allowing it
+
+    Views opt in with `replica_reads = True`. Clients get pinned to primary
+    for a short time after a successful write, so they read their own writes.
+    """
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        request.db_routing, token = routers.start_routing()
+        try:
+            response = self.get_response(request)
+        finally:
+            routers.stop_routing(token)
+
+        if self.is_successful_write(request, response):
+            self.pin_client(request)
+        return response
+
+    async def __acall__(self, request):
+        request.db_routing, token = routers.start_routing()
+        try:
+            response = await self.get_response(request)
+        finally:
+            routers.stop_routing(token)
+
+        if self.is_successful_write(request, response):
+            await sync_to_async(self.pin_client)(request)
+        return response
+
+    def is_successful_write(self, request, response):
+        return request.method not in SAFE_METHODS and response.status_code < 400
+
+    def pin_client(self, request):
+        client_key = routers.get_client_key(request)
+        if client_key is not None:
+            routers.pin_to_primary(client_key)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        view_class = getattr(view_func, "cls", None)
+        if request.method not in SAFE_METHODS:
+            return None
+        if not getattr(view_class, "replica_reads", False):
+            return None
+        client_key = routers.get_client_key(request)
+        if client_key is not None and routers.is_pinned_to_primary(client_key):
+            return None
+        request.db_routing.use_replica = True
+        request.db_routing_view = (view_func, view_args, view_kwargs)
+        return None
+
+    def process_exception(self, request, exception):
+        routing = getattr(request, "db_routing", None)
+        if routing is None or routing.alias is None:
+            return None
+        if not isinstance(exception, OperationalError):
+            return None
+        # Replica failed mid-request, safe request can be run again on primary
+        routers.mark_replica_down(routing.alias)
+        routing.use_replica = False
+        routing.alias = None
+        view_func, view_args, view_kwargs = request.db_routing_view
+        return view_func(request, *view_args, **view_kwargs)
+
+
+class MetricsMiddleware(AsyncCapableMiddleware):
+    """Record per route latency, DB and serializer time and response size"""
+
+    def __call__(self, request):
+        if self.async_mode:
+            return metrics.atrack_request(self.get_response, request)
+        return metrics.track_request(self.get_response, request)
+
+
+class CompressionMiddleware(AsyncCapableMiddleware):
+    """Compress API responses with gzip, brotli or zstd negotiated with client"""
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        response = self.get_response(request)
+        return compression.compress_response(request, response)
+
+    async def __acall__(self, request):
+        response = await self.get_response(request)
+        return compression.compress_response(request, response)
+
+
+class NPlusOneMiddleware(AsyncCapableMiddleware):
+    """Report requests making N+1 queries
+
+    Enabled by NPLUSONE_DETECTION setting. Logs a warning, or raises
+    NPlusOneError when NPLUSONE_RAISE is set (e.g. in tests).
+    """
+
+    def __init__(self, get_response):
+        if not settings.NPLUSONE_DETECTION:
+            raise MiddlewareNotUsed
+        super().__init__(get_response)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        with detect_n_plus_one() as detector:
+            response = self.get_response(request)
+        self.report(request, detector)
+        return response
+
+    async def __acall__(self, request):
+        async with adetect_n_plus_one() as detector:
+            response = await self.get_response(request)
+        self.report(request, detector)
+        return response
+
+    def report(self, request, detector):
+        report = detector.get_report()
+        if report:
+            message = f"{request.method} {request.path}: {report}"
+            if settings.NPLUSONE_RAISE:
+                raise NPlusOneError(message)
+            logger.warning(message)
+
+
+class ProfilerMiddleware(AsyncCapableMiddleware):
+    """Sample stacks of a share of requests into flamegraph-ready files
+
+    Requests sending `X-Profile-Token: <PROFILER_TOKEN>` are always profiled.
+    """
+
+    def __init__(self, get_response):
+        if not (settings.PROFILER_SAMPLE_RATE or settings.PROFILER_TOKEN):
+            raise MiddlewareNotUsed
+        super().__init__(get_response)
+
+    def __call__(self, request):
+        if not profiling.should_profile(request):
+            return self.get_response(request)
+        if self.async_mode:
+            return profiling.aprofile_request(self.get_response, request)
+        return profiling.profile_request(self.get_response, request)
+
+
+class TracingMiddleware(AsyncCapableMiddleware):
+    """Give every request an id and trace a sample of requests
+
+    Id sent by client in `X-Request-ID` is kept and returned in response.
+    """
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        request.request_id = tracing.get_request_id(request)
+        if tracing.is_sampled():
+            response = self._trace(request)
+        else:
+            response = self.get_response(request)
+        response[tracing.REQUEST_ID_HEADER] = request.request_id
+        return response
+
+    async def __acall__(self, request):
+        request.request_id = tracing.get_request_id(request)
+        if tracing.is_sampled():
+            response = await self._atrace(request)
+        else:
+            response = await self.get_response(request)
+        response[tracing.REQUEST_ID_HEADER] = request.request_id
+        return response
+
+    def _trace(self, request):
+        token = tracing.start_trace(request.request_id)
+        try:
+            with ExitStack() as stack:
+                stack.enter_context(
+                    tracing.span("request", method=request.method, path=request.path)
+                )
+                stack.enter_context(execute_wrapper(tracing.trace_query))
+                return self.get_response(request)
+        finally:
+            tracing.finish_trace(token)
+
+    async def _atrace(self, request):
+        token = tracing.start_trace(request.request_id)
+        try:
+            async with AsyncExitStack() as stack:
+                stack.enter_context(
+                    tracing.span("request", method=request.method, path=request.path)
+                )
+                await stack.enter_async_context(
+                    async_execute_wrapper(tracing.trace_query)
+                )
+                return await self.get_response(request)
+        finally:
+            tracing.finish_trace(token)
+
+    def process_template_response(self, request, response):
+        # DRF responses are rendered right after this hook
+        started = tracing.start_span("render")
+        if started is not None:
+            response.add_post_render_callback(lambda _: tracing.end_span(started))
+        return response
+
+
+class AccessLogMiddleware(AsyncCapableMiddleware):
+    """Log route, user, status, latency, queries and size of every request
+
+    Must come after MetricsMiddleware, which counts the queries.
+    """
+
+    def __init__(self, get_response):
+        if not settings.ACCESS_LOG:
+            raise MiddlewareNotUsed
+        super().__init__(get_response)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        start = time.perf_counter()
+        response = self.get_response(request)
+        self.log(request, response, time.perf_counter() - start)
+        return response
+
+    async def __acall__(self, request):
+        start = time.perf_counter()
+        response = await self.get_response(request)
+        # Lazy `request.user` of session authentication queries the database
+        await sync_to_async(self.log)(request, response, time.perf_counter() - start)
+        return response
+
+    def log(self, request, response, latency):
+        stats = metrics.get_request_stats()
+        user = getattr(request, "user", None)
+        fields = {
+            "request_id": getattr(request, "request_id", None),
+            "method": request.method,
+            "path": request.path,
+            "route": metrics.get_route(request),
+            "user_id": user.pk if user is not None and user.is_authenticated else None,
+            "status": response.status_code,
+            "latency_ms": round(latency * 1000, 3),
+            "queries": stats.queries if stats is not None else None,
+            "bytes": None if response.streaming else len(response.content),
+        }
+        access_logger.info(
+            "%s %s %s",
+            request.method,
+            request.path,
+            response.status_code,
+            extra={"fields": fields},
+        )
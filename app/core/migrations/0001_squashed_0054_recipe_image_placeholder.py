@@ -0,0 +1,83 @@
+# Generated by Django 4.2.30 on 2026-10-19 09:49
+
+import core.models
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    replaces = [('core', '0001_initial'), ('core', '0002_remove_user_is_staff'), ('core', '0003_user_is_staff'), ('core', '0004_remove_user_is_staff'), ('core', '0005_remove_user_groups_remove_user_is_superuser_and_more'), ('core', '0006_user_groups_user_is_staff_user_is_superuser_and_more'), ('core', '0007_remove_user_is_active_remove_user_is_staff'), ('core', '0008_user_is_active_user_is_staff'), ('core', '0009_remove_user_is_active'), ('core', '0010_user_is_active'), ('core', '0011_remove_user_is_staff_user_is_stiffler'), ('core', '0012_remove_user_is_stiffler_user_is_staff'), ('core', '0013_remove_user_is_active'), ('core', '0014_remove_user_is_staff'), ('core', '0015_user_is_active_user_is_staff'), ('core', '0016_remove_user_is_staff'), ('core', '0017_remove_user_is_active'), ('core', '0018_user_is_staff'), ('core', '0019_user_is_active'), ('core', '0020_remove_user_is_active'), ('core', '0021_user_is_active'), ('core', '0022_remove_user_groups_remove_user_user_permissions_and_more'), ('core', '0023_user_groups_user_user_permissions_and_more'), ('core', '0024_alter_user_name_recipe'), ('core', '0025_alter_recipe_time_minutes_alter_user_name'), ('core', '0026_alter_recipe_time_minutes'), ('core', '0027_alter_recipe_price_alter_recipe_time_minutes'), ('core', '0028_tag'), ('core', '0029_tag_days'), ('core', '0030_alter_tag_days'), ('core', '0031_remove_tag_days'), ('core', '0032_recipe_tag'), ('core', '0033_alter_recipe_tag'), ('core', '0034_tag_description'), ('core', '0035_remove_tag_description'), ('core', '0036_rename_tag_recipe_tags'), ('core', '0037_ingredient_recipe_ingredients'), ('core', '0038_alter_recipe_ingredients_alter_recipe_tags'), ('core', '0039_recipe_image'), ('core', '0040_alter_recipe_tags'), ('core', '0041_alter_recipe_tags'), ('core', '0042_alter_recipe_image'), ('core', '0043_alter_recipe_image'), ('core', '0044_alter_recipe_image'), ('core', '0045_alter_recipe_image'), ('core', '0046_alter_recipe_image'), ('core', '0047_alter_recipe_image'), ('core', '0048_alter_recipe_image'), ('core', '0049_alter_recipe_image'), ('core', '0050_alter_recipe_image'), ('core', '0051_alter_recipe_tags'), ('core', '0052_alter_recipe_tags'), ('core', '0053_recipeimage'), ('core', '0054_recipe_image_placeholder')]
+
+    initial = True
+
+    dependencies = [
+        ('auth', '0012_alter_user_first_name_max_length'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='User',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('password', models.CharField(max_length=128, verbose_name='password')),
+                ('last_login', models.DateTimeField(blank=True, null=True, verbose_name='last login')),
+                ('email', models.EmailField(max_length=255, unique=True)),
+                ('name', models.CharField(max_length=255)),
+                ('is_superuser', models.BooleanField(default=False, help_text='Designates that this user has all permissions without explicitly assigning them.', verbose_name='superuser status')),
+                ('is_staff', models.BooleanField(default=False)),
+                ('is_active', models.BooleanField(default=True)),
+                ('groups', models.ManyToManyField(blank=True, help_text='The groups this user belongs to. A user will get all permissions granted to each of their groups.', related_name='user_set', related_query_name='user', to='auth.group', verbose_name='groups')),
+                ('user_permissions', models.ManyToManyField(blank=True, help_text='Specific permissions for this user.', related_name='user_set', related_query_name='user', to='auth.permission', verbose_name='user permissions')),
+            ],
+            options={
+                'abstract': False,
+            },
+        ),
+        migrations.CreateModel(
+            name='Tag',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=255)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='Ingredient',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=255)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='Recipe',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('title', models.CharField(max_length=255)),
+                ('time_minutes', models.DecimalField(decimal_places=1, max_digits=4)),
+                ('price', models.DecimalField(decimal_places=2, max_digits=7)),
+                ('description', models.TextField(blank=True)),
+                ('link', models.CharField(blank=True, max_length=255)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+                ('tags', models.ManyToManyField(to='core.tag')),
+                ('ingredients', models.ManyToManyField(to='core.ingredient')),
+                ('image', models.ImageField(blank=True, upload_to=core.models.generate_recipe_image_path)),
+                ('image_color', models.CharField(blank=True, max_length=7)),
+                ('image_placeholder', models.TextField(blank=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='RecipeImage',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('image', models.ImageField(upload_to=core.models.generate_recipe_image_path)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('recipe', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='images', to='core.recipe')),
+            ],
+            options={
+                'ordering': ['id'],
+            },
+        ),
+    ]
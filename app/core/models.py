@@ -66,11 +66,32 @@ class Recipe(models.Model):
         null=False,
         upload_to=generate_recipe_image_path,
     )
+    # Precomputed from `image` so clients can render something instantly
+    image_placeholder = models.TextField(blank=True)
+    image_color = models.CharField(max_length=7, blank=True)
 
     def __str__(self):
         return self.title
 
 
+class RecipeImage(models.Model):
+    """Image in a recipe gallery"""
+
+    recipe = models.ForeignKey(
+        to=Recipe,
+        on_delete=models.CASCADE,
+        related_name="images",
+    )
+    image = models.ImageField(upload_to=generate_recipe_image_path)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ["id"]
+
+    def __str__(self):
+        return self.image.name
+
+
 class Tag(models.Model):
     name = models.CharField(max_length=255)
     user = models.ForeignKey(to=get_user_model(), on_delete=models.CASCADE)
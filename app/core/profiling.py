@@ -0,0 +1,117 @@
+"""Sampling profiler of requests writing collapsed stacks
+
+Every line of a profile is `frame;frame;...;frame count`, outermost frame
+first, as expected by flamegraph tools (e.g. `flamegraph.pl`, speedscope).
+"""
+import collections
+import hmac
+import random
+import re
+import sys
+import threading
+import time
+from pathlib import Path
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from core.metrics import get_route
+
+HEADER = "X-Profile-Token"
+
+
+class StackSampler:
+    """Sample stacks of threads from a background thread
+
+    Sampling costs the profiled thread nothing but the GIL switches, unlike
+    `cProfile` which slows down every function call.
+    """
+
+    def __init__(self, *thread_ids, interval=None):
+        self.thread_ids = thread_ids
+        self.interval = interval or settings.PROFILER_INTERVAL
+        self.stacks = collections.Counter()
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stopped.set()
+        self._thread.join()
+
+    def _run(self):
+        while not self._stopped.wait(self.interval):
+            frames = sys._current_frames()
+            for thread_id in self.thread_ids:
+                frame = frames.get(thread_id)
+                if frame is not None:
+                    self.stacks[collapse(frame)] += 1
+
+
+def collapse(frame):
+    """Return stack of frame as `module:function` names separated by `;`"""
+    names = []
+    while frame is not None:
+        module = frame.f_globals.get("__name__", "?")
+        names.append(f"{module}:{frame.f_code.co_name}")
+        frame = frame.f_back
+    return ";".join(reversed(names))
+
+
+def should_profile(request):
+    """Profile sampled requests and ones sending valid profiling token"""
+    token = request.headers.get(HEADER)
+    if token and settings.PROFILER_TOKEN:
+        return hmac.compare_digest(token.encode(), settings.PROFILER_TOKEN.encode())
+    return random.random() < settings.PROFILER_SAMPLE_RATE
+
+
+def save_profile(stacks, route, user_id, duration):
+    """Write collapsed stacks, keeping only newest PROFILER_MAX_FILES files"""
+    directory = Path(settings.PROFILER_DIR)
+    directory.mkdir(parents=True, exist_ok=True)
+    route = re.sub(r"[^\w.-]+", "_", route)
+    name = (
+        f"{time.time_ns()}-{route}-user{user_id or 'anon'}"
+        f"-{round(duration * 1000)}ms.collapsed"
+    )
+    path = directory / name
+    path.write_text("".join(f"{stack} {count}\n" for stack, count in stacks.items()))
+    profiles = sorted(directory.glob("*.collapsed"))
+    for old_path in profiles[: -settings.PROFILER_MAX_FILES]:
+        old_path.unlink(missing_ok=True)
+    return path
+
+
+def profile_request(get_response, request):
+    """Get response while sampling stacks of the current thread"""
+    sampler = StackSampler(threading.get_ident())
+    start = time.perf_counter()
+    sampler.start()
+    try:
+        response = get_response(request)
+    finally:
+        sampler.stop()
+    save_request_profile(request, sampler.stacks, time.perf_counter() - start)
+    return response
+
+
+async def aprofile_request(get_response, request):
+    """Async version of `profile_request`, also sampling sync code thread"""
+    sync_thread_id = await sync_to_async(threading.get_ident)()
+    sampler = StackSampler(threading.get_ident(), sync_thread_id)
+    start = time.perf_counter()
+    sampler.start()
+    try:
+        response = await get_response(request)
+    finally:
+        sampler.stop()
+    duration = time.perf_counter() - start
+    await sync_to_async(save_request_profile)(request, sampler.stacks, duration)
+    return response
+
+
+def save_request_profile(request, stacks, duration):
+    user = getattr(request, "user", None)
+    user_id = user.pk if user is not None and user.is_authenticated else None
+    return save_profile(stacks, get_route(request), user_id, duration)
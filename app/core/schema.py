@@ -0,0 +1,55 @@
+"""OpenAPI schema built ahead of time
+
+Generating the schema introspects every view and serializer, so it's
+done once by `manage.py build_schema` and the artifact is served as is.
+"""
+import hashlib
+import logging
+import threading
+from django.conf import settings
+from drf_spectacular.renderers import OpenApiJsonRenderer
+from drf_spectacular.settings import spectacular_settings
+
+logger = logging.getLogger(__name__)
+
+MEDIA_TYPE = OpenApiJsonRenderer.media_type
+
+_lock = threading.Lock()
+_schema = None
+
+
+def generate_schema():
+    """Return schema of the API as JSON bytes"""
+    generator = spectacular_settings.DEFAULT_GENERATOR_CLASS()
+    schema = generator.get_schema(request=None, public=True)
+    return OpenApiJsonRenderer().render(schema, renderer_context={}) + b"\n"
+
+
+def get_version(content):
+    """Return version of schema content, used as its ETag"""
+    return hashlib.sha256(content).hexdigest()[:16]
+
+
+def get_schema():
+    """Return schema artifact content and version, loaded once per worker
+
+    Schema is generated on first use when the artifact wasn't built.
+    """
+    global _schema
+    with _lock:
+        if _schema is None:
+            try:
+                content = settings.OPENAPI_SCHEMA_PATH.read_bytes()
+            except FileNotFoundError:
+                logger.warning(
+                    "%s not found, run build_schema", settings.OPENAPI_SCHEMA_PATH
+                )
+                content = generate_schema()
+            _schema = (content, get_version(content))
+    return _schema
+
+
+def clear():
+    global _schema
+    with _lock:
+        _schema = None
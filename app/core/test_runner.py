@@ -0,0 +1,140 @@
+import time
+import unittest
+from collections import defaultdict
+from django.conf import settings
+from django.test.runner import (
+    DiscoverRunner,
+    ParallelTestSuite,
+    RemoteTestResult,
+    RemoteTestRunner,
+)
+from django.test.utils import setup_databases
+from rest_framework.settings import api_settings
+from core import throttling
+
+# Hashing with PBKDF2 makes creating users the slowest part of most tests
+FAST_PASSWORD_HASHERS = ["django.contrib.auth.hashers.MD5PasswordHasher"]
+SLOWEST_MODULES = 15
+
+
+def get_module(test):
+    # Failures of setUpClass are reported by holders without a test module
+    return getattr(test, "__module__", None) or test.id()
+
+
+class TimedTextTestResult(unittest.TextTestResult):
+    """Sum wall-clock time of tests by module"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.module_times = defaultdict(float)
+        self._started = None
+
+    def startTest(self, test):
+        self._started = time.perf_counter()
+        super().startTest(test)
+
+    def stopTest(self, test):
+        super().stopTest(test)
+        # Tests of parallel runs are timed by workers, see addTestTime
+        if self._started is not None:
+            self.addTestTime(test, time.perf_counter() - self._started)
+            self._started = None
+
+    def addTestTime(self, test, seconds):
+        self.module_times[get_module(test)] += seconds
+
+
+class TimedRemoteTestResult(RemoteTestResult):
+    """Send time of every test from worker along with its result"""
+
+    def startTest(self, test):
+        self._started = time.perf_counter()
+        super().startTest(test)
+
+    def stopTest(self, test):
+        self.events.append(
+            ("addTestTime", self.test_index, time.perf_counter() - self._started)
+        )
+        super().stopTest(test)
+
+
+class TimedRemoteTestRunner(RemoteTestRunner):
+    resultclass = TimedRemoteTestResult
+
+
+class TimedParallelTestSuite(ParallelTestSuite):
+    runner_class = TimedRemoteTestRunner
+
+
+class TestRunner(DiscoverRunner):
+    """Test runner failing tests whose requests make N+1 queries
+
+    Tests run in parallel processes, each on a clone of the test database,
+    which is kept between runs unless --fresh-db is passed. Passwords are
+    hashed with a fast hasher and time of the slowest modules is reported.
+    Access log is turned off to keep test output readable and throttling to
+    keep tests independent.
+    """
+
+    parallel_test_suite = TimedParallelTestSuite
+
+    @classmethod
+    def add_arguments(cls, parser):
+        super().add_arguments(parser)
+        parser.add_argument(
+            "--fresh-db",
+            action="store_false",
+            dest="keepdb",
+            help="Create test databases from scratch instead of reusing them",
+        )
+        parser.set_defaults(parallel="auto", keepdb=True)
+
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        # Parallel workers are forked after this, so they inherit settings
+        settings.PASSWORD_HASHERS = FAST_PASSWORD_HASHERS
+        settings.NPLUSONE_DETECTION = True
+        settings.NPLUSONE_RAISE = True
+        settings.ACCESS_LOG = False
+        # Buckets would be shared by tests, throttling tests set their rates
+        settings.REST_FRAMEWORK = throttling.get_unthrottled_settings()
+        api_settings.reload()
+
+    def setup_databases(self, **kwargs):
+        old_config = setup_databases(
+            self.verbosity,
+            self.interactive,
+            time_keeper=self.time_keeper,
+            keepdb=self.keepdb,
+            debug_sql=self.debug_sql,
+            **kwargs,
+        )
+        # Kept clones would miss migrations applied to the kept database,
+        # copying it again (a file or CREATE DATABASE ... TEMPLATE) is cheap
+        if self.parallel > 1:
+            for connection, _, is_first in old_config:
+                if not is_first:
+                    continue
+                for index in range(self.parallel):
+                    with self.time_keeper.timed(f"  Cloning '{connection.alias}'"):
+                        connection.creation.clone_test_db(
+                            suffix=str(index + 1),
+                            verbosity=self.verbosity,
+                            keepdb=False,
+                        )
+        return old_config
+
+    def get_resultclass(self):
+        # Debugging result classes (--debug-sql, --pdb) take precedence
+        return super().get_resultclass() or TimedTextTestResult
+
+    def run_suite(self, suite, **kwargs):
+        result = super().run_suite(suite, **kwargs)
+        module_times = getattr(result, "module_times", None)
+        if module_times and self.verbosity > 0:
+            self.log("Slowest test modules (wall-clock):")
+            slowest = sorted(module_times.items(), key=lambda item: -item[1])
+            for module, seconds in slowest[:SLOWEST_MODULES]:
+                self.log(f"  {seconds:8.3f}s  {module}")
+        return result
@@ -0,0 +1,106 @@
+"""Tests for access log"""
+import json
+import logging
+import logging.config
+import os
+import tempfile
+from unittest.mock import patch
+from django.contrib.auth import get_user_model
+from django.conf import settings
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+from core.access_log import JSONFormatter, NonBlockingQueueHandler
+
+TAGS_URL = reverse("recipe:tag-list")
+
+
+class NonBlockingQueueHandlerTests(SimpleTestCase):
+    def setUp(self):
+        log_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(log_dir.cleanup)
+        self.log_path = os.path.join(log_dir.name, "access.log")
+        self.handler = NonBlockingQueueHandler(queue_size=2, filename=self.log_path)
+        self.handler.setFormatter(JSONFormatter())
+        self.addCleanup(self.handler.close)
+        self.logger = logging.getLogger("core.tests.access")
+        self.logger.addHandler(self.handler)
+        self.addCleanup(self.logger.removeHandler, self.handler)
+
+    def test_json_lines_written(self):
+        """Test records are written as JSON by background thread"""
+        self.logger.warning("GET /", extra={"fields": {"status": 200}})
+        self.handler.flush()
+
+        with open(self.log_path) as log_file:
+            entry = json.loads(log_file.readline())
+        self.assertEqual(entry["message"], "GET /")
+        self.assertEqual(entry["status"], 200)
+        self.assertEqual(entry["level"], "WARNING")
+
+    def test_configured_by_dict_config(self):
+        """Test handler is set up from LOGGING setting, as Django does"""
+        config = {
+            "version": 1,
+            "disable_existing_loggers": False,
+            "formatters": settings.LOGGING["formatters"],
+            "handlers": {
+                "access": {
+                    **settings.LOGGING["handlers"]["access"],
+                    "filename": self.log_path,
+                },
+            },
+            "loggers": {"core.tests.access_config": {"handlers": ["access"]}},
+        }
+        logging.config.dictConfig(config)
+        logger = logging.getLogger("core.tests.access_config")
+        handler = logger.handlers[0]
+        self.addCleanup(handler.close)
+        self.addCleanup(logger.removeHandler, handler)
+
+        logger.warning("GET /")
+        handler.flush()
+
+        with open(self.log_path) as log_file:
+            self.assertEqual(json.loads(log_file.readline())["message"], "GET /")
+
+    def test_drops_when_full(self):
+        """Test records are dropped instead of blocking on full queue"""
+        # Listener counts as started but consumes nothing
+        self.handler._pid = os.getpid()
+        self.handler._thread = None
+
+        for _ in range(3):
+            self.logger.warning("GET /")
+
+        self.assertEqual(self.handler.dropped, 1)
+        self.handler._pid = None
+
+
+@override_settings(ACCESS_LOG=True)
+@patch("core.middleware.access_logger")
+class AccessLogMiddlewareTests(TestCase):
+    """Test logging requests"""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            email="test@example.com",
+            password="121212",
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+
+    def test_request_logged(self, mock_logger):
+        """Test request is logged with its route, user, status and cost"""
+        res = self.client.get(TAGS_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        fields = mock_logger.info.call_args.kwargs["extra"]["fields"]
+        self.assertEqual(fields["route"], "recipe:tag-list")
+        self.assertEqual(fields["user_id"], self.user.id)
+        self.assertEqual(fields["status"], 200)
+        self.assertEqual(fields["bytes"], len(res.content))
+        self.assertEqual(fields["queries"], 1)
+        self.assertEqual(fields["request_id"], res["X-Request-ID"])
+        self.assertGreater(fields["latency_ms"], 0)
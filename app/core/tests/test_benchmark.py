@@ -0,0 +1,48 @@
+"""Tests for benchmark helpers"""
+from django.test import SimpleTestCase
+from core.benchmark import compare, percentile, summarize
+
+
+class BenchmarkHelpersTests(SimpleTestCase):
+    def test_percentile(self):
+        """Test nearest-rank percentile"""
+        values = list(range(1, 101))
+
+        self.assertEqual(percentile(values, 50), 50)
+        self.assertEqual(percentile(values, 99), 99)
+        self.assertEqual(percentile(values, 100), 100)
+        self.assertEqual(percentile([5], 95), 5)
+        self.assertEqual(percentile([], 95), 0.0)
+
+    def test_summarize(self):
+        """Test summary of a run in milliseconds"""
+        summary = summarize([0.01, 0.02, 0.03, 0.04], elapsed=2, errors=1)
+
+        self.assertEqual(summary["requests"], 4)
+        self.assertEqual(summary["errors"], 1)
+        self.assertEqual(summary["rps"], 2)
+        self.assertEqual(summary["p50_ms"], 20)
+        self.assertEqual(summary["max_ms"], 40)
+
+    def test_compare(self):
+        """Test only results outside tolerance bands are regressions"""
+        baseline = {
+            "list": {"queries": 3, "p95_ms": 10.0},
+            "serializer": {"objects_per_sec": 1000},
+        }
+        tolerances = {"p95_ms": 0.5, "objects_per_sec": 0.2}
+        results = {
+            "list": {"queries": 2, "p95_ms": 14.0},
+            "serializer": {"objects_per_sec": 850},
+        }
+
+        self.assertEqual(compare(results, baseline, tolerances), [])
+
+        results["list"] = {"queries": 4, "p95_ms": 16.0}
+        results["serializer"]["objects_per_sec"] = 700
+        regressions = compare(results, baseline, tolerances)
+
+        self.assertEqual(len(regressions), 3)
+        self.assertEqual(
+            compare({}, {"list": {"queries": 3}}, {}), ["list: queries is missing"]
+        )
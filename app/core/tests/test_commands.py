@@ -1,20 +1,299 @@
+import http.client
+import io
+import os
+import json
+import math
+import tempfile
 from unittest.mock import patch
 from psycopg2 import OperationalError as Psycopg2OpError
 from django.core.management import call_command
+from django.core.management.base import CommandError
 from django.db.utils import OperationalError
-from django.test import SimpleTestCase
+from django.contrib.auth import get_user_model
+from django.db.models import F
+from django.test import LiveServerTestCase, SimpleTestCase, TestCase
+from django.test import TransactionTestCase
+from core import loadtest
+from core.models import Recipe, Tag, Ingredient
 
 
-@patch("core.management.commands.wait_for_db.Command.check")
+@patch("core.health.check_database")
 class CommandTests(SimpleTestCase):
     def test_wait_for_db_ready(self, mock_check):
-        mock_check.return_value = True
-        call_command("wait_for_db")
-        mock_check.assert_called_once_with(databases=["default"])
+        mock_check.return_value = None
+        call_command("wait_for_db", stdout=io.StringIO())
+        mock_check.assert_called_once_with("default")
 
     @patch("time.sleep")
     def test_wait_for_db_delay(self, mock_sleep, mock_check):
-        mock_check.side_effect = [Psycopg2OpError] * 2 + [OperationalError] * 3 + [True]
-        call_command("wait_for_db")
+        mock_check.side_effect = [Psycopg2OpError] * 2 + [OperationalError] * 3 + [None]
+        call_command("wait_for_db", stdout=io.StringIO())
         self.assertEqual(mock_check.call_count, 6)
-        mock_check.assert_called_with(databases=["default"])
+        mock_check.assert_called_with("default")
+        delays = [call.args[0] for call in mock_sleep.call_args_list]
+        self.assertEqual(len(delays), 5)
+        self.assertLess(delays[0], 0.1 + 1e-9)
+        self.assertGreaterEqual(delays[-1], 0.8)
+
+    @patch("time.sleep")
+    def test_wait_for_db_max_delay(self, mock_sleep, mock_check):
+        """Test backoff stops growing at max delay"""
+        mock_check.side_effect = [OperationalError] * 10 + [None]
+        call_command("wait_for_db", max_delay=1, stdout=io.StringIO())
+        self.assertLessEqual(max(call.args[0] for call in mock_sleep.call_args_list), 1)
+
+    @patch("time.sleep")
+    @patch("time.monotonic")
+    def test_wait_for_db_timeout(self, mock_monotonic, mock_sleep, mock_check):
+        """Test command fails once deadline passes"""
+        mock_monotonic.side_effect = [0, 1, 2, 11]
+        mock_check.side_effect = OperationalError
+        with self.assertRaises(CommandError):
+            call_command("wait_for_db", timeout=10, stdout=io.StringIO())
+        self.assertEqual(mock_check.call_count, 3)
+
+    @patch("core.management.commands.wait_for_db.connections")
+    @patch("time.sleep")
+    def test_wait_for_multiple_databases(self, mock_sleep, mock_conns, mock_check):
+        """Test ready databases aren't probed again while waiting for others"""
+        mock_check.side_effect = [None, OperationalError, None]
+        call_command(
+            "wait_for_db",
+            database=["default", "replica_1"],
+            stdout=io.StringIO(),
+        )
+        self.assertEqual(
+            [call.args[0] for call in mock_check.call_args_list],
+            ["default", "replica_1", "replica_1"],
+        )
+
+    @patch("core.management.commands.wait_for_db.connections")
+    @patch("time.sleep")
+    def test_wait_for_db_connect_timeout(self, mock_sleep, mock_conns, mock_check):
+        """Test probe connects with timeout capped at the time left"""
+        connection = mock_conns.__getitem__.return_value
+        connection.vendor = "postgresql"
+        connection.settings_dict = {"OPTIONS": {"sslmode": "prefer"}}
+        probe_options = []
+
+        def check_database(alias):
+            probe_options.append(connection.settings_dict["OPTIONS"])
+            if len(probe_options) == 1:
+                raise OperationalError
+
+        mock_check.side_effect = check_database
+        call_command("wait_for_db", timeout=5, stdout=io.StringIO())
+
+        sleep = mock_sleep.call_args.args[0]
+        self.assertEqual(probe_options[0]["connect_timeout"], 5)
+        self.assertEqual(probe_options[1]["connect_timeout"], math.ceil(5 - sleep))
+        self.assertEqual(probe_options[1]["sslmode"], "prefer")
+        self.assertEqual(connection.settings_dict["OPTIONS"], {"sslmode": "prefer"})
+
+
+class BenchmarkAsyncCommandTests(TransactionTestCase):
+    """Test comparing sync and async endpoints"""
+
+    def test_benchmark_async(self):
+        """Test every endpoint is benchmarked without errors"""
+        with tempfile.NamedTemporaryFile(suffix=".json") as output_file:
+            call_command(
+                "benchmark_async",
+                requests=4,
+                concurrency=2,
+                recipes=2,
+                output=output_file.name,
+                stdout=io.StringIO(),
+            )
+            results = json.load(output_file)
+
+        self.assertEqual(len(results), 15)
+        for summary in results.values():
+            self.assertEqual(summary["requests"], 4)
+            self.assertEqual(summary["errors"], 0)
+        self.assertFalse(get_user_model().objects.exists())
+
+
+class SeedPerfDataCommandTests(TestCase):
+    """Test seeding synthetic dataset"""
+
+    def seed(self, **options):
+        call_command(
+            "seed_perf_data",
+            users=5,
+            recipes=50,
+            tags=4,
+            ingredients=6,
+            stdout=io.StringIO(),
+            **options,
+        )
+
+    def test_seed(self):
+        """Test requested number of objects is created and linked"""
+        self.seed()
+
+        self.assertEqual(get_user_model().objects.count(), 5)
+        self.assertEqual(Tag.objects.count(), 20)
+        self.assertEqual(Ingredient.objects.count(), 30)
+        self.assertEqual(Recipe.objects.count(), 50)
+        self.assertTrue(Recipe.tags.through.objects.exists())
+        # Every link stays within one user's data
+        links = Recipe.tags.through.objects.exclude(tag__user=F("recipe__user"))
+        self.assertFalse(links.exists())
+
+    def test_seed_is_reproducible(self):
+        """Test same seed generates same dataset"""
+        self.seed(seed=1)
+        first = list(Recipe.objects.order_by("id").values_list("user__email", "price"))
+
+        self.seed(seed=1, clear=True)
+        second = list(Recipe.objects.order_by("id").values_list("user__email", "price"))
+
+        self.assertEqual(first, second)
+        self.assertEqual(get_user_model().objects.count(), 5)
+
+
+class LoadTestCommandTests(LiveServerTestCase):
+    """Test load testing running server"""
+
+    def test_loadtest(self):
+        """Test every endpoint of scenario is measured without errors"""
+        with tempfile.NamedTemporaryFile(suffix=".json") as output_file:
+            call_command(
+                "loadtest",
+                self.live_server_url,
+                clients=2,
+                iterations=2,
+                output=output_file.name,
+                stdout=io.StringIO(),
+            )
+            results = json.load(output_file)
+
+        endpoints = results["endpoints"]
+        self.assertEqual(len(endpoints), 11)
+        self.assertEqual(endpoints["register"]["requests"], 2)
+        self.assertEqual(endpoints["recipe image upload"]["requests"], 4)
+        for summary in endpoints.values():
+            self.assertEqual(summary["errors"], 0)
+
+
+class LoadTestClientTests(SimpleTestCase):
+    """Test load test client counts failed connections as errors"""
+
+    @patch("urllib.request.urlopen")
+    def test_connection_failures_recorded(self, mock_urlopen):
+        mock_urlopen.side_effect = [
+            ConnectionResetError(),
+            http.client.RemoteDisconnected(),
+        ]
+        recorder = loadtest.Recorder()
+        client = loadtest.APIClient("http://testserver", recorder)
+
+        self.assertIsNone(client.request("list", "GET", "/api/recipe/recipes/"))
+        self.assertIsNone(client.request("list", "GET", "/api/recipe/recipes/"))
+
+        summary = recorder.summarize(1)["list"]
+        self.assertEqual(summary["requests"], 2)
+        self.assertEqual(summary["errors"], 2)
+
+
+class BenchmarkCommandTests(TestCase):
+    """Test benchmark regression gate"""
+
+    def setUp(self):
+        self.baseline_dir = tempfile.TemporaryDirectory()
+        self.baseline = os.path.join(self.baseline_dir.name, "baseline.json")
+        self.addCleanup(self.baseline_dir.cleanup)
+
+    def benchmark(self, **options):
+        call_command(
+            "benchmark",
+            baseline=self.baseline,
+            recipes=3,
+            requests=2,
+            repeat=2,
+            stdout=io.StringIO(),
+            **options,
+        )
+
+    def update_baseline(self, update):
+        with open(self.baseline) as baseline_file:
+            baseline = json.load(baseline_file)
+        for metrics in baseline["results"].values():
+            update(metrics)
+        with open(self.baseline, "w") as baseline_file:
+            json.dump(baseline, baseline_file)
+
+    def slow_down_baseline(self, metrics):
+        """Make timings of baseline so poor they can't regress"""
+        for metric in metrics:
+            if metric == "objects_per_sec":
+                metrics[metric] = 0
+            elif metric.endswith("_ms"):
+                metrics[metric] = 10**6
+
+    def test_no_regressions(self):
+        """Test results matching baseline pass"""
+        self.benchmark(update_baseline=True)
+        self.update_baseline(self.slow_down_baseline)
+
+        self.benchmark()
+
+        self.assertFalse(get_user_model().objects.exists())
+
+    def test_query_regression(self):
+        """Test more queries than in baseline fail"""
+        self.benchmark(update_baseline=True)
+        self.update_baseline(self.slow_down_baseline)
+        self.update_baseline(lambda metrics: metrics.update(queries=0))
+
+        with self.assertRaisesMessage(CommandError, "recipe list: queries"):
+            self.benchmark()
+
+    def test_queries_only(self):
+        """Test timings aren't gated when only queries are"""
+        self.benchmark(update_baseline=True)
+        self.update_baseline(lambda metrics: metrics.update(p50_ms=0))
+
+        self.benchmark(queries_only=True)
+        with self.assertRaisesMessage(CommandError, "recipe list: p50_ms"):
+            self.benchmark()
+
+
+class BenchmarkMiddlewareCommandTests(TestCase):
+    """Test comparing full and lean middleware stacks"""
+
+    def test_benchmark_middleware(self):
+        """Test every endpoint is benchmarked with both stacks"""
+        with tempfile.NamedTemporaryFile(suffix=".json") as output_file:
+            call_command(
+                "benchmark_middleware",
+                requests=2,
+                output=output_file.name,
+                stdout=io.StringIO(),
+            )
+            results = json.load(output_file)
+
+        self.assertEqual(len(results), 6)
+        for summary in results.values():
+            self.assertEqual(summary["requests"], 2)
+            self.assertEqual(summary["errors"], 0)
+
+
+class BenchmarkStartupCommandTests(SimpleTestCase):
+    """Test measuring startup of a fresh process"""
+
+    def test_benchmark_startup(self):
+        """Test startup phases and imports are measured"""
+        with tempfile.NamedTemporaryFile(suffix=".json") as output_file:
+            call_command(
+                "benchmark_startup",
+                runs=1,
+                output=output_file.name,
+                stdout=io.StringIO(),
+            )
+            results = json.load(output_file)
+
+        self.assertGreater(results["first_request_ms"], results["setup_ms"])
+        self.assertGreater(results["process_ms"], results["first_request_ms"])
+        self.assertIn("django", results["imports_ms"])
@@ -0,0 +1,91 @@
+"""Tests for response compression"""
+import gzip
+from decimal import Decimal
+from unittest.mock import Mock, patch
+import brotli
+import zstandard
+from django.contrib.auth import get_user_model
+from django.test import SimpleTestCase, TestCase
+from django.urls import reverse
+from rest_framework.test import APIClient
+from core import compression
+from core.models import Recipe
+
+RECIPE_LIST_URL = reverse("recipe:recipe-list")
+
+
+class NegotiationTests(SimpleTestCase):
+    def test_choose_encoding(self):
+        """Test best encoding accepted by client is chosen"""
+        self.assertEqual(compression.choose_encoding("gzip, deflate, br"), "br")
+        self.assertEqual(compression.choose_encoding("gzip, br, zstd"), "zstd")
+        self.assertEqual(compression.choose_encoding("br;q=0.5, gzip"), "gzip")
+        self.assertEqual(compression.choose_encoding("*"), "zstd")
+        self.assertEqual(compression.choose_encoding("*;q=0, gzip"), "gzip")
+        self.assertIsNone(compression.choose_encoding("identity"))
+        self.assertIsNone(compression.choose_encoding(""))
+
+    def test_cache(self):
+        """Test same body is compressed only once"""
+        encoder = Mock(return_value=b"compressed")
+        cache = compression.CompressedCache(max_entries=1)
+
+        with patch.dict(compression.ENCODERS, {"gzip": encoder}):
+            cache.compress(b"body", "gzip", 6)
+            result = cache.compress(b"body", "gzip", 6)
+            cache.compress(b"other body", "gzip", 6)
+            cache.compress(b"body", "gzip", 6)
+
+        self.assertEqual(result, b"compressed")
+        # Second body evicted the first one
+        self.assertEqual(encoder.call_count, 3)
+
+
+class CompressionMiddlewareTests(TestCase):
+    """Test compressing API responses"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            email="test@example.com",
+            password="121212",
+        )
+        self.client.force_authenticate(user=self.user)
+
+    def create_recipes(self, count):
+        Recipe.objects.bulk_create(
+            Recipe(
+                user=self.user,
+                title=f"recipe {i}",
+                time_minutes=Decimal("7.5"),
+                price=Decimal("5.50"),
+            )
+            for i in range(count)
+        )
+
+    def test_compressed(self):
+        """Test large response is compressed with negotiated encoding"""
+        self.create_recipes(50)
+        body = self.client.get(RECIPE_LIST_URL).content
+        decompressors = {
+            "gzip": gzip.decompress,
+            "br": brotli.decompress,
+            "zstd": zstandard.ZstdDecompressor().decompress,
+        }
+
+        for encoding, decompress in decompressors.items():
+            res = self.client.get(RECIPE_LIST_URL, HTTP_ACCEPT_ENCODING=encoding)
+
+            self.assertEqual(res["Content-Encoding"], encoding)
+            self.assertEqual(res["Content-Length"], str(len(res.content)))
+            self.assertIn("Accept-Encoding", res["Vary"])
+            self.assertEqual(decompress(res.content), body)
+            self.assertLess(len(res.content), len(body) / 5)
+
+    def test_small_not_compressed(self):
+        """Test response below threshold is sent as is"""
+        self.create_recipes(1)
+
+        res = self.client.get(RECIPE_LIST_URL, HTTP_ACCEPT_ENCODING="gzip")
+
+        self.assertFalse(res.has_header("Content-Encoding"))
@@ -0,0 +1,108 @@
+"""Tests for adaptive concurrency limiting"""
+from unittest.mock import patch
+from django.contrib.auth import get_user_model
+from django.test import RequestFactory, SimpleTestCase, TestCase
+from django.urls import resolve, reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+from core import concurrency
+from core.concurrency import AIMDLimiter
+
+RECIPES_URL = reverse("recipe:recipe-list")
+ME_URL = reverse("user:me")
+HEALTHZ_URL = reverse("healthz")
+
+
+def create_limiter(limit=10):
+    return AIMDLimiter(
+        limit, min_limit=2, max_limit=20, latency_target=1, backoff_ratio=0.5
+    )
+
+
+class AIMDLimiterTests(SimpleTestCase):
+    """Test adapting the limit"""
+
+    def test_slow_request_decreases_limit(self):
+        """Test limit is cut for slow and overloaded requests, not below min"""
+        limiter = create_limiter(limit=10)
+        for latency, overloaded, expected in [
+            (2, False, 5),
+            (0.1, True, 2.5),
+            (2, False, 2),
+        ]:
+            limiter.acquire(concurrency.NORMAL)
+            limiter.release(latency, overloaded)
+            self.assertEqual(limiter.limit, expected)
+
+    def test_fast_request_increases_used_limit(self):
+        """Test limit only grows while half of it is in use"""
+        limiter = create_limiter(limit=4)
+        limiter.acquire(concurrency.NORMAL)
+        limiter.release(0.1)
+        self.assertEqual(limiter.limit, 4)
+
+        for _ in range(2):
+            limiter.acquire(concurrency.NORMAL)
+        limiter.release(0.1)
+        self.assertEqual(limiter.limit, 4.25)
+        self.assertEqual(limiter.inflight, 1)
+
+    def test_priority_shares(self):
+        """Test low priority requests are rejected first, critical never"""
+        limiter = create_limiter(limit=10)
+        for _ in range(5):
+            self.assertTrue(limiter.acquire(concurrency.LOW))
+        self.assertFalse(limiter.acquire(concurrency.LOW))
+
+        for _ in range(3):
+            self.assertTrue(limiter.acquire(concurrency.NORMAL))
+        self.assertFalse(limiter.acquire(concurrency.NORMAL))
+        self.assertTrue(limiter.acquire(concurrency.HIGH))
+        self.assertTrue(limiter.acquire(concurrency.HIGH))
+        self.assertFalse(limiter.acquire(concurrency.HIGH))
+        self.assertTrue(limiter.acquire(concurrency.CRITICAL))
+
+    def test_get_priority(self):
+        """Test priority is looked up by method and route, then by route"""
+        factory = RequestFactory()
+        for method, path, expected in [
+            ("get", ME_URL, concurrency.HIGH),
+            ("patch", ME_URL, concurrency.NORMAL),
+            ("get", HEALTHZ_URL, concurrency.CRITICAL),
+            ("get", RECIPES_URL, concurrency.NORMAL),
+        ]:
+            request = getattr(factory, method)(path)
+            request.resolver_match = resolve(path)
+            self.assertEqual(concurrency.get_priority(request), expected)
+
+
+class ConcurrencyLimitMiddlewareTests(TestCase):
+    """Test shedding requests over the limit"""
+
+    def setUp(self):
+        self.limiter = create_limiter(limit=2)
+        patcher = patch.object(concurrency, "_limiter", self.limiter)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.client = APIClient()
+        user = get_user_model().objects.create_user(email="test@example.com")
+        self.client.force_authenticate(user)
+
+    def test_request_admitted_and_released(self):
+        """Test slot is taken for the request and freed after it"""
+        res = self.client.get(RECIPES_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(self.limiter.inflight, 0)
+
+    def test_request_over_limit_rejected(self):
+        """Test normal requests get 503 when limit is used, probes don't"""
+        self.limiter.inflight = 2
+
+        with self.assertNoLogs("django.request"):
+            res = self.client.get(RECIPES_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_503_SERVICE_UNAVAILABLE)
+        self.assertEqual(res["Retry-After"], "1")
+        self.assertEqual(self.client.get(HEALTHZ_URL).status_code, 200)
+        self.assertEqual(self.limiter.inflight, 2)
@@ -0,0 +1,138 @@
+"""Tests for database connection pool"""
+import threading
+import time
+from unittest.mock import patch
+from django.test import SimpleTestCase
+from core.db.pool import ConnectionPool, PoolTimeout
+from core.db.backends.postgresql.base import DatabaseWrapper
+
+
+class FakeConnection:
+    def __init__(self):
+        self.closed = 0
+
+    def close(self):
+        self.closed = 1
+
+
+def broken_check(connection):
+    raise Exception("connection lost")
+
+
+class ConnectionPoolTests(SimpleTestCase):
+    """Test connection pool"""
+
+    def test_connection_reused(self):
+        """Test returned connection is handed out again"""
+        pool = ConnectionPool()
+        connection = pool.getconn(FakeConnection)
+        pool.putconn(connection)
+
+        self.assertIs(pool.getconn(FakeConnection), connection)
+        self.assertEqual(pool.stats()["created"], 1)
+        self.assertEqual(pool.stats()["checkouts"], 2)
+
+    def test_timeout_when_exhausted(self):
+        """Test error when no connection is returned in time"""
+        pool = ConnectionPool(max_size=1, timeout=0.01)
+        pool.getconn(FakeConnection)
+
+        with self.assertRaises(PoolTimeout):
+            pool.getconn(FakeConnection)
+        self.assertEqual(pool.stats()["timeouts"], 1)
+
+    def test_waiting_for_returned_connection(self):
+        """Test waiting for connection records wait time"""
+        pool = ConnectionPool(max_size=1, timeout=5)
+        connection = pool.getconn(FakeConnection)
+        timer = threading.Timer(0.05, pool.putconn, args=[connection])
+        timer.start()
+
+        self.assertIs(pool.getconn(FakeConnection), connection)
+        timer.join()
+        stats = pool.stats()
+        self.assertEqual(stats["waits"], 1)
+        self.assertGreaterEqual(stats["wait_seconds_max"], 0.04)
+
+    def test_expired_connection_recycled(self):
+        """Test connection older than max lifetime is closed and replaced"""
+        pool = ConnectionPool(max_lifetime=60)
+        connection = pool.getconn(FakeConnection)
+        pool.putconn(connection)
+
+        with patch("core.db.pool.time.monotonic", return_value=time.monotonic() + 61):
+            new_connection = pool.getconn(FakeConnection)
+
+        self.assertIsNot(new_connection, connection)
+        self.assertTrue(connection.closed)
+        self.assertEqual(pool.stats()["recycled"], 1)
+        self.assertEqual(pool.stats()["size"], 1)
+
+    def test_idle_connection_health_checked(self):
+        """Test connection failing health check is replaced"""
+        pool = ConnectionPool(health_check_interval=0, check=broken_check)
+        connection = pool.getconn(FakeConnection)
+        pool.putconn(connection)
+        time.sleep(0.001)
+
+        self.assertIsNot(pool.getconn(FakeConnection), connection)
+        self.assertTrue(connection.closed)
+        self.assertEqual(pool.stats()["failed_checks"], 1)
+
+    def test_closed_connection_not_returned_to_pool(self):
+        """Test connection closed while in use is discarded"""
+        pool = ConnectionPool(max_size=1)
+        connection = pool.getconn(FakeConnection)
+        connection.close()
+        pool.putconn(connection)
+
+        self.assertEqual(pool.stats()["size"], 0)
+        self.assertIsNot(pool.getconn(FakeConnection), connection)
+
+    def test_failed_connect_frees_slot(self):
+        """Test failing to connect doesn't leak pool capacity"""
+        pool = ConnectionPool(max_size=1)
+
+        def connect():
+            raise Exception("database is down")
+
+        with self.assertRaises(Exception):
+            pool.getconn(connect)
+        self.assertEqual(pool.stats()["size"], 0)
+        pool.getconn(FakeConnection)
+
+    def test_close_idle_connections(self):
+        """Test closing pool closes idle connections"""
+        pool = ConnectionPool()
+        connection = pool.getconn(FakeConnection)
+        pool.putconn(connection)
+        pool.close()
+
+        self.assertTrue(connection.closed)
+        self.assertEqual(pool.stats()["size"], 0)
+
+
+class PooledBackendTests(SimpleTestCase):
+    """Test pooled PostgreSQL backend"""
+
+    def test_pool_options_not_passed_to_driver(self):
+        """Test pool options are left out of connection params"""
+        settings_dict = {
+            "ENGINE": "core.db.backends.postgresql",
+            "NAME": "devdb",
+            "USER": "devuser",
+            "PASSWORD": "admin",
+            "HOST": "db",
+            "PORT": "",
+            "OPTIONS": {"pool": {"max_size": 3}},
+            "TIME_ZONE": None,
+            "CONN_MAX_AGE": 0,
+            "CONN_HEALTH_CHECKS": False,
+            "AUTOCOMMIT": True,
+            "ATOMIC_REQUESTS": False,
+            "TEST": {},
+        }
+        wrapper = DatabaseWrapper(settings_dict, alias="pooled")
+
+        self.assertNotIn("pool", wrapper.get_connection_params())
+        self.assertEqual(wrapper.pool.max_size, 3)
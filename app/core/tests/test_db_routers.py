@@ -0,0 +1,138 @@
+"""Tests for read replica routing"""
+from unittest.mock import MagicMock, patch
+from django.core.cache import cache
+from django.db.utils import OperationalError
+from django.http import HttpResponse
+from django.test import SimpleTestCase, RequestFactory, override_settings
+from core.db import routers
+from core.middleware import ReplicaRoutingMiddleware
+
+
+class ReplicaView:
+    replica_reads = True
+
+
+class PrimaryView:
+    pass
+
+
+def make_view(view_class, record):
+    """Return view recording database alias used for reads"""
+
+    def view(request):
+        record.append(routers.PrimaryReplicaRouter().db_for_read(None))
+        return HttpResponse()
+
+    view.cls = view_class
+    return view
+
+
+@override_settings(DATABASE_REPLICAS=["replica_1"])
+@patch("core.db.routers.connections", MagicMock())
+class ReplicaRoutingTests(SimpleTestCase):
+    """Test routing reads to replicas"""
+
+    def setUp(self):
+        self.factory = RequestFactory()
+        self.auth = {"HTTP_AUTHORIZATION": "Token abc"}
+        routers._replicas_down_until.clear()
+        cache.clear()
+
+    def send(self, request, view):
+        middleware = ReplicaRoutingMiddleware(lambda request: None)
+
+        def get_response(request):
+            response = middleware.process_view(request, view, (), {})
+            return response or view(request)
+
+        middleware.get_response = get_response
+        return middleware(request)
+
+    def test_reads_outside_request_go_to_primary(self):
+        """Test router leaves reads outside requests to default database"""
+        self.assertIsNone(routers.PrimaryReplicaRouter().db_for_read(None))
+
+    def test_safe_request_reads_from_replica(self):
+        """Test safe request to opted in view reads from replica"""
+        record = []
+        self.send(self.factory.get("/", **self.auth), make_view(ReplicaView, record))
+
+        self.assertEqual(record, ["replica_1"])
+
+    def test_view_not_opted_in_reads_from_primary(self):
+        """Test views read from primary unless they allow replicas"""
+        record = []
+        self.send(self.factory.get("/", **self.auth), make_view(PrimaryView, record))
+
+        self.assertEqual(record, [None])
+
+    def test_read_your_writes(self):
+        """Test client reads from primary right after its write"""
+        record = []
+        view = make_view(ReplicaView, record)
+        self.send(self.factory.post("/", **self.auth), view)
+        self.send(self.factory.get("/", **self.auth), view)
+        self.send(self.factory.get("/", HTTP_AUTHORIZATION="Token other"), view)
+
+        self.assertEqual(record, [None, None, "replica_1"])
+
+    def test_token_client_key(self):
+        """Test client pinned for issued token is pinned for its requests"""
+        request = self.factory.get("/", **self.auth)
+
+        client_key = routers.get_token_client_key("abc")
+
+        self.assertEqual(client_key, routers.get_client_key(request))
+
+    @override_settings(DATABASE_REPLICA_PIN_SECONDS=0)
+    def test_pin_expires(self):
+        """Test client reads from replica again once pin expires"""
+        record = []
+        view = make_view(ReplicaView, record)
+        self.send(self.factory.post("/", **self.auth), view)
+        self.send(self.factory.get("/", **self.auth), view)
+
+        self.assertEqual(record, [None, "replica_1"])
+
+    def test_unavailable_replica_falls_back_to_primary(self):
+        """Test reads go to primary when replica can't be connected to"""
+        record = []
+        view = make_view(ReplicaView, record)
+        with patch("core.db.routers.connections") as mock_connections:
+            mock_connections.__getitem__.return_value.ensure_connection.side_effect = (
+                OperationalError
+            )
+            self.send(self.factory.get("/", **self.auth), view)
+            self.send(self.factory.get("/", **self.auth), view)
+
+            # Replica isn't retried until retry period passes
+            mock_connections.__getitem__.assert_called_once_with("replica_1")
+        self.assertEqual(record, [None, None])
+
+    def test_replica_failing_mid_request_retried_on_primary(self):
+        """Test safe request is run again on primary if replica fails"""
+        record = []
+
+        def view(request):
+            alias = routers.PrimaryReplicaRouter().db_for_read(None)
+            record.append(alias)
+            if alias is not None:
+                raise OperationalError("replica lost")
+            return HttpResponse()
+
+        view.cls = ReplicaView
+        middleware = ReplicaRoutingMiddleware(lambda request: None)
+
+        def get_response(request):
+            middleware.process_view(request, view, (), {})
+            try:
+                return view(request)
+            except OperationalError as exc:
+                return middleware.process_exception(request, exc)
+
+        middleware.get_response = get_response
+        response = middleware(self.factory.get("/", **self.auth))
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(record, ["replica_1", None])
+        self.assertIn("replica_1", routers._replicas_down_until)
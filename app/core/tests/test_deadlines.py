@@ -0,0 +1,121 @@
+"""Tests for request deadlines"""
+from unittest.mock import Mock
+from django.contrib.auth import get_user_model
+from django.db.utils import OperationalError
+from django.test import RequestFactory, SimpleTestCase, TestCase, override_settings
+from django.urls import resolve, reverse
+from prometheus_client import REGISTRY
+from psycopg2 import errorcodes
+from rest_framework import status
+from rest_framework.test import APIClient
+from core import deadlines
+
+RECIPES_URL = reverse("recipe:recipe-list")
+ME_URL = reverse("user:me")
+
+
+def create_context(vendor="postgresql", cursor_name=None):
+    cursor = Mock()
+    cursor.cursor.name = cursor_name
+    return {"connection": Mock(vendor=vendor), "cursor": cursor}
+
+
+def create_database_error(pgcode):
+    """Return error as raised by Django for psycopg2 error with SQLSTATE"""
+    cause = Exception()
+    cause.pgcode = pgcode
+    error = OperationalError()
+    error.__cause__ = cause
+    return error
+
+
+def run_statement(timeout, context):
+    """Run statement under deadline, return SQL sent to database"""
+    execute = Mock()
+    with deadlines.track() as deadline:
+        deadline.start(timeout)
+        deadlines.enforce_deadline(execute, "SELECT 1", None, False, context)
+    return execute.call_args.args[0]
+
+
+class EnforceDeadlineTests(SimpleTestCase):
+    """Test limiting statements to time left"""
+
+    def test_statement_timeout_set(self):
+        """Test PostgreSQL statement is sent with timeout of time left"""
+        sql = run_statement(5, create_context())
+
+        self.assertRegex(sql, r"^SET LOCAL statement_timeout = \d+; SELECT 1$")
+        timeout_ms = int(sql.split("=")[1].split(";")[0])
+        self.assertTrue(4000 < timeout_ms <= 5000)
+
+    def test_statement_unchanged(self):
+        """Test statements are sent as they are when they can't be prefixed"""
+        for timeout, context in [
+            (0, create_context()),
+            (5, create_context(vendor="sqlite")),
+            (5, create_context(cursor_name="_django_curs_1")),
+        ]:
+            self.assertEqual(run_statement(timeout, context), "SELECT 1")
+
+    def test_passed_deadline(self):
+        """Test statement isn't started after deadline"""
+        execute = Mock()
+        with deadlines.track() as deadline:
+            deadline.start(1)
+            deadline.expires_at = deadline.started
+            with self.assertRaises(deadlines.DeadlineExceeded):
+                deadlines.enforce_deadline(
+                    execute, "SELECT 1", None, False, create_context()
+                )
+
+        execute.assert_not_called()
+
+    def test_canceled_statement_is_deadline_error(self):
+        """Test only canceled statements and passed deadlines are recognized"""
+        canceled = create_database_error(errorcodes.QUERY_CANCELED)
+        lost = create_database_error(errorcodes.ADMIN_SHUTDOWN)
+
+        self.assertTrue(deadlines.is_deadline_error(canceled))
+        self.assertTrue(deadlines.is_deadline_error(deadlines.DeadlineExceeded()))
+        self.assertFalse(deadlines.is_deadline_error(lost))
+
+    def test_route_timeout(self):
+        """Test deadline is looked up by method and route, then default"""
+        factory = RequestFactory()
+        for method, path, expected in [
+            ("get", ME_URL, 2),
+            ("patch", ME_URL, 10),
+            ("get", RECIPES_URL, 10),
+        ]:
+            request = getattr(factory, method)(path)
+            request.resolver_match = resolve(path)
+            with self.subTest(method=method, path=path):
+                self.assertEqual(deadlines.get_timeout(request), expected)
+
+
+class DeadlineMiddlewareTests(TestCase):
+    """Test requests running out of time"""
+
+    def setUp(self):
+        self.client = APIClient()
+        user = get_user_model().objects.create_user(email="test@example.com")
+        self.client.force_authenticate(user)
+
+    @override_settings(REQUEST_DEADLINE=1e-9)
+    def test_deadline_exceeded(self):
+        """Test request out of time gets 504 and is counted"""
+        labels = {"route": "recipe:recipe-list", "method": "GET"}
+        name = "api_requests_deadline_exceeded_total"
+        before = REGISTRY.get_sample_value(name, labels) or 0
+
+        res = self.client.get(RECIPES_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_504_GATEWAY_TIMEOUT)
+        self.assertEqual(REGISTRY.get_sample_value(name, labels), before + 1)
+
+    def test_within_deadline(self):
+        """Test request in time isn't affected"""
+        res = self.client.get(RECIPES_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
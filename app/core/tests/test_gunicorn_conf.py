@@ -0,0 +1,50 @@
+"""Tests for gunicorn config of production server"""
+import importlib
+import os
+import tempfile
+from unittest.mock import Mock, patch
+from django.test import SimpleTestCase
+from core import metrics
+
+
+class GunicornConfTests(SimpleTestCase):
+    def setUp(self):
+        self.multiproc_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.multiproc_dir.cleanup)
+        env = {"PROMETHEUS_MULTIPROC_DIR": self.multiproc_dir.name}
+        with patch.dict(os.environ, env):
+            self.conf = importlib.import_module("app.gunicorn_conf")
+
+    def test_workers_from_cpu_count(self):
+        """Test workers are sized from CPUs unless WEB_CONCURRENCY is set"""
+        with patch.dict(os.environ, clear=True):
+            self.assertEqual(self.conf.get_workers(4), 5)
+        with patch.dict(os.environ, {"WEB_CONCURRENCY": "3"}):
+            self.assertEqual(self.conf.get_workers(4), 3)
+
+    def test_recycled_worker_stops_accepting(self):
+        """Test worker going to be recycled leaves connections to others"""
+        worker = self.conf.RecyclingThreadWorker.__new__(
+            self.conf.RecyclingThreadWorker
+        )
+        listener = Mock()
+
+        worker.alive = False
+        worker.accept(("127.0.0.1", 8000), listener)
+
+        listener.accept.assert_not_called()
+
+    def test_worker_hooks(self):
+        """Test worker start, requests and exits are recorded"""
+        worker = Mock(nr=7, pid=os.getpid())
+        exits = metrics.WORKER_EXITS._value.get()
+
+        self.conf.post_fork(Mock(), worker)
+        self.conf.post_request(worker, Mock(), {}, Mock())
+        with patch("prometheus_client.multiprocess.mark_process_dead") as mark_dead:
+            self.conf.child_exit(Mock(), worker)
+
+        self.assertGreater(metrics.WORKER_STARTED._value.get(), 0)
+        self.assertEqual(metrics.WORKER_REQUESTS._value.get(), 7)
+        self.assertEqual(metrics.WORKER_EXITS._value.get(), exits + 1)
+        mark_dead.assert_called_once_with(worker.pid)
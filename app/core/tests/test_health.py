@@ -0,0 +1,42 @@
+"""Tests for health probes"""
+from unittest.mock import patch
+from django.db.utils import OperationalError
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework import status
+
+HEALTHZ_URL = reverse("healthz")
+READYZ_URL = reverse("readyz")
+
+
+class HealthTests(TestCase):
+    def test_healthz(self):
+        """Test liveness probe doesn't touch database"""
+        with self.assertNumQueries(0):
+            res = self.client.get(HEALTHZ_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.json(), {"status": "ok"})
+
+    def test_readyz(self):
+        """Test readiness probe succeeds when database and cache are up"""
+        res = self.client.get(READYZ_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.json(), {"status": "ok"})
+
+    @patch("core.health.check_database", side_effect=OperationalError("down"))
+    def test_readyz_database_down(self, mock_check):
+        """Test readiness probe fails when database is unreachable"""
+        res = self.client.get(READYZ_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_503_SERVICE_UNAVAILABLE)
+        self.assertEqual(res.json()["errors"], {"database": "OperationalError: down"})
+
+    @patch("core.health.cache.get", side_effect=ConnectionError("refused"))
+    def test_readyz_cache_down(self, mock_get):
+        """Test readiness probe fails when cache is unreachable"""
+        res = self.client.get(READYZ_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_503_SERVICE_UNAVAILABLE)
+        self.assertEqual(res.json()["errors"], {"cache": "ConnectionError: refused"})
@@ -0,0 +1,46 @@
+"""Tests for image helpers"""
+import base64
+import io
+from PIL import Image
+from django.test import SimpleTestCase
+from core.images import generate_image_placeholder
+
+
+def create_image_file(size=(100, 50), color=(255, 0, 0), format="PNG"):
+    image_file = io.BytesIO()
+    Image.new("RGB", size, color).save(image_file, format=format)
+    image_file.seek(0)
+    return image_file
+
+
+class ImagePlaceholderTests(SimpleTestCase):
+    """Test generating image placeholders"""
+
+    def test_placeholder_is_tiny_jpeg(self):
+        """Test placeholder is base64 JPEG fitting placeholder size"""
+        placeholder, color = generate_image_placeholder(create_image_file())
+
+        prefix = "data:image/jpeg;base64,"
+        self.assertTrue(placeholder.startswith(prefix))
+        data = base64.b64decode(placeholder[len(prefix) :])
+        with Image.open(io.BytesIO(data)) as thumbnail:
+            self.assertEqual(thumbnail.size, (20, 10))
+
+    def test_dominant_color(self):
+        """Test dominant color is most frequent color of image"""
+        image_file = io.BytesIO()
+        img = Image.new("RGB", (100, 100), (0, 0, 255))
+        img.paste((255, 255, 255), (0, 0, 100, 30))
+        img.save(image_file, format="PNG")
+        image_file.seek(0)
+
+        placeholder, color = generate_image_placeholder(image_file)
+
+        self.assertEqual(color, "#0000ff")
+
+    def test_file_rewound(self):
+        """Test file can be read again after generating placeholder"""
+        image_file = create_image_file(format="JPEG")
+        generate_image_placeholder(image_file)
+
+        self.assertEqual(image_file.tell(), 0)
@@ -0,0 +1,125 @@
+"""Tests for memory diagnostics"""
+import io
+import shutil
+import tempfile
+import tracemalloc
+from django.contrib.auth import get_user_model
+from django.core.management import CommandError, call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework import status
+from core import memory
+
+MEMORY_URL = reverse("admin-memory")
+
+
+class MemoryTests(TestCase):
+    """Test tracing allocations of worker"""
+
+    def setUp(self):
+        snapshot_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(snapshot_dir.cleanup)
+        settings = override_settings(MEMORY_SNAPSHOT_DIR=snapshot_dir.name)
+        settings.enable()
+        self.addCleanup(settings.disable)
+        self.addCleanup(tracemalloc.stop)
+        self.admin_user = get_user_model().objects.create_superuser(
+            email="admin@example.com",
+            password="121212",
+        )
+        self.client.force_login(self.admin_user)
+
+    def test_trace_and_diff(self):
+        """Test snapshots taken from admin are diffed"""
+        self.client.post(MEMORY_URL, {"action": "start"})
+        self.assertTrue(tracemalloc.is_tracing())
+        self.client.post(MEMORY_URL, {"action": "snapshot"})
+        self.leak = [bytearray(1024) for _ in range(1000)]
+        self.client.post(MEMORY_URL, {"action": "snapshot"})
+
+        res = self.client.get(MEMORY_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(res.context["snapshots"]), 2)
+        self.assertTrue(res.context["is_diff"])
+        self.assertIn(__file__, str(res.context["top_stats"][0]))
+
+        self.client.post(MEMORY_URL, {"action": "stop"})
+        self.assertFalse(tracemalloc.is_tracing())
+
+    def test_snapshot_requires_tracing(self):
+        """Test snapshot isn't taken unless tracing"""
+        res = self.client.post(MEMORY_URL, {"action": "snapshot"}, follow=True)
+
+        self.assertEqual(memory.list_snapshots(), [])
+        errors = [str(message) for message in res.context["messages"]]
+        self.assertEqual(errors, ["Start tracing before taking snapshots"])
+
+    def test_requires_staff(self):
+        """Test memory page is only for admins"""
+        self.client.logout()
+
+        res = self.client.post(MEMORY_URL, {"action": "start"})
+
+        self.assertEqual(res.status_code, status.HTTP_302_FOUND)
+        self.assertFalse(tracemalloc.is_tracing())
+
+    def test_memory_report(self):
+        """Test command diffs two latest snapshots"""
+        memory.start()
+        memory.take_snapshot()
+        self.leak = [bytearray(1024) for _ in range(1000)]
+        memory.take_snapshot()
+        out = io.StringIO()
+
+        call_command("memory_report", limit=3, stdout=out)
+
+        lines = out.getvalue().splitlines()
+        self.assertTrue(lines[0].startswith("Top growth"))
+        self.assertIn(__file__, lines[1])
+
+    def copy_to_other_worker(self, path, offset_ns):
+        """Copy snapshot as if dumped by another worker `offset_ns` later"""
+        time_ns = int(path.stem.split("-")[1]) + offset_ns
+        other_path = path.with_name(f"1-{time_ns}{memory.SNAPSHOT_SUFFIX}")
+        shutil.copy(path, other_path)
+        return other_path
+
+    def test_memory_report_diffs_one_worker(self):
+        """Test command diffs snapshots of the worker with the newest one"""
+        memory.start()
+        old_path = memory.take_snapshot()
+        self.copy_to_other_worker(old_path, 1)
+        self.leak = [bytearray(1024) for _ in range(1000)]
+        new_path = memory.take_snapshot()
+        out = io.StringIO()
+
+        call_command("memory_report", limit=3, stdout=out)
+
+        lines = out.getvalue().splitlines()
+        self.assertEqual(lines[0], f"Top growth from {old_path} to {new_path}")
+
+    def test_memory_report_single_snapshot_of_worker(self):
+        """Test command shows top allocations if newest worker has one snapshot"""
+        memory.start()
+        memory.take_snapshot()
+        other_path = self.copy_to_other_worker(memory.take_snapshot(), 1)
+        out = io.StringIO()
+
+        call_command("memory_report", limit=3, stdout=out)
+
+        lines = out.getvalue().splitlines()
+        self.assertEqual(lines[0], f"Top allocation sites of {other_path}")
+        self.assertEqual(memory.get_snapshot_pid(other_path), 1)
+
+    def test_memory_report_without_snapshots(self):
+        """Test command fails without snapshots"""
+        with self.assertRaisesMessage(CommandError, "No snapshots found"):
+            call_command("memory_report", stdout=io.StringIO())
+
+    def test_unknown_action(self):
+        """Test unknown action isn't reported as snapshot without tracing"""
+        res = self.client.post(MEMORY_URL, {"action": "bogus"}, follow=True)
+
+        errors = [str(message) for message in res.context["messages"]]
+        self.assertEqual(errors, ["Unknown action 'bogus'"])
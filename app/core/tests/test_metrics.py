@@ -0,0 +1,110 @@
+"""Tests for request metrics"""
+from unittest.mock import patch
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from prometheus_client import REGISTRY
+from rest_framework import status
+from rest_framework.test import APIClient
+from core import metrics
+from core.models import Recipe
+
+METRICS_URL = reverse("metrics")
+RECIPE_LIST_URL = reverse("recipe:recipe-list")
+LABELS = {"route": "recipe:recipe-list", "method": "GET"}
+
+
+def get_sample(name, labels=LABELS):
+    return REGISTRY.get_sample_value(name, labels) or 0
+
+
+class MetricsTests(TestCase):
+    """Test recording and exposing request metrics"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            email="test@example.com",
+            password="121212",
+        )
+        self.client.force_authenticate(user=self.user)
+
+    def test_request_metrics_recorded(self):
+        """Test latency, DB, serializer and size metrics of request"""
+        Recipe.objects.create(
+            user=self.user,
+            title="sample title",
+            time_minutes=5,
+            price=5,
+        )
+        count_before = get_sample("api_request_duration_seconds_count")
+        queries_before = get_sample("api_request_db_queries_sum")
+        serializer_before = get_sample("api_request_serializer_duration_seconds_sum")
+        size_before = get_sample("api_response_size_bytes_sum")
+        rss_before = get_sample("api_request_peak_rss_growth_bytes_total")
+
+        res = self.client.get(RECIPE_LIST_URL)
+
+        self.assertEqual(
+            get_sample("api_request_duration_seconds_count"), count_before + 1
+        )
+        # Recipes and their tags
+        self.assertEqual(get_sample("api_request_db_queries_sum"), queries_before + 2)
+        self.assertGreater(
+            get_sample("api_request_serializer_duration_seconds_sum"),
+            serializer_before,
+        )
+        self.assertEqual(
+            get_sample("api_response_size_bytes_sum"),
+            size_before + len(res.content),
+        )
+        self.assertGreater(
+            get_sample("api_requests_total", {**LABELS, "status": "200"}), 0
+        )
+        self.assertGreaterEqual(
+            get_sample("api_request_peak_rss_growth_bytes_total"), rss_before
+        )
+
+    @patch("core.memory.get_peak_rss")
+    def test_peak_rss_growth_of_requests_running_alone(self, get_peak_rss):
+        """Test peak RSS growth is only counted for requests running alone"""
+        get_peak_rss.side_effect = [1000, 1500, 2000, 4000]
+        rss_before = get_sample("api_request_peak_rss_growth_bytes_total")
+
+        self.client.get(RECIPE_LIST_URL)
+        other_token = metrics._running_requests.start()
+        self.client.get(RECIPE_LIST_URL)
+        metrics._running_requests.finish(other_token)
+
+        self.assertEqual(
+            get_sample("api_request_peak_rss_growth_bytes_total"), rss_before + 500
+        )
+
+    @override_settings(DEBUG=True)
+    def test_metrics_endpoint(self):
+        """Test metrics are exposed in Prometheus text format"""
+        self.client.get(RECIPE_LIST_URL)
+        res = self.client.get(METRICS_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertTrue(res["Content-Type"].startswith("text/plain"))
+        self.assertIn(
+            "api_request_duration_seconds_count"
+            '{method="GET",route="recipe:recipe-list"}',
+            res.content.decode(),
+        )
+
+    @override_settings(METRICS_TOKEN="secret")
+    def test_metrics_endpoint_token(self):
+        """Test metrics endpoint requires token when it's configured"""
+        res = self.client.get(METRICS_URL)
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+        res = self.client.get(METRICS_URL, HTTP_AUTHORIZATION="Bearer secret")
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+    def test_metrics_endpoint_closed_without_token(self):
+        """Test metrics aren't served without token outside development"""
+        res = self.client.get(METRICS_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
@@ -0,0 +1,150 @@
+"""Tests for middleware stack of API paths and probes"""
+from django.contrib.auth import get_user_model
+from django.http import HttpResponse
+from django.test import RequestFactory, TestCase, override_settings
+from django.test.client import AsyncClientHandler
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+from core.middleware import LeanCsrfViewMiddleware, LeanSessionMiddleware
+
+ME_URL = reverse("user:me")
+ASYNC_RECIPE_LIST_URL = reverse("recipe:async-recipe-list")
+
+
+class LeanMiddlewareTests(TestCase):
+    def setUp(self):
+        self.factory = RequestFactory()
+
+    def test_api_path_skips_middleware(self):
+        """Test session isn't loaded for API paths"""
+        middleware = LeanSessionMiddleware(lambda request: HttpResponse())
+
+        api_request = self.factory.get("/api/recipe/tags/")
+        middleware(api_request)
+        admin_request = self.factory.get("/admin/")
+        middleware(admin_request)
+
+        self.assertFalse(hasattr(api_request, "session"))
+        self.assertTrue(hasattr(admin_request, "session"))
+
+    @override_settings(LEAN_MIDDLEWARE_PATHS=[])
+    def test_full_stack(self):
+        """Test every path gets middleware when no lean paths are set"""
+        middleware = LeanSessionMiddleware(lambda request: HttpResponse())
+        request = self.factory.get("/api/recipe/tags/")
+
+        middleware(request)
+
+        self.assertTrue(hasattr(request, "session"))
+
+    def test_csrf_still_enforced_outside_api(self):
+        """Test CSRF check runs for admin but not for API views"""
+        middleware = LeanCsrfViewMiddleware(lambda request: HttpResponse())
+
+        def view(request):
+            return HttpResponse()
+
+        admin_request = self.factory.post("/admin/login/")
+        api_request = self.factory.post("/api/user/token/")
+        for request in (admin_request, api_request):
+            request._dont_enforce_csrf_checks = False
+
+        admin_res = middleware.process_view(admin_request, view, (), {})
+        api_res = middleware.process_view(api_request, view, (), {})
+
+        self.assertEqual(admin_res.status_code, status.HTTP_403_FORBIDDEN)
+        self.assertIsNone(api_res)
+
+    def test_token_authenticated_request(self):
+        """Test API sets authenticated user without auth middleware"""
+        user = get_user_model().objects.create_user(
+            email="test@example.com", password="testpass123"
+        )
+        client = APIClient()
+        client.force_authenticate(user)
+
+        res = client.get(ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data["email"], user.email)
+        self.assertNotIn("sessionid", res.cookies)
+
+    def test_admin_login(self):
+        """Test admin still logs in with a session"""
+        get_user_model().objects.create_superuser(
+            email="admin@example.com", password="testpass123"
+        )
+
+        res = self.client.post(
+            reverse("admin:login"),
+            {"username": "admin@example.com", "password": "testpass123"},
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_302_FOUND)
+        self.assertIn("sessionid", res.cookies)
+
+
+@override_settings(ALLOWED_HOSTS=["api.example.com"])
+class ProbeCommonMiddlewareTests(TestCase):
+    def test_probe_by_ip_address(self):
+        """Test probes are answered whatever Host they send"""
+        res = self.client.get(reverse("healthz"), HTTP_HOST="10.1.2.3:8000")
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+    def test_host_validated(self):
+        """Test other paths still reject hosts not allowed"""
+        res = self.client.get(ME_URL, HTTP_HOST="10.1.2.3:8000")
+        allowed_res = self.client.get(ME_URL, HTTP_HOST="api.example.com")
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(allowed_res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+
+@override_settings(
+    ACCESS_LOG=True,
+    CONCURRENCY_LIMIT=True,
+    NPLUSONE_DETECTION=True,
+    PROFILER_TOKEN="profile",
+)
+class AsyncMiddlewareTests(TestCase):
+    """Test middleware runs natively in async stack"""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            email="test@example.com",
+            password="121212",
+        )
+        token = Token.objects.create(user=self.user)
+        self.auth_headers = {"Authorization": f"Token {token.key}"}
+
+    def test_stack_not_adapted(self):
+        """Test no middleware is switched to a thread in async stack"""
+        with self.assertNoLogs("django.request", "DEBUG"):
+            AsyncClientHandler().load_middleware(is_async=True)
+
+    async def test_queries_of_async_view_counted(self):
+        """Test execute wrappers see queries made by async view"""
+        with self.assertLogs("core.access") as logs:
+            res = await self.async_client.get(
+                ASYNC_RECIPE_LIST_URL,
+                headers=self.auth_headers,
+            )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        fields = logs.records[0].fields
+        self.assertGreater(fields["queries"], 0)
+        self.assertEqual(fields["user_id"], self.user.pk)
+
+    @override_settings(REQUEST_DEADLINE=1e-9)
+    async def test_deadline_of_async_view(self):
+        """Test deadline is enforced on queries made by async view"""
+        with self.assertLogs("core.access"):
+            res = await self.async_client.get(
+                ASYNC_RECIPE_LIST_URL,
+                headers=self.auth_headers,
+            )
+
+        self.assertEqual(res.status_code, status.HTTP_504_GATEWAY_TIMEOUT)
@@ -0,0 +1,92 @@
+"""Tests for N+1 query detection"""
+from unittest.mock import patch
+from django.contrib.auth import get_user_model
+from django.test import RequestFactory, TestCase, override_settings
+from django.http import HttpResponse
+from core.db.nplusone import NPlusOneError, detect_n_plus_one
+from core.middleware import NPlusOneMiddleware
+from core.models import Tag
+
+
+def create_user():
+    return get_user_model().objects.create_user(
+        email="test@example.com",
+        password="121212",
+    )
+
+
+def load_tags_one_by_one(ids):
+    for tag_id in ids:
+        Tag.objects.get(id=tag_id)
+
+
+class DetectorTests(TestCase):
+    """Test detecting repeated queries"""
+
+    def setUp(self):
+        user = create_user()
+        self.ids = [Tag.objects.create(user=user, name=f"t{i}").id for i in range(6)]
+
+    def test_repeated_query_detected(self):
+        """Test query repeated with different parameters is reported"""
+        with detect_n_plus_one(threshold=5) as detector:
+            load_tags_one_by_one(self.ids)
+
+        violations = detector.get_violations()
+        self.assertEqual(len(violations), 1)
+        self.assertEqual(violations[0].count, 6)
+        self.assertIn("load_tags_one_by_one", detector.get_report())
+
+    def test_below_threshold_ignored(self):
+        """Test query repeated up to threshold is not reported"""
+        with detect_n_plus_one(threshold=6) as detector:
+            load_tags_one_by_one(self.ids)
+
+        self.assertEqual(detector.get_report(), "")
+
+    def test_same_parameters_ignored(self):
+        """Test query repeated with same parameters is not reported"""
+        with detect_n_plus_one(threshold=5) as detector:
+            load_tags_one_by_one(self.ids[:1] * 6)
+
+        self.assertEqual(detector.get_violations(), [])
+
+    def test_bulk_query_ignored(self):
+        """Test single query loading many rows is not reported"""
+        with detect_n_plus_one(threshold=1) as detector:
+            list(Tag.objects.filter(id__in=self.ids))
+
+        self.assertEqual(detector.get_violations(), [])
+
+
+@override_settings(NPLUSONE_DETECTION=True, NPLUSONE_THRESHOLD=5)
+class MiddlewareTests(TestCase):
+    """Test reporting N+1 queries of requests"""
+
+    def setUp(self):
+        user = create_user()
+        self.ids = [Tag.objects.create(user=user, name=f"t{i}").id for i in range(6)]
+        self.request = RequestFactory().get("/api/recipe/tags/")
+
+    def get_response(self, request):
+        load_tags_one_by_one(self.ids)
+        return HttpResponse()
+
+    @override_settings(NPLUSONE_RAISE=True)
+    def test_raises(self):
+        """Test N+1 queries raise error when configured"""
+        middleware = NPlusOneMiddleware(self.get_response)
+
+        with self.assertRaisesMessage(NPlusOneError, "/api/recipe/tags/"):
+            middleware(self.request)
+
+    @override_settings(NPLUSONE_RAISE=False)
+    @patch("core.middleware.logger")
+    def test_logs(self, mock_logger):
+        """Test N+1 queries are logged by default"""
+        middleware = NPlusOneMiddleware(self.get_response)
+
+        res = middleware(self.request)
+
+        self.assertEqual(res.status_code, 200)
+        mock_logger.warning.assert_called_once()
@@ -0,0 +1,110 @@
+"""Tests for request profiler"""
+import tempfile
+import threading
+import time
+from pathlib import Path
+from django.contrib.auth import get_user_model
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+from rest_framework.test import APIClient
+from core import profiling
+
+TAGS_URL = reverse("recipe:tag-list")
+ASYNC_TAGS_URL = reverse("recipe:async-tag-list")
+
+
+def busy_wait(seconds):
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        pass
+
+
+class StackSamplerTests(SimpleTestCase):
+    def test_samples_thread_stack(self):
+        """Test stacks of sampled thread are collapsed outermost first"""
+        sampler = profiling.StackSampler(threading.get_ident(), interval=0.001)
+        sampler.start()
+        busy_wait(0.05)
+        sampler.stop()
+
+        self.assertTrue(sampler.stacks)
+        stack = sampler.stacks.most_common(1)[0][0]
+        self.assertTrue(stack.endswith(f"{__name__}:busy_wait"))
+        self.assertIn(f"{__name__}:test_samples_thread_stack;", stack)
+
+
+class SaveProfileTests(SimpleTestCase):
+    def setUp(self):
+        self.profiles_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.profiles_dir.cleanup)
+
+    def test_directory_bounded(self):
+        """Test only newest profiles are kept"""
+        with override_settings(
+            PROFILER_DIR=self.profiles_dir.name, PROFILER_MAX_FILES=2
+        ):
+            paths = [
+                profiling.save_profile({"a;b": 1}, "recipe:tag-list", 1, 0.01)
+                for _ in range(3)
+            ]
+
+        remaining = sorted(Path(self.profiles_dir.name).iterdir())
+        self.assertEqual(remaining, paths[1:])
+        self.assertEqual(paths[2].read_text(), "a;b 1\n")
+
+
+class ProfilerMiddlewareTests(TestCase):
+    """Test profiling requests"""
+
+    def setUp(self):
+        self.profiles_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.profiles_dir.cleanup)
+        self.user = get_user_model().objects.create_user(
+            email="test@example.com",
+            password="121212",
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+
+    def get_profiles(self):
+        return list(Path(self.profiles_dir.name).iterdir())
+
+    def get(self, **headers):
+        settings = {
+            "PROFILER_DIR": self.profiles_dir.name,
+            "PROFILER_TOKEN": "secret",
+            "PROFILER_SAMPLE_RATE": 0,
+        }
+        with override_settings(**settings):
+            return self.client.get(TAGS_URL, headers=headers)
+
+    def test_profiled_with_token(self):
+        """Test request with valid token is profiled and tagged"""
+        self.get(**{profiling.HEADER: "secret"})
+
+        profiles = self.get_profiles()
+        self.assertEqual(len(profiles), 1)
+        self.assertIn(f"-recipe_tag-list-user{self.user.id}-", profiles[0].name)
+
+    async def test_async_stack_profiled(self):
+        """Test request through async stack is profiled"""
+        settings = {
+            "PROFILER_DIR": self.profiles_dir.name,
+            "PROFILER_TOKEN": "secret",
+            "PROFILER_SAMPLE_RATE": 0,
+        }
+        with override_settings(**settings):
+            res = await self.async_client.get(
+                ASYNC_TAGS_URL, headers={profiling.HEADER: "secret"}
+            )
+
+        self.assertEqual(res.status_code, 401)
+        profiles = self.get_profiles()
+        self.assertEqual(len(profiles), 1)
+        self.assertIn("-recipe_async-tag-list-useranon-", profiles[0].name)
+
+    def test_not_profiled_with_invalid_token(self):
+        """Test request with invalid token isn't profiled"""
+        self.get(**{profiling.HEADER: "wrong"})
+
+        self.assertEqual(self.get_profiles(), [])
@@ -0,0 +1,106 @@
+"""Tests for renderers and parsers"""
+import io
+import uuid
+from datetime import datetime, timezone
+from decimal import Decimal
+import msgpack
+from django.contrib.auth import get_user_model
+from django.test import SimpleTestCase, TestCase
+from django.urls import reverse
+from django.utils.translation import gettext_lazy
+from rest_framework import status
+from rest_framework.exceptions import ParseError
+from rest_framework.test import APIClient
+from core.models import Recipe
+from core.parsers import MessagePackParser, ORJSONParser
+from core.renderers import MessagePackRenderer, ORJSONRenderer
+
+RECIPE_LIST_URL = reverse("recipe:recipe-list")
+
+
+class RendererTests(SimpleTestCase):
+    def test_json_types(self):
+        """Test Decimal, UUID, datetime and lazy strings are rendered"""
+        data = {
+            "price": Decimal("199.99"),
+            "id": uuid.UUID("12345678123456781234567812345678"),
+            "created_at": datetime(2024, 1, 2, 3, 4, 5, tzinfo=timezone.utc),
+            "label": gettext_lazy("label"),
+        }
+
+        rendered = ORJSONRenderer().render(data)
+
+        self.assertEqual(
+            rendered,
+            b'{"price":"199.99","id":"12345678-1234-5678-1234-567812345678",'
+            b'"created_at":"2024-01-02T03:04:05Z","label":"label"}',
+        )
+
+    def test_json_indent(self):
+        """Test indentation requested in Accept header"""
+        rendered = ORJSONRenderer().render({"a": 1}, "application/json; indent=4")
+
+        self.assertEqual(rendered, b'{\n  "a": 1\n}')
+
+    def test_msgpack_round_trip(self):
+        """Test rendered MessagePack is parsed back"""
+        data = {"title": "pasta", "price": Decimal("9.99"), "tags": [1, 2]}
+
+        rendered = MessagePackRenderer().render(data)
+        parsed = MessagePackParser().parse(io.BytesIO(rendered))
+
+        self.assertEqual(parsed, {"title": "pasta", "price": "9.99", "tags": [1, 2]})
+
+    def test_parse_errors(self):
+        """Test malformed bodies raise parse error"""
+        with self.assertRaises(ParseError):
+            ORJSONParser().parse(io.BytesIO(b"{invalid"))
+        with self.assertRaises(ParseError):
+            MessagePackParser().parse(io.BytesIO(b"\xc1"))
+
+
+class ContentNegotiationTests(TestCase):
+    """Test formats negotiated by API clients"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            email="test@example.com",
+            password="121212",
+        )
+        self.client.force_authenticate(user=self.user)
+        Recipe.objects.create(
+            user=self.user,
+            title="sample title",
+            time_minutes=Decimal("7.5"),
+            price=Decimal("199.99"),
+        )
+
+    def test_msgpack_response(self):
+        """Test MessagePack is rendered when client accepts it"""
+        json_res = self.client.get(RECIPE_LIST_URL)
+        res = self.client.get(RECIPE_LIST_URL, HTTP_ACCEPT="application/msgpack")
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res["Content-Type"], "application/msgpack")
+        self.assertEqual(msgpack.unpackb(res.content), json_res.json())
+        self.assertLess(len(res.content), len(json_res.content))
+
+    def test_json_is_default(self):
+        """Test JSON is rendered for clients accepting anything"""
+        res = self.client.get(RECIPE_LIST_URL, HTTP_ACCEPT="*/*")
+
+        self.assertEqual(res["Content-Type"], "application/json")
+
+    def test_msgpack_request(self):
+        """Test recipe is created from MessagePack body"""
+        payload = {"title": "pasta", "time_minutes": "10.5", "price": "9.99"}
+
+        res = self.client.post(
+            RECIPE_LIST_URL,
+            msgpack.packb(payload),
+            content_type="application/msgpack",
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertTrue(Recipe.objects.filter(title="pasta").exists())
@@ -0,0 +1,70 @@
+"""Tests for prebuilt OpenAPI schema"""
+import io
+import tempfile
+from pathlib import Path
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import SimpleTestCase, override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+from core import schema
+
+SCHEMA_URL = reverse("api-schema")
+
+
+class SchemaViewTests(SimpleTestCase):
+    def setUp(self):
+        schema.clear()
+        self.addCleanup(schema.clear)
+        self.client = APIClient()
+
+    def test_serves_artifact(self):
+        """Test schema is served from artifact with an ETag"""
+        content, version = schema.get_schema()
+
+        res = self.client.get(SCHEMA_URL, HTTP_ACCEPT_ENCODING="identity")
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.content, content)
+        self.assertEqual(res["Content-Type"], schema.MEDIA_TYPE)
+        self.assertEqual(res["ETag"], f'"{version}"')
+        self.assertEqual(res["Cache-Control"], "no-cache")
+
+    def test_not_modified(self):
+        """Test matching If-None-Match gets 304 without a body"""
+        etag = self.client.get(SCHEMA_URL)["ETag"]
+
+        res = self.client.get(SCHEMA_URL, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(res.content, b"")
+
+    def test_missing_artifact(self):
+        """Test schema is generated when artifact wasn't built"""
+        path = Path(tempfile.mkdtemp()) / "missing.json"
+        with override_settings(OPENAPI_SCHEMA_PATH=path):
+            with self.assertLogs("core.schema", "WARNING"):
+                content, _ = schema.get_schema()
+
+        self.assertEqual(content, schema.generate_schema())
+
+
+class BuildSchemaCommandTests(SimpleTestCase):
+    def test_artifact_up_to_date(self):
+        """Test committed artifact matches schema of the code"""
+        call_command("build_schema", check=True, stdout=io.StringIO())
+
+    def test_build_and_check(self):
+        """Test artifact is written and a stale one fails the check"""
+        path = Path(tempfile.mkdtemp()) / "openapi.json"
+        with override_settings(OPENAPI_SCHEMA_PATH=path):
+            with self.assertRaises(CommandError):
+                call_command("build_schema", check=True)
+
+            call_command("build_schema", stdout=io.StringIO())
+            self.assertEqual(path.read_bytes(), schema.generate_schema())
+
+            path.write_bytes(path.read_bytes().replace(b"recipe", b"dish"))
+            with self.assertRaises(CommandError):
+                call_command("build_schema", check=True)
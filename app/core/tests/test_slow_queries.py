@@ -0,0 +1,170 @@
+"""Tests for slow query log"""
+import json
+import logging
+from decimal import Decimal
+from unittest import skipUnless
+from unittest.mock import Mock, patch
+from django.contrib.auth import get_user_model
+from django.conf import settings
+from django.db import connection
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+from core.access_log import JSONFormatter
+from core.db import slow_queries
+from core.db.sql import fingerprint
+from core.models import Tag
+
+RECIPE_LIST_URL = reverse("recipe:recipe-list")
+SLOW_QUERIES_URL = reverse("admin-slow-queries")
+
+
+class FingerprintTests(SimpleTestCase):
+    def test_values_replaced(self):
+        """Test queries differing only in values share fingerprint"""
+        first = fingerprint("SELECT * FROM t1 WHERE a = 'x' AND b IN (1, 2)")
+        second = fingerprint("SELECT *\n FROM t1 WHERE a = 'it''s' AND b IN (3)")
+
+        self.assertEqual(first, "SELECT * FROM t1 WHERE a = ? AND b IN (...)")
+        self.assertEqual(first, second)
+
+    def test_parameters_replaced(self):
+        """Test query parameters of any count share fingerprint"""
+        self.assertEqual(
+            fingerprint('SELECT "id" FROM "core_tag" WHERE "id" IN (%s, %s)'),
+            fingerprint('SELECT "id" FROM "core_tag" WHERE "id" IN (%s)'),
+        )
+
+
+class InstallTests(SimpleTestCase):
+    def test_installed_first(self):
+        """Test wrapper goes before wrappers of requests, which pop the last"""
+        request_wrapper = Mock()
+        new_connection = Mock(execute_wrappers=[request_wrapper])
+
+        slow_queries.install(sender=None, connection=new_connection)
+        new_connection.execute_wrappers.pop()
+
+        self.assertEqual(
+            new_connection.execute_wrappers, [slow_queries.record_slow_queries]
+        )
+
+
+@override_settings(SLOW_QUERY_EXPLAIN_SAMPLE_RATE=0)
+class SlowQueryLoggingTests(SimpleTestCase):
+    def test_logged_as_json_with_entry(self):
+        """Test logged line carries fingerprint and origin of the query"""
+        handler_name = settings.LOGGING["loggers"][slow_queries.__name__]["handlers"][0]
+        formatter_name = settings.LOGGING["handlers"][handler_name]["formatter"]
+        self.assertEqual(formatter_name, "json")
+
+        with self.assertLogs(slow_queries.__name__, logging.WARNING) as logs:
+            slow_queries.record(connection, "SELECT 1 WHERE 2 = 2", None, False, 500)
+        slow_queries.clear()
+
+        entry = json.loads(JSONFormatter().format(logs.records[0]))
+        self.assertEqual(entry["fingerprint"], "SELECT ? WHERE ? = ?")
+        self.assertEqual(entry["duration_ms"], 500)
+        self.assertIn("origin", entry)
+
+
+@override_settings(SLOW_QUERY_THRESHOLD_MS=0, SLOW_QUERY_EXPLAIN_SAMPLE_RATE=0)
+@patch("core.db.slow_queries.logger")
+class SlowQueryLogTests(TestCase):
+    """Test recording slow queries"""
+
+    @classmethod
+    def setUpClass(cls):
+        # Keep queries of fixtures, logged as slow too, out of test output
+        patcher = patch("core.db.slow_queries.logger")
+        patcher.start()
+        cls.addClassCleanup(patcher.stop)
+        super().setUpClass()
+
+    def setUp(self):
+        slow_queries.clear()
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            email="test@example.com",
+            password="121212",
+        )
+        self.client.force_authenticate(user=self.user)
+
+    def test_query_origin(self, mock_logger):
+        """Test slow query is attributed to project code running it"""
+        payload = {
+            "title": "sample title",
+            "time_minutes": Decimal("7.5"),
+            "price": Decimal("199.99"),
+            "tags": [{"name": "dinner"}],
+        }
+        slow_queries.clear()
+        res = self.client.post(RECIPE_LIST_URL, payload, format="json")
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        origins = {entry["origin"] for entry in slow_queries.get_slow_queries()}
+        self.assertIn("recipe.serializers.RecipeDetailSerializer._assign_tags", origins)
+        self.assertIn("recipe.serializers.RecipeDetailSerializer.create", origins)
+        mock_logger.warning.assert_called()
+
+    def test_query_run_by_framework_attributed_to_view(self, mock_logger):
+        """Test query evaluated in DRF code is attributed to project view"""
+        slow_queries.clear()
+        self.client.get(RECIPE_LIST_URL)
+
+        entry = slow_queries.get_slow_queries()[0]
+        self.assertEqual(entry["origin"], "recipe.views.RecipeViewSet.list")
+        self.assertIn("core_recipe", entry["fingerprint"])
+
+    def test_worst_queries_grouped(self, mock_logger):
+        """Test slow queries grouped by fingerprint"""
+        slow_queries.clear()
+        Tag.objects.filter(name="a").exists()
+        Tag.objects.filter(name="b").exists()
+
+        worst = slow_queries.get_worst_queries()
+
+        self.assertEqual(len(worst), 1)
+        self.assertEqual(worst[0]["count"], 2)
+
+    def test_buffer_bounded(self, mock_logger):
+        """Test only latest slow queries are kept"""
+        slow_queries.clear()
+        for i in range(slow_queries._buffer.maxlen + 10):
+            Tag.objects.filter(id=i).exists()
+
+        self.assertEqual(
+            len(slow_queries.get_slow_queries()), slow_queries._buffer.maxlen
+        )
+
+    @skipUnless(connection.vendor == "postgresql", "EXPLAIN ANALYZE is PostgreSQL")
+    @override_settings(SLOW_QUERY_EXPLAIN_SAMPLE_RATE=1)
+    def test_plan_captured(self, mock_logger):
+        """Test sampled slow read gets its plan"""
+        slow_queries.clear()
+        list(Tag.objects.filter(name="a"))
+
+        entry = slow_queries.get_slow_queries()[0]
+        self.assertIn("Buffers", entry["plan"] or "")
+
+    def test_admin_view(self, mock_logger):
+        """Test staff can browse slow queries"""
+        admin_user = get_user_model().objects.create_superuser(
+            email="admin@example.com",
+            password="121212",
+        )
+        self.client.force_login(admin_user)
+        Tag.objects.filter(name="a").exists()
+
+        res = self.client.get(SLOW_QUERIES_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertContains(res, "core_tag")
+
+    def test_admin_view_requires_staff(self, mock_logger):
+        """Test slow queries are hidden from regular users"""
+        self.client.force_login(self.user)
+        res = self.client.get(SLOW_QUERIES_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_302_FOUND)
@@ -0,0 +1,37 @@
+"""Tests for the test runner"""
+import argparse
+import io
+import unittest
+from django.contrib.auth.hashers import get_hasher
+from django.test import SimpleTestCase
+from core.test_runner import TestRunner, TimedTextTestResult
+
+
+class TestRunnerTests(SimpleTestCase):
+    """Test the test runner"""
+
+    def test_fast_hasher_used(self):
+        """Test passwords are hashed with the fast hasher in tests"""
+        self.assertEqual(get_hasher().algorithm, "md5")
+
+    def test_module_times_recorded(self):
+        """Test wall-clock time of tests is summed by module"""
+
+        class SampleTests(unittest.TestCase):
+            def test_pass(self):
+                pass
+
+        suite = unittest.TestLoader().loadTestsFromTestCase(SampleTests)
+        result = TimedTextTestResult(io.StringIO(), descriptions=False, verbosity=0)
+        suite.run(result)
+
+        self.assertEqual(list(result.module_times), [__name__])
+        self.assertGreater(result.module_times[__name__], 0)
+
+    def test_keeps_database_by_default(self):
+        """Test test databases are kept unless --fresh-db is passed"""
+        parser = argparse.ArgumentParser()
+        TestRunner.add_arguments(parser)
+
+        self.assertTrue(parser.parse_args([]).keepdb)
+        self.assertFalse(parser.parse_args(["--fresh-db"]).keepdb)
@@ -0,0 +1,145 @@
+"""Tests for token bucket throttling"""
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import Mock, patch
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.cache.backends.redis import RedisCacheClient
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+from prometheus_client import REGISTRY
+from rest_framework import status
+from rest_framework.test import APIClient
+from core import throttling
+from core.throttling import LoginThrottle, TokenBucketThrottle
+
+TOKEN_URL = reverse("user:token")
+RECIPES_URL = reverse("recipe:recipe-list")
+
+
+def throttle_rates(**rates):
+    return override_settings(
+        REST_FRAMEWORK={
+            **settings.REST_FRAMEWORK,
+            "DEFAULT_THROTTLE_RATES": {
+                "login": None,
+                "upload": None,
+                "write": None,
+                "read": None,
+                **rates,
+            },
+        }
+    )
+
+
+def throttled_count(scope):
+    labels = {"scope": scope}
+    return REGISTRY.get_sample_value("api_throttled_requests_total", labels) or 0
+
+
+class TokenBucketThrottleTests(TestCase):
+    """Test throttling requests with token buckets in cache"""
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.timer = Mock(return_value=1000.0)
+        patcher = patch.object(TokenBucketThrottle, "timer", self.timer)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def login(self):
+        payload = {"email": "test@example.com", "password": "wrong"}
+        return self.client.post(TOKEN_URL, payload)
+
+    @throttle_rates(login="2/min")
+    def test_burst_then_retry_after(self):
+        """Test requests over burst are rejected with time to next token"""
+        before = throttled_count("login")
+        self.assertEqual(self.login().status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self.login().status_code, status.HTTP_400_BAD_REQUEST)
+
+        self.timer.return_value += 10
+        res = self.login()
+
+        self.assertEqual(res.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertEqual(res["Retry-After"], "20")
+        self.assertEqual(throttled_count("login"), before + 1)
+
+    @throttle_rates(login="2/min")
+    def test_bucket_refilled(self):
+        """Test tokens are refilled at the average rate"""
+        for _ in range(2):
+            self.login()
+        self.assertEqual(self.login().status_code, 429)
+
+        self.timer.return_value += 30
+
+        self.assertEqual(self.login().status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self.login().status_code, 429)
+
+    @throttle_rates(read="1/min", write="1/min")
+    def test_buckets_per_user_and_scope(self):
+        """Test users and read and write requests have separate buckets"""
+        users = [
+            get_user_model().objects.create_user(email=f"u{i}@example.com")
+            for i in range(2)
+        ]
+        payload = {"title": "Soup", "time_minutes": 5, "price": "1.00"}
+        for user in users:
+            self.client.force_authenticate(user)
+            self.assertEqual(self.client.get(RECIPES_URL).status_code, 200)
+            self.assertEqual(self.client.post(RECIPES_URL, payload).status_code, 201)
+
+        self.assertEqual(self.client.get(RECIPES_URL).status_code, 429)
+
+    @throttle_rates(login="5/min")
+    @patch.object(LoginThrottle, "get_cache_key", Mock(return_value="bucket"))
+    def test_tokens_taken_atomically(self):
+        """Test concurrent requests don't take more tokens than bucket has"""
+        barrier = threading.Barrier(20)
+
+        def request():
+            barrier.wait()
+            return LoginThrottle().allow_request(None, None)
+
+        with ThreadPoolExecutor(max_workers=20) as executor:
+            allowed = list(executor.map(lambda _: request(), range(20)))
+
+        self.assertEqual(allowed.count(True), 5)
+
+    @throttle_rates(login="1/min")
+    @patch.object(throttling, "_gcra_script", None)
+    @patch("core.throttling.get_redis_client")
+    def test_redis_script_registered_once(self, get_redis_client):
+        """Test Lua script isn't registered again for every request"""
+        client = get_redis_client.return_value
+        client.register_script.return_value.side_effect = ["0", "30"]
+
+        self.assertEqual(self.login().status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self.login().status_code, 429)
+
+        client.register_script.assert_called_once_with(throttling.GCRA_SCRIPT)
+
+
+@override_settings(
+    CACHES={
+        "default": {
+            "BACKEND": "django.core.cache.backends.redis.RedisCache",
+            "LOCATION": "redis://localhost:6379/0",
+        }
+    }
+)
+class RedisClientTests(SimpleTestCase):
+    def test_private_api_change_falls_back(self):
+        """Test buckets fall back to process lock without Redis client API"""
+        with patch.object(RedisCacheClient, "get_client", side_effect=AttributeError):
+            self.assertIsNone(throttling.get_redis_client())
+
+    def test_other_caches_use_process_lock(self):
+        """Test client is only returned for Redis cache"""
+        self.assertIsNotNone(throttling.get_redis_client())
+        locmem = {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}
+        with override_settings(CACHES={"default": locmem}):
+            self.assertIsNone(throttling.get_redis_client())
@@ -0,0 +1,156 @@
+"""Tests for request tracing"""
+import json
+import tempfile
+from decimal import Decimal
+from unittest.mock import patch
+from django.contrib.auth import get_user_model
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+from prometheus_client import REGISTRY
+from rest_framework.test import APIClient
+from core import tracing
+from core.models import Recipe
+from recipe.tests.test_recipe_api import create_image_file, get_image_upload_url
+
+RECIPE_LIST_URL = reverse("recipe:recipe-list")
+
+
+class SpanTests(SimpleTestCase):
+    def test_nested_spans(self):
+        """Test spans get parent of the span they were opened in"""
+        token = tracing.start_trace("request-1")
+        trace = tracing.get_trace()
+        with tracing.span("outer") as outer:
+            with tracing.span("inner", key="value") as inner:
+                pass
+        tracing._trace.reset(token)
+
+        self.assertIsNone(outer.parent_id)
+        self.assertEqual(inner.parent_id, outer.span_id)
+        self.assertEqual(inner.attributes, {"key": "value"})
+        self.assertEqual(len(trace.trace_id), 32)
+
+    def test_no_trace(self):
+        """Test spans outside of sampled request are no-op"""
+        with tracing.span("outside") as span:
+            self.assertIsNone(span)
+
+    def test_to_otlp(self):
+        """Test spans are converted to OTLP JSON"""
+        exported_span = {
+            "trace_id": "a" * 32,
+            "span_id": "b" * 16,
+            "parent_id": None,
+            "name": "request",
+            "start_ns": 10,
+            "duration_ns": 5,
+            "attributes": {"method": "GET"},
+        }
+
+        payload = tracing.to_otlp([exported_span])
+
+        otlp_span = payload["resourceSpans"][0]["scopeSpans"][0]["spans"][0]
+        self.assertEqual(otlp_span["traceId"], "a" * 32)
+        self.assertEqual(otlp_span["endTimeUnixNano"], "15")
+        self.assertEqual(
+            otlp_span["attributes"],
+            [{"key": "method", "value": {"stringValue": "GET"}}],
+        )
+
+    def test_exporter_drops_when_full(self):
+        """Test traces are dropped instead of blocking on full queue"""
+        exporter = tracing.Exporter(queue_size=1)
+        exporter._pid = tracing.os.getpid()
+
+        dropped = REGISTRY.get_sample_value("traces_dropped_total") or 0
+
+        exporter.export([{"name": "first"}])
+        exporter.export([{"name": "second"}])
+
+        self.assertEqual(exporter.dropped, 1)
+        self.assertEqual(REGISTRY.get_sample_value("traces_dropped_total"), dropped + 1)
+
+
+class TracingMiddlewareTests(TestCase):
+    """Test tracing requests"""
+
+    def setUp(self):
+        trace_file = tempfile.NamedTemporaryFile(suffix=".jsonl")
+        self.addCleanup(trace_file.close)
+        self.trace_path = trace_file.name
+        settings = override_settings(
+            TRACING_EXPORTER="file",
+            TRACING_FILE=self.trace_path,
+            TRACING_SAMPLE_RATE=1,
+        )
+        settings.enable()
+        self.addCleanup(settings.disable)
+        self.user = get_user_model().objects.create_user(
+            email="test@example.com",
+            password="121212",
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+        self.recipe = Recipe.objects.create(
+            user=self.user,
+            title="sample title",
+            time_minutes=Decimal("7.5"),
+            price=Decimal("5.50"),
+        )
+
+    def get_spans(self):
+        tracing.get_exporter().flush()
+        with open(self.trace_path) as trace_file:
+            return [json.loads(line) for line in trace_file]
+
+    def test_request_phases_traced(self):
+        """Test spans of request phases share trace of the request"""
+        res = self.client.get(RECIPE_LIST_URL)
+
+        spans = self.get_spans()
+        names = [span["name"] for span in spans]
+        for name in ("request", "get_queryset", "sql", "serialize", "render"):
+            self.assertIn(name, names)
+        self.assertEqual({span["trace_id"] for span in spans}, {spans[0]["trace_id"]})
+        root = spans[names.index("request")]
+        self.assertIsNone(root["parent_id"])
+        self.assertEqual(
+            root["attributes"]["request_id"], res[tracing.REQUEST_ID_HEADER]
+        )
+        self.assertEqual(
+            res[tracing.REQUEST_ID_HEADER].replace("-", ""), root["trace_id"]
+        )
+
+    def test_request_id_propagated(self):
+        """Test request id sent by client is used as trace id"""
+        request_id = "0af7651916cd43dd8448eb211c80319c"
+        res = self.client.get(
+            RECIPE_LIST_URL, headers={tracing.REQUEST_ID_HEADER: request_id}
+        )
+
+        self.assertEqual(res[tracing.REQUEST_ID_HEADER], request_id)
+        self.assertEqual(self.get_spans()[0]["trace_id"], request_id)
+
+    def test_image_upload_traced(self):
+        """Test image processing and storage are traced"""
+        with create_image_file() as image_file:
+            self.client.post(
+                get_image_upload_url(self.recipe.id),
+                {"image": image_file},
+                format="multipart",
+            )
+        self.recipe.refresh_from_db()
+        self.recipe.image.delete()
+
+        names = [span["name"] for span in self.get_spans()]
+        self.assertIn("image.placeholder", names)
+        self.assertIn("image.save", names)
+
+    @patch("core.tracing.Exporter.export")
+    def test_unsampled_not_traced(self, mock_export):
+        """Test requests outside of sample only get request id"""
+        with override_settings(TRACING_SAMPLE_RATE=0):
+            res = self.client.get(RECIPE_LIST_URL)
+
+        self.assertTrue(res.has_header(tracing.REQUEST_ID_HEADER))
+        mock_export.assert_not_called()
@@ -0,0 +1,175 @@
+"""Token bucket throttling shared by all workers
+
+A bucket of every client and scope holds up to N tokens of an "N/period"
+rate and is refilled continuously by N tokens per period, so a client can
+burst N requests and then continue at the average rate. Buckets live in
+the default cache (Redis in production), so limits hold across workers.
+
+A bucket is kept as the time it will be full again (GCRA), a single value
+updated atomically: by a Lua script in Redis, under a lock of the process
+with other caches, which are local to the process (development, tests).
+"""
+import math
+import threading
+from django.conf import settings
+from django.core.cache import DEFAULT_CACHE_ALIAS, caches
+from django.core.cache.backends.redis import RedisCache
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework.settings import api_settings
+from rest_framework.throttling import SimpleRateThrottle
+from core.metrics import THROTTLED
+
+# Takes key of the bucket and now, seconds per token and period as
+# arguments, returns seconds to wait for a token, 0 if one was taken.
+# Numbers are returned as strings, Redis truncates Lua numbers to integers
+GCRA_SCRIPT = """
+local now = tonumber(ARGV[1])
+local interval = tonumber(ARGV[2])
+local period = tonumber(ARGV[3])
+local full_at = math.max(tonumber(redis.call("GET", KEYS[1]) or now), now)
+local new_full_at = full_at + interval
+if new_full_at - now > period then
+    return tostring(new_full_at - now - period)
+end
+local expire_ms = math.ceil((new_full_at - now) * 1000)
+redis.call("SET", KEYS[1], tostring(new_full_at), "PX", expire_ms)
+return "0"
+"""
+
+_local_lock = threading.Lock()
+_gcra_script = None
+
+
+def get_redis_client():
+    """Return client of the default cache if it's Redis, otherwise None
+
+    Django has no public API for the client. Should the private one change,
+    buckets fall back to the process lock instead of failing requests.
+    """
+    # `cache` of DRF throttles is a proxy of the default cache backend
+    backend = caches[DEFAULT_CACHE_ALIAS]
+    if not isinstance(backend, RedisCache):
+        return None
+    try:
+        return backend._cache.get_client(write=True)
+    except AttributeError:
+        return None
+
+
+def get_gcra_script(client):
+    """Return GCRA_SCRIPT registered once per process"""
+    global _gcra_script
+    if _gcra_script is None:
+        _gcra_script = client.register_script(GCRA_SCRIPT)
+    return _gcra_script
+
+
+def get_unthrottled_settings():
+    """Return REST_FRAMEWORK setting with rates of every scope disabled"""
+    rates = settings.REST_FRAMEWORK["DEFAULT_THROTTLE_RATES"]
+    return {
+        **settings.REST_FRAMEWORK,
+        "DEFAULT_THROTTLE_RATES": {scope: None for scope in rates},
+    }
+
+
+class TokenBucketThrottle(SimpleRateThrottle):
+    """Throttle requests of a scope with a token bucket of every client
+
+    Authenticated users are identified by id, anonymous ones by IP address
+    (see NUM_PROXIES setting). A rate of None disables the throttle.
+    """
+
+    def __init__(self):
+        self.wait_seconds = None
+        super().__init__()
+
+    def get_rate(self):
+        # Class attribute is bound on import, missing overridden settings
+        self.THROTTLE_RATES = api_settings.DEFAULT_THROTTLE_RATES
+        return super().get_rate()
+
+    def applies_to(self, request, view):
+        return True
+
+    def get_cache_key(self, request, view):
+        if not self.applies_to(request, view):
+            return None
+        if request.user and request.user.is_authenticated:
+            ident = f"user_{request.user.pk}"
+        else:
+            ident = f"ip_{self.get_ident(request)}"
+        return self.cache_format % {"scope": self.scope, "ident": ident}
+
+    def allow_request(self, request, view):
+        if self.rate is None:
+            return True
+        self.key = self.get_cache_key(request, view)
+        if self.key is None:
+            return True
+
+        interval = self.duration / self.num_requests
+        client = get_redis_client()
+        if client is not None:
+            wait = self.take_token_in_redis(client, interval)
+        else:
+            wait = self.take_token(interval)
+        if wait <= 0:
+            return True
+
+        # Rounded so float error doesn't add a second to Retry-After
+        self.wait_seconds = round(wait, 3)
+        THROTTLED.labels(self.scope).inc()
+        return False
+
+    def take_token_in_redis(self, client, interval):
+        """Take token from bucket with GCRA_SCRIPT, return seconds to wait"""
+        key = self.cache.make_and_validate_key(self.key)
+        script = get_gcra_script(client)
+        args = [self.timer(), interval, self.duration]
+        return float(script(keys=[key], args=args, client=client))
+
+    def take_token(self, interval):
+        """Take token from bucket in a cache local to the process"""
+        with _local_lock:
+            now = self.timer()
+            full_at = max(self.cache.get(self.key, now), now)
+            new_full_at = full_at + interval
+            if new_full_at - now > self.duration:
+                return new_full_at - now - self.duration
+            self.cache.set(self.key, new_full_at, math.ceil(new_full_at - now))
+        return 0
+
+    def wait(self):
+        # DRF sends it rounded up as Retry-After
+        return self.wait_seconds
+
+
+class LoginThrottle(TokenBucketThrottle):
+    """Throttle requests hashing passwords, i.e. token and registration"""
+
+    scope = "login"
+
+
+class UploadThrottle(TokenBucketThrottle):
+    """Throttle image uploads"""
+
+    scope = "upload"
+
+
+class ReadThrottle(TokenBucketThrottle):
+    """Throttle safe requests"""
+
+    scope = "read"
+
+    def applies_to(self, request, view):
+        return request.method in SAFE_METHODS
+
+
+class WriteThrottle(TokenBucketThrottle):
+    """Throttle unsafe requests"""
+
+    scope = "write"
+
+    def applies_to(self, request, view):
+        return request.method not in SAFE_METHODS
@@ -0,0 +1,305 @@
+"""Lightweight tracing of request phases
+
+A sampled request gets a trace whose spans (authentication, queryset,
+SQL, serialization, rendering, image I/O) are exported after the response
+by a background thread. Unsampled requests only pay for a context variable
+lookup per span.
+"""
+import contextvars
+import functools
+import json
+import logging
+import os
+import queue
+import random
+import re
+import threading
+import time
+import urllib.request
+import uuid
+from contextlib import contextmanager
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+from core import metrics
+
+logger = logging.getLogger(__name__)
+
+REQUEST_ID_HEADER = "X-Request-ID"
+REQUEST_ID_RE = re.compile(r"^[\w-]{1,64}$")
+SERVICE_NAME = "recipe-app-api"
+
+_trace = contextvars.ContextVar("trace", default=None)
+
+
+class Span:
+    __slots__ = ("name", "span_id", "parent_id", "start_ns", "end_ns", "attributes")
+
+    def __init__(self, name, parent_id, attributes):
+        self.name = name
+        self.span_id = uuid.uuid4().hex[:16]
+        self.parent_id = parent_id
+        self.start_ns = time.time_ns()
+        self.end_ns = None
+        self.attributes = attributes
+
+    def end(self):
+        self.end_ns = time.time_ns()
+
+    def to_dict(self, trace_id):
+        return {
+            "trace_id": trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "name": self.name,
+            "start_ns": self.start_ns,
+            "duration_ns": self.end_ns - self.start_ns,
+            "attributes": self.attributes,
+        }
+
+
+class Trace:
+    """Spans of one request"""
+
+    def __init__(self, request_id):
+        self.request_id = request_id
+        # Clients may send ids that aren't valid W3C/OTLP trace ids
+        trace_id = request_id.replace("-", "").lower()
+        if not re.fullmatch(r"[0-9a-f]{32}", trace_id):
+            trace_id = uuid.uuid4().hex
+        self.trace_id = trace_id
+        self.spans = []
+        self._open_spans = []
+
+    def start_span(self, name, attributes):
+        parent_id = self._open_spans[-1].span_id if self._open_spans else None
+        if parent_id is None:
+            # Matches the trace with access log and response of the request
+            attributes = {"request_id": self.request_id, **attributes}
+        span = Span(name, parent_id, attributes)
+        self.spans.append(span)
+        self._open_spans.append(span)
+        return span
+
+    def end_span(self, span):
+        span.end()
+        self._open_spans.remove(span)
+
+    def to_dicts(self):
+        return [span.to_dict(self.trace_id) for span in self.spans if span.end_ns]
+
+
+def get_request_id(request):
+    """Return id sent by client (e.g. a proxy) or a new one"""
+    request_id = request.headers.get(REQUEST_ID_HEADER, "")
+    if REQUEST_ID_RE.match(request_id):
+        return request_id
+    return uuid.uuid4().hex
+
+
+def is_sampled():
+    return bool(settings.TRACING_EXPORTER) and (
+        random.random() < settings.TRACING_SAMPLE_RATE
+    )
+
+
+def start_trace(request_id):
+    """Start trace of current request, return token to finish it with"""
+    return _trace.set(Trace(request_id))
+
+
+def finish_trace(token):
+    """Stop tracing current request and queue its spans for export"""
+    trace = _trace.get()
+    _trace.reset(token)
+    get_exporter().export(trace.to_dicts())
+
+
+def get_trace():
+    """Return trace of current request or None when it isn't sampled"""
+    return _trace.get()
+
+
+@contextmanager
+def span(name, **attributes):
+    """Measure the block as a span of current trace, if any"""
+    trace = _trace.get()
+    if trace is None:
+        yield None
+        return
+    current = trace.start_span(name, attributes)
+    try:
+        yield current
+    finally:
+        trace.end_span(current)
+
+
+def start_span(name, **attributes):
+    """Start span to be ended later with `end_span`, e.g. in a callback"""
+    trace = _trace.get()
+    if trace is None:
+        return None
+    return trace, trace.start_span(name, attributes)
+
+
+def end_span(started):
+    if started is not None:
+        trace, started_span = started
+        trace.end_span(started_span)
+
+
+def trace_query(execute, sql, params, many, context):
+    """Database execute wrapper recording every statement as a span"""
+    alias = context["connection"].alias
+    with span("sql", database=alias, statement=sql[:1000]):
+        return execute(sql, params, many, context)
+
+
+def traced(name):
+    """Decorator measuring every call of a function as a span"""
+
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with span(name):
+                return func(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+class TracedViewMixin:
+    """Trace authentication of a DRF view"""
+
+    def perform_authentication(self, request):
+        with span("authenticate"):
+            super().perform_authentication(request)
+
+
+class Exporter:
+    """Export finished traces from a background thread
+
+    Traces are dropped instead of blocking requests when the queue is full.
+    """
+
+    def __init__(self, queue_size=None):
+        self.queue = queue.Queue(queue_size or settings.TRACING_QUEUE_SIZE)
+        self.dropped = 0
+        self._thread = None
+        self._pid = None
+
+    def export(self, spans):
+        if not spans:
+            return
+        # Thread of a parent process doesn't survive fork into workers
+        if self._pid != os.getpid():
+            self._pid = os.getpid()
+            self._thread = threading.Thread(target=self._run, daemon=True)
+            self._thread.start()
+        try:
+            self.queue.put_nowait(spans)
+        except queue.Full:
+            self.dropped += 1
+            metrics.TRACES_DROPPED.inc()
+
+    def flush(self):
+        """Wait until queued traces are exported"""
+        self.queue.join()
+
+    def _run(self):
+        while True:
+            spans = self.queue.get()
+            try:
+                self.write(spans)
+            except Exception:
+                logger.exception("Failed to export trace")
+            finally:
+                self.queue.task_done()
+
+    def write(self, spans):
+        raise NotImplementedError
+
+
+class FileExporter(Exporter):
+    """Append spans as JSON lines to a file"""
+
+    def __init__(self, path, **kwargs):
+        super().__init__(**kwargs)
+        self.path = path
+
+    def write(self, spans):
+        with open(self.path, "a") as trace_file:
+            for exported_span in spans:
+                trace_file.write(json.dumps(exported_span) + "\n")
+
+
+class OTLPExporter(Exporter):
+    """Send spans to an OpenTelemetry collector with OTLP/HTTP JSON"""
+
+    def __init__(self, endpoint, timeout=5, **kwargs):
+        super().__init__(**kwargs)
+        self.endpoint = endpoint
+        self.timeout = timeout
+
+    def write(self, spans):
+        request = urllib.request.Request(
+            self.endpoint,
+            data=json.dumps(to_otlp(spans)).encode(),
+            headers={"Content-Type": "application/json"},
+            method="POST",
+        )
+        with urllib.request.urlopen(request, timeout=self.timeout):
+            pass
+
+
+def to_otlp_attributes(values):
+    return [
+        {"key": key, "value": {"stringValue": str(value)}}
+        for key, value in values.items()
+    ]
+
+
+def to_otlp_span(exported_span):
+    end_ns = exported_span["start_ns"] + exported_span["duration_ns"]
+    return {
+        "traceId": exported_span["trace_id"],
+        "spanId": exported_span["span_id"],
+        "parentSpanId": exported_span["parent_id"] or "",
+        "name": exported_span["name"],
+        "kind": 1,
+        "startTimeUnixNano": str(exported_span["start_ns"]),
+        "endTimeUnixNano": str(end_ns),
+        "attributes": to_otlp_attributes(exported_span["attributes"]),
+    }
+
+
+def to_otlp(spans):
+    """Return spans as OTLP `ExportTraceServiceRequest` JSON"""
+    resource = {"attributes": to_otlp_attributes({"service.name": SERVICE_NAME})}
+    scope_spans = {
+        "scope": {"name": __name__},
+        "spans": [to_otlp_span(exported_span) for exported_span in spans],
+    }
+    return {"resourceSpans": [{"resource": resource, "scopeSpans": [scope_spans]}]}
+
+
+_exporter = None
+
+
+def get_exporter():
+    """Return exporter configured by TRACING_EXPORTER setting"""
+    global _exporter
+    if _exporter is None:
+        if settings.TRACING_EXPORTER == "otlp":
+            _exporter = OTLPExporter(settings.TRACING_OTLP_ENDPOINT)
+        else:
+            _exporter = FileExporter(settings.TRACING_FILE)
+    return _exporter
+
+
+@receiver(setting_changed)
+def reset_exporter(setting, **kwargs):
+    global _exporter
+    if setting.startswith("TRACING_"):
+        _exporter = None
@@ -0,0 +1,107 @@
+import hmac
+import os
+import tracemalloc
+from django.conf import settings
+from django.contrib import admin, messages
+from django.http import HttpResponse, HttpResponseRedirect, JsonResponse
+from django.template.response import TemplateResponse
+from django.views.decorators.http import condition
+from prometheus_client import CONTENT_TYPE_LATEST, generate_latest
+from rest_framework import status
+from core import health, memory, metrics, schema
+from core.db import slow_queries
+
+
+def metrics_view(request):
+    """Expose metrics in Prometheus text format"""
+    # Scrapers must send `Authorization: Bearer <METRICS_TOKEN>`, without a
+    # token metrics are only open in development
+    if settings.METRICS_TOKEN:
+        expected = f"Bearer {settings.METRICS_TOKEN}"
+        received = request.headers.get("Authorization", "")
+        if not hmac.compare_digest(received.encode(), expected.encode()):
+            return HttpResponse(status=status.HTTP_401_UNAUTHORIZED)
+    elif not settings.DEBUG:
+        return HttpResponse(status=status.HTTP_404_NOT_FOUND)
+    output = generate_latest(metrics.get_registry())
+    return HttpResponse(output, content_type=CONTENT_TYPE_LATEST)
+
+
+def healthz_view(request):
+    """Liveness probe, only checks the worker handles requests"""
+    return JsonResponse({"status": "ok"})
+
+
+def readyz_view(request):
+    """Readiness probe, checks database and cache are reachable"""
+    ready, errors = health.get_readiness()
+    if not ready:
+        return JsonResponse(
+            {"status": "unavailable", "errors": errors},
+            status=status.HTTP_503_SERVICE_UNAVAILABLE,
+        )
+    return JsonResponse({"status": "ok"})
+
+
+@condition(etag_func=lambda request: schema.get_schema()[1])
+def schema_view(request):
+    """Serve prebuilt OpenAPI schema, revalidated by clients with ETag"""
+    content, version = schema.get_schema()
+    response = HttpResponse(content, content_type=schema.MEDIA_TYPE)
+    response["Cache-Control"] = "no-cache"
+    return response
+
+
+def slow_queries_view(request):
+    """Show slow queries of this worker grouped by fingerprint"""
+    context = {
+        **admin.site.each_context(request),
+        "title": "Slow queries",
+        "threshold_ms": settings.SLOW_QUERY_THRESHOLD_MS,
+        "worst_queries": slow_queries.get_worst_queries(),
+    }
+    return TemplateResponse(request, "admin/slow_queries.html", context)
+
+
+def memory_view(request):
+    """Trace allocations of this worker and show top allocation sites"""
+    if request.method == "POST":
+        action = request.POST.get("action")
+        if action == "start":
+            memory.start()
+        elif action == "stop":
+            memory.stop()
+        elif action == "snapshot":
+            if tracemalloc.is_tracing():
+                path = memory.take_snapshot()
+                messages.success(request, f"Snapshot saved to {path}")
+            else:
+                messages.error(request, "Start tracing before taking snapshots")
+        else:
+            messages.error(request, f"Unknown action {action!r}")
+        return HttpResponseRedirect(request.path)
+
+    pid = os.getpid()
+    snapshots = memory.list_snapshots(pid)
+    top_stats = []
+    if snapshots:
+        # Growth since previous snapshot, or all allocations of the only one
+        old_snapshot = (
+            memory.load_snapshot(snapshots[-2]) if len(snapshots) > 1 else None
+        )
+        snapshot = memory.load_snapshot(snapshots[-1])
+        top_stats = memory.get_top_stats(snapshot, old_snapshot)
+    traced_current, traced_peak = tracemalloc.get_traced_memory()
+    context = {
+        **admin.site.each_context(request),
+        "title": "Memory",
+        "pid": pid,
+        "tracing": tracemalloc.is_tracing(),
+        "traced_current": traced_current,
+        "traced_peak": traced_peak,
+        "peak_rss": memory.get_peak_rss(),
+        "snapshots": snapshots,
+        "is_diff": len(snapshots) > 1,
+        "top_stats": top_stats,
+    }
+    return TemplateResponse(request, "admin/memory.html", context)
@@ -1,55 +1,105 @@
 from rest_framework import serializers
-from core.models import Recipe, Tag, Ingredient
+from core.models import Recipe, RecipeImage, Tag, Ingredient
+from core import tracing
+from core.images import generate_image_placeholder
+from core.metrics import InstrumentedSerializerMixin
 from rest_framework.serializers import Serializer
 
 
-class TagSerializer(serializers.ModelSerializer):
+def add_image_placeholder(validated_data):
+    """Add placeholder and dominant color of `image` being saved, if any"""
+    if "image" not in validated_data:
+        return
+    image = validated_data["image"]
+    placeholder, color = "", ""
+    if image:
+        with tracing.span("image.placeholder"):
+            placeholder, color = generate_image_placeholder(image)
+    validated_data["image_placeholder"] = placeholder
+    validated_data["image_color"] = color
+
+
+class TagSerializer(InstrumentedSerializerMixin, serializers.ModelSerializer):
     class Meta:
         model = Tag
         fields = ["id", "name"]
         read_only_fields = ["id"]
 
 
-class IngredientSerializer(serializers.ModelSerializer):
+class IngredientSerializer(InstrumentedSerializerMixin, serializers.ModelSerializer):
     class Meta:
         model = Ingredient
         fields = ["id", "name"]
         read_only_fields = ["id"]
 
 
-class RecipeSerializer(serializers.ModelSerializer):
+class RecipeGalleryImageSerializer(
+    InstrumentedSerializerMixin, serializers.ModelSerializer
+):
+    """Serializer for images in recipe gallery"""
+
+    class Meta:
+        model = RecipeImage
+        fields = ["id", "image", "created_at"]
+        read_only_fields = ["id", "image", "created_at"]
+
+
+class RecipeSerializer(InstrumentedSerializerMixin, serializers.ModelSerializer):
     tags = TagSerializer(many=True, required=False)
 
     class Meta:
         model = Recipe
-        fields = ["id", "title", "time_minutes", "price", "link", "tags"]
-        read_only_fields = ["id"]
+        fields = [
+            "id",
+            "title",
+            "time_minutes",
+            "price",
+            "link",
+            "tags",
+            "image_placeholder",
+            "image_color",
+        ]
+        read_only_fields = ["id", "image_placeholder", "image_color"]
 
 
 class RecipeDetailSerializer(RecipeSerializer):
     ingredients = IngredientSerializer(many=True, required=False)
+    images = RecipeGalleryImageSerializer(many=True, read_only=True)
 
     class Meta(RecipeSerializer.Meta):
-        fields = RecipeSerializer.Meta.fields + ["description", "ingredients", "image"]
+        fields = RecipeSerializer.Meta.fields + [
+            "description",
+            "ingredients",
+            "image",
+            "images",
+        ]
+
+    def _get_or_create_objs(self, model, items):
+        """Get or create user's objects by name in a fixed number of queries"""
+        user = self.context["request"].user
+        names = list(dict.fromkeys(item["name"] for item in items))
+        existing = model.objects.filter(user=user, name__in=names)
+        objs = {obj.name: obj for obj in existing}
+        missing = [model(user=user, name=name) for name in names if name not in objs]
+        for obj in model.objects.bulk_create(missing):
+            objs[obj.name] = obj
+        return [objs[name] for name in names]
 
     def _assign_tags(self, tags, recipe):
         """Get or create and then assign tags to recipe"""
-        user = self.context["request"].user
-        for tag in tags:
-            tag_obj, created = Tag.objects.get_or_create(user=user, **tag)
-            recipe.tags.add(tag_obj)
+        if tags:
+            recipe.tags.add(*self._get_or_create_objs(Tag, tags))
 
     def _assign_ingredients(self, ingredients, recipe):
         """Get or create and then assign ingredients to recipe"""
-        user = self.context["request"].user
-        for ing in ingredients:
-            ing_obj, created = Ingredient.objects.get_or_create(user=user, **ing)
-            recipe.ingredients.add(ing_obj)
+        if ingredients:
+            recipe.ingredients.add(*self._get_or_create_objs(Ingredient, ingredients))
 
     def create(self, validated_data):
         """Create recipe with tags"""
         tags = validated_data.pop("tags", [])
         ingredients = validated_data.pop("ingredients", [])
+        add_image_placeholder(validated_data)
         recipe = Recipe.objects.create(**validated_data)
         # (Create) and assign tags and ingredients separately
         self._assign_tags(tags, recipe)
@@ -61,6 +111,7 @@ class RecipeDetailSerializer(RecipeSerializer):
         """Update recipe with tags"""
         tags = validated_data.pop("tags", None)
         ingredients = validated_data.pop("ingredients", None)
+        add_image_placeholder(validated_data)
         super().update(instance, validated_data)
         # Check is there even `tags` field in validated_data
         if tags is not None:
@@ -76,13 +127,54 @@ class RecipeDetailSerializer(RecipeSerializer):
         return instance
 
 
-class RecipeImageSerializer(serializers.ModelSerializer):
+class RecipeImageSerializer(InstrumentedSerializerMixin, serializers.ModelSerializer):
     """Serializer for uploading images to recipe"""
 
     class Meta:
         model = Recipe
-        fields = ["id", "image"]
-        read_only_fields = ["id"]
+        fields = ["id", "image", "image_placeholder", "image_color"]
+        read_only_fields = ["id", "image_placeholder", "image_color"]
         # Set explicitly `image` field required cuz in model
         # it is blank=True so that recipe can be created without it
         extra_kwargs = {"image": {"required": True}}
+
+    def update(self, instance, validated_data):
+        """Update image along with its placeholder and dominant color"""
+        add_image_placeholder(validated_data)
+        with tracing.span("image.save"):
+            return super().update(instance, validated_data)
+
+
+class RecipeGalleryUploadSerializer(
+    InstrumentedSerializerMixin, serializers.Serializer
+):
+    """Serializer for uploading several images to recipe gallery at once"""
+
+    MAX_IMAGES = 10
+
+    images = serializers.ListField(
+        child=serializers.ImageField(),
+        allow_empty=False,
+        max_length=MAX_IMAGES,
+        write_only=True,
+    )
+
+    def create(self, validated_data):
+        """Add uploaded images to recipe gallery"""
+        recipe = validated_data["recipe"]
+        images = [
+            RecipeImage(recipe=recipe, image=image)
+            for image in validated_data["images"]
+        ]
+        # Files are written to storage while the rows are prepared,
+        # then all rows go in with a single INSERT
+        with tracing.span("image.save", count=len(images)):
+            return RecipeImage.objects.bulk_create(images)
+
+    def to_representation(self, instance):
+        gallery_serializer = RecipeGalleryImageSerializer(
+            instance=instance,
+            many=True,
+            context=self.context,
+        )
+        return {"images": gallery_serializer.data}
@@ -0,0 +1,136 @@
+from asgiref.sync import async_to_sync
+from django.test import TestCase
+from django.urls import reverse
+from django.contrib.auth import get_user_model
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+from .test_recipe_api import create_recipe
+from .test_tag_api import create_tag
+from .test_ingredient_api import create_ingredient
+
+ASYNC_RECIPE_LIST_URL = reverse("recipe:async-recipe-list")
+ASYNC_TAG_LIST_URL = reverse("recipe:async-tag-list")
+ASYNC_INGREDIENT_LIST_URL = reverse("recipe:async-ingredient-list")
+
+
+def get_async_detail_url(recipe_id):
+    return reverse("recipe:async-recipe-detail", kwargs={"pk": recipe_id})
+
+
+class PublicAsyncRecipeAPITests(TestCase):
+    """Test unauthenticated async API requests"""
+
+    async def test_authorization_required(self):
+        """Test authorization is required to call async API"""
+        for url in [
+            ASYNC_RECIPE_LIST_URL,
+            ASYNC_TAG_LIST_URL,
+            ASYNC_INGREDIENT_LIST_URL,
+            get_async_detail_url(1),
+        ]:
+            res = await self.async_client.get(url)
+
+            self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    async def test_invalid_token(self):
+        """Test unknown token is rejected"""
+        res = await self.async_client.get(
+            ASYNC_RECIPE_LIST_URL,
+            headers={"Authorization": "Token invalid"},
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+
+class PrivateAsyncRecipeAPITests(TestCase):
+    """Test authenticated async API requests"""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            email="test@example.com",
+            password="121212",
+        )
+        token = Token.objects.create(user=self.user)
+        self.auth_headers = {"Authorization": f"Token {token.key}"}
+        # Sync DRF client to compare responses with
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+
+    def test_recipe_list_same_as_sync(self):
+        """Test async recipe list matches sync recipe list"""
+        recipe = create_recipe(user=self.user)
+        recipe.tags.add(create_tag(user=self.user))
+        create_recipe(user=self.user)
+        other_user = get_user_model().objects.create_user(
+            email="other@example.com",
+            password="121212",
+        )
+        create_recipe(user=other_user)
+
+        res = self.async_client_get(ASYNC_RECIPE_LIST_URL)
+        sync_res = self.client.get(reverse("recipe:recipe-list"))
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(res.json()), 2)
+        self.assertEqual(res.json(), sync_res.json())
+
+    def test_recipe_detail_same_as_sync(self):
+        """Test async recipe detail matches sync recipe detail"""
+        recipe = create_recipe(user=self.user)
+        recipe.ingredients.add(create_ingredient(user=self.user))
+
+        res = self.async_client_get(get_async_detail_url(recipe.id))
+        sync_res = self.client.get(
+            reverse("recipe:recipe-detail", kwargs={"pk": recipe.id})
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.json(), sync_res.json())
+
+    def test_other_user_recipe_detail_not_found(self):
+        """Test retrieving other user's recipe gives error"""
+        other_user = get_user_model().objects.create_user(
+            email="other@example.com",
+            password="121212",
+        )
+        recipe = create_recipe(user=other_user)
+
+        res = self.async_client_get(get_async_detail_url(recipe.id))
+
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_tag_and_ingredient_lists_same_as_sync(self):
+        """Test async tag and ingredient lists match sync ones"""
+        create_tag(user=self.user, name="dinner")
+        create_ingredient(user=self.user, name="salt")
+
+        for async_url, url in [
+            (ASYNC_TAG_LIST_URL, reverse("recipe:tag-list")),
+            (ASYNC_INGREDIENT_LIST_URL, reverse("recipe:ingredient-list")),
+        ]:
+            res = self.async_client_get(async_url)
+            sync_res = self.client.get(url)
+
+            self.assertEqual(res.status_code, status.HTTP_200_OK)
+            self.assertEqual(len(res.json()), 1)
+            self.assertEqual(res.json(), sync_res.json())
+
+    def test_post_not_allowed(self):
+        """Test async endpoints are read only"""
+        res = self.async_client_post(ASYNC_TAG_LIST_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_405_METHOD_NOT_ALLOWED)
+
+    # Fixtures are created with sync ORM, so requests are sent from sync tests
+    def async_client_get(self, url):
+        async def get():
+            return await self.async_client.get(url, headers=self.auth_headers)
+
+        return async_to_sync(get)()
+
+    def async_client_post(self, url):
+        async def post():
+            return await self.async_client.post(url, headers=self.auth_headers)
+
+        return async_to_sync(post)()
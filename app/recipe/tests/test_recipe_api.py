@@ -4,10 +4,12 @@ from decimal import Decimal
 from PIL import Image
 from django.urls import reverse
 from django.test import TestCase
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 from django.contrib.auth import get_user_model
 from rest_framework import status
 from rest_framework.test import APIClient
-from core.models import Recipe, Tag, Ingredient
+from core.models import Recipe, RecipeImage, Tag, Ingredient
 from recipe.serializers import RecipeSerializer, RecipeDetailSerializer
 from .test_tag_api import create_tag
 from .test_ingredient_api import create_ingredient
@@ -37,6 +39,20 @@ def get_image_upload_url(recipe_id):
     return reverse("recipe:recipe-upload-image", kwargs={"pk": recipe_id})
 
 
+def get_gallery_upload_url(recipe_id):
+    """Create and return gallery upload url"""
+    return reverse("recipe:recipe-upload-images", kwargs={"pk": recipe_id})
+
+
+def create_image_file():
+    """Create and return temporary JPEG file"""
+    image_file = tempfile.NamedTemporaryFile(suffix=".jpg")
+    img = Image.new("RGB", (10, 10))
+    img.save(image_file, format="JPEG")
+    image_file.seek(0)
+    return image_file
+
+
 class PublicRecipeAPITests(TestCase):
     """Test unauthenticated API requests"""
 
@@ -226,6 +242,28 @@ class PrivateRecipeAPITests(TestCase):
         # Assert no recreation of existing tag
         self.assertEqual(tag_dinner_count, 1)
 
+    def test_create_recipe_with_many_tags_queries(self):
+        """Test number of queries doesn't grow with number of tags"""
+        create_tag(user=self.user, name="dinner")
+
+        def create(tag_names):
+            payload = {
+                "title": "sample title",
+                "time_minutes": Decimal("7.5"),
+                "price": Decimal("199.99"),
+                "tags": [{"name": name} for name in tag_names],
+            }
+            with CaptureQueriesContext(connection) as queries:
+                res = self.client.post(RECIPE_LIST_URL, payload, format="json")
+            self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+            return len(queries)
+
+        few_tags = create(["dinner", "tag1"])
+        many_tags = create(["dinner"] + [f"tag{i}" for i in range(2, 12)])
+
+        self.assertEqual(many_tags, few_tags)
+        self.assertEqual(Tag.objects.filter(user=self.user).count(), 12)
+
     def test_create_new_tags_on_update(self):
         """Test create and assign new tags when updating recipe"""
         recipe = create_recipe(user=self.user)
@@ -423,6 +461,50 @@ class ImageUploadTests(TestCase):
         self.assertIn("image", res.data)
         self.assertTrue(os.path.exists(self.recipe.image.path))
 
+    def test_upload_image_generates_placeholder(self):
+        """Test uploading image stores its placeholder and color"""
+        url = get_image_upload_url(self.recipe.id)
+        with tempfile.NamedTemporaryFile(suffix=".png") as image_file:
+            img = Image.new("RGB", (10, 10), (255, 0, 0))
+            img.save(image_file, format="PNG")
+            image_file.seek(0)
+
+            payload = {"image": image_file}
+            res = self.client.post(url, payload, format="multipart")
+
+        self.recipe.refresh_from_db()
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertTrue(self.recipe.image_placeholder.startswith("data:image/"))
+        self.assertEqual(self.recipe.image_color, "#ff0000")
+        res = self.client.get(RECIPE_LIST_URL)
+        self.assertEqual(
+            res.data[0]["image_placeholder"],
+            self.recipe.image_placeholder,
+        )
+        self.assertEqual(res.data[0]["image_color"], "#ff0000")
+
+    def test_update_image_through_detail_regenerates_placeholder(self):
+        """Test replacing image with PATCH of recipe updates its placeholder"""
+        stale_placeholder = "data:image/jpeg;base64,stale"
+        self.recipe.image_placeholder = stale_placeholder
+        self.recipe.image_color = "#000000"
+        self.recipe.save()
+        with tempfile.NamedTemporaryFile(suffix=".png") as image_file:
+            Image.new("RGB", (10, 10), (0, 0, 255)).save(image_file, format="PNG")
+            image_file.seek(0)
+
+            res = self.client.patch(
+                get_detail_url(self.recipe.id),
+                {"image": image_file},
+                format="multipart",
+            )
+
+        self.recipe.refresh_from_db()
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(self.recipe.image_placeholder, stale_placeholder)
+        self.assertEqual(self.recipe.image_color, "#0000ff")
+        self.assertEqual(res.data["image_color"], "#0000ff")
+
     def test_upload_image_bad_request(self):
         """Test uploading invalid image"""
         url = get_image_upload_url(self.recipe.id)
@@ -430,3 +512,94 @@ class ImageUploadTests(TestCase):
         res = self.client.post(url, payload, format="multipart")
 
         self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class GalleryUploadTests(TestCase):
+    """Test for the recipe gallery upload API"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            email="test@example.com",
+            password="121212",
+        )
+        self.client.force_authenticate(user=self.user)
+        self.recipe = create_recipe(user=self.user)
+
+    def tearDown(self):
+        for recipe_image in RecipeImage.objects.all():
+            recipe_image.image.delete()
+
+    def test_upload_several_images(self):
+        """Test uploading several images in one request"""
+        url = get_gallery_upload_url(self.recipe.id)
+        with create_image_file() as image_1, create_image_file() as image_2:
+            payload = {"images": [image_1, image_2]}
+            res = self.client.post(url, payload, format="multipart")
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(len(res.data["images"]), 2)
+        recipe_images = self.recipe.images.all()
+        self.assertEqual(recipe_images.count(), 2)
+        for recipe_image in recipe_images:
+            self.assertTrue(os.path.exists(recipe_image.image.path))
+
+    def test_upload_images_bad_request(self):
+        """Test uploading invalid file to gallery"""
+        url = get_gallery_upload_url(self.recipe.id)
+        with create_image_file() as image_file:
+            payload = {"images": [image_file, "not image"]}
+            res = self.client.post(url, payload, format="multipart")
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(self.recipe.images.exists())
+
+    def test_upload_no_images_bad_request(self):
+        """Test uploading to gallery without files"""
+        url = get_gallery_upload_url(self.recipe.id)
+        res = self.client.post(url, {}, format="multipart")
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_upload_images_to_other_user_recipe_error(self):
+        """Test uploading to other user's recipe gallery gives error"""
+        other_user = get_user_model().objects.create_user(
+            email="other@example.com",
+            password="121212",
+        )
+        recipe = create_recipe(user=other_user)
+        url = get_gallery_upload_url(recipe.id)
+        with create_image_file() as image_file:
+            res = self.client.post(url, {"images": [image_file]}, format="multipart")
+
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+        self.assertFalse(recipe.images.exists())
+
+    def test_gallery_in_recipe_detail(self):
+        """Test recipe detail contains gallery images"""
+        url = get_gallery_upload_url(self.recipe.id)
+        with create_image_file() as image_file:
+            self.client.post(url, {"images": [image_file]}, format="multipart")
+
+        res = self.client.get(get_detail_url(self.recipe.id))
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(res.data["images"]), 1)
+        self.assertIn("image", res.data["images"][0])
+
+    def test_recipe_detail_queries_dont_grow_with_gallery(self):
+        """Test recipe detail query count doesn't depend on gallery size"""
+        url = get_detail_url(self.recipe.id)
+        upload_url = get_gallery_upload_url(self.recipe.id)
+        with create_image_file() as image_file:
+            self.client.post(upload_url, {"images": [image_file]}, format="multipart")
+        with CaptureQueriesContext(connection) as small_gallery:
+            self.client.get(url)
+
+        with create_image_file() as image_1, create_image_file() as image_2:
+            payload = {"images": [image_1, image_2]}
+            self.client.post(upload_url, payload, format="multipart")
+        with CaptureQueriesContext(connection) as big_gallery:
+            self.client.get(url)
+
+        self.assertEqual(len(big_gallery), len(small_gallery))
@@ -11,4 +11,20 @@ router.register("ingredients", views.IngredientViewSet)
 
 urlpatterns = [
     path("", include(router.urls)),
+    path(
+        "async/recipes/",
+        views.async_recipe_list,
+        name="async-recipe-list",
+    ),
+    path(
+        "async/recipes/<int:pk>/",
+        views.async_recipe_detail,
+        name="async-recipe-detail",
+    ),
+    path("async/tags/", views.async_tag_list, name="async-tag-list"),
+    path(
+        "async/ingredients/",
+        views.async_ingredient_list,
+        name="async-ingredient-list",
+    ),
 ]
@@ -1,30 +1,46 @@
 from django.shortcuts import get_object_or_404
+from django.http import JsonResponse
+from django.core.files.uploadhandler import TemporaryFileUploadHandler
 from rest_framework import viewsets, mixins
 from rest_framework import status
 from rest_framework.response import Response
 from rest_framework.decorators import action
+from rest_framework.parsers import MultiPartParser
 from rest_framework.authentication import TokenAuthentication
 from rest_framework.permissions import IsAuthenticated
 from core.models import Recipe, Tag, Ingredient
+from core.async_api import async_require_GET, async_token_required
+from core.throttling import UploadThrottle
+from core.tracing import TracedViewMixin, traced
 from .serializers import (
     RecipeSerializer,
     RecipeDetailSerializer,
     TagSerializer,
     IngredientSerializer,
     RecipeImageSerializer,
+    RecipeGalleryUploadSerializer,
 )
 
 
 # Recipes
-class RecipeViewSet(viewsets.ModelViewSet):
+class RecipeViewSet(TracedViewMixin, viewsets.ModelViewSet):
     permission_classes = [IsAuthenticated]
     authentication_classes = [TokenAuthentication]
     serializer_class = RecipeDetailSerializer
     queryset = Recipe.objects.all()
+    # Safe requests can read from database replicas
+    replica_reads = True
 
     # Limit recipes to authenticated user
+    @traced("get_queryset")
     def get_queryset(self):
-        return self.queryset.filter(user=self.request.user).order_by("id")
+        queryset = self.queryset.filter(user=self.request.user).order_by("id")
+        # Load nested objects in one query per relation instead of one per recipe
+        if self.action == "list":
+            queryset = queryset.prefetch_related("tags")
+        elif self.action in ("retrieve", "update", "partial_update"):
+            queryset = queryset.prefetch_related("tags", "ingredients", "images")
+        return queryset
 
     # Change serializer for list url
     def get_serializer_class(self):
@@ -32,6 +48,8 @@ class RecipeViewSet(viewsets.ModelViewSet):
             return RecipeSerializer
         elif self.action == "upload_image":
             return RecipeImageSerializer
+        elif self.action == "upload_images":
+            return RecipeGalleryUploadSerializer
         return super().get_serializer_class()
 
     # Set the field `user` = request.user by default when creating recipe instance
@@ -39,7 +57,12 @@ class RecipeViewSet(viewsets.ModelViewSet):
         serializer.save(user=self.request.user)
 
     # Extra action url to upload image to recipe
-    @action(methods=["POST"], detail=True, url_path="upload-image")
+    @action(
+        methods=["POST"],
+        detail=True,
+        url_path="upload-image",
+        throttle_classes=[UploadThrottle],
+    )
     def upload_image(self, request, pk=None):
         """Upload an image to recipe"""
         recipe = self.get_object()
@@ -48,8 +71,31 @@ class RecipeViewSet(viewsets.ModelViewSet):
         serializer.save()
         return Response(serializer.data, status.HTTP_200_OK)
 
+    # Extra action url to upload several images to recipe gallery
+    @action(
+        methods=["POST"],
+        detail=True,
+        url_path="upload-images",
+        parser_classes=[MultiPartParser],
+        throttle_classes=[UploadThrottle],
+    )
+    def upload_images(self, request, pk=None):
+        """Upload images to recipe gallery"""
+        # Must be set before request.data is touched. Every file is streamed
+        # chunk by chunk into a temporary file instead of being kept in memory,
+        # and storage then moves that file into place
+        request._request.upload_handlers = [
+            TemporaryFileUploadHandler(request._request)
+        ]
+        recipe = self.get_object()
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        serializer.save(recipe=recipe)
+        return Response(serializer.data, status.HTTP_201_CREATED)
+
 
 class BaseRecipeAttrViewSet(
+    TracedViewMixin,
     mixins.ListModelMixin,
     mixins.RetrieveModelMixin,
     mixins.UpdateModelMixin,
@@ -60,8 +106,11 @@ class BaseRecipeAttrViewSet(
 
     permission_classes = [IsAuthenticated]
     authentication_classes = [TokenAuthentication]
+    # Safe requests can read from database replicas
+    replica_reads = True
 
     # Limit queryset to authenticated user
+    @traced("get_queryset")
     def get_queryset(self):
         return self.queryset.filter(user=self.request.user).order_by("id")
 
@@ -98,3 +147,51 @@ class IngredientViewSet(BaseRecipeAttrViewSet):
         data = serializer.data
         ingredient.delete()
         return Response(data, status.HTTP_204_NO_CONTENT)
+
+
+# Async read-only variants of the endpoints above. They avoid running
+# the whole view in a worker thread when the app is served over ASGI
+@async_require_GET
+@async_token_required
+async def async_recipe_list(request):
+    """List recipes of authenticated user"""
+    queryset = (
+        Recipe.objects.filter(user=request.user).order_by("id").prefetch_related("tags")
+    )
+    recipes = [recipe async for recipe in queryset]
+    serializer = RecipeSerializer(recipes, many=True, context={"request": request})
+    return JsonResponse(serializer.data, safe=False)
+
+
+@async_require_GET
+@async_token_required
+async def async_recipe_detail(request, pk):
+    """Retrieve recipe of authenticated user"""
+    queryset = Recipe.objects.filter(user=request.user).prefetch_related(
+        "tags", "ingredients", "images"
+    )
+    try:
+        recipe = await queryset.aget(pk=pk)
+    except Recipe.DoesNotExist:
+        return JsonResponse({"detail": "Not found."}, status=status.HTTP_404_NOT_FOUND)
+    serializer = RecipeDetailSerializer(recipe, context={"request": request})
+    return JsonResponse(serializer.data)
+
+
+@async_require_GET
+@async_token_required
+async def async_tag_list(request):
+    """List tags of authenticated user"""
+    queryset = Tag.objects.filter(user=request.user).order_by("id")
+    tags = [tag async for tag in queryset]
+    return JsonResponse(TagSerializer(tags, many=True).data, safe=False)
+
+
+@async_require_GET
+@async_token_required
+async def async_ingredient_list(request):
+    """List ingredients of authenticated user"""
+    queryset = Ingredient.objects.filter(user=request.user).order_by("id")
+    ingredients = [ingredient async for ingredient in queryset]
+    serializer = IngredientSerializer(ingredients, many=True)
+    return JsonResponse(serializer.data, safe=False)
@@ -1,13 +1,17 @@
+from asgiref.sync import async_to_sync
 from django.test import TestCase
 from django.contrib.auth import get_user_model
 from django.urls import reverse
 from rest_framework.test import APIClient
 from rest_framework import status
+from rest_framework.authtoken.models import Token
+from core.db import routers
 
 
 CREATE_USER_URL = reverse("user:register")
 TOKEN_URL = reverse("user:token")
 ME_URL = reverse("user:me")
+ASYNC_ME_URL = reverse("user:async-me")
 
 
 def create_user(**fields):
@@ -74,6 +78,16 @@ class PublicUserAPITests(TestCase):
         self.assertEqual(res.status_code, status.HTTP_200_OK)
         self.assertIn("token", res.data)
 
+    def test_token_client_pinned_to_primary(self):
+        """Test requests with new token read user and token from primary"""
+        create_user(email="test@example.com", password="123456")
+        payload = {"email": "test@example.com", "password": "123456"}
+
+        res = self.client.post(TOKEN_URL, payload)
+
+        client_key = routers.get_token_client_key(res.data["token"])
+        self.assertTrue(routers.is_pinned_to_primary(client_key))
+
     def test_generate_token_wrong_credentials(self):
         user_credentials = {
             "email": "test@example.com",
@@ -153,3 +167,40 @@ class PrivateUserAPITests(TestCase):
         self.user.refresh_from_db()
         self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
         self.assertNotEqual(self.user.email, payload["email"])
+
+
+class AsyncUserAPITests(TestCase):
+    """Test async variant of the me endpoint"""
+
+    def setUp(self):
+        self.user = create_user(
+            email="test@example.com", password="123456", name="Testname"
+        )
+        self.token = Token.objects.create(user=self.user)
+
+    def get_async_me(self, **headers):
+        async def get():
+            return await self.async_client.get(ASYNC_ME_URL, headers=headers)
+
+        return async_to_sync(get)()
+
+    def test_retrieve_profile_success(self):
+        """Test retrieving profile for user authenticated by token"""
+        res = self.get_async_me(Authorization=f"Token {self.token.key}")
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.json(), {"email": self.user.email, "name": self.user.name})
+
+    def test_inactive_user_unauthorized(self):
+        """Test token of inactive user is rejected"""
+        self.user.is_active = False
+        self.user.save()
+        res = self.get_async_me(Authorization=f"Token {self.token.key}")
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_authentication_required(self):
+        """Test async me endpoint requires authentication"""
+        res = self.get_async_me()
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
@@ -6,5 +6,6 @@ app_name = "user"
 urlpatterns = [
     path("register/", views.RegisterUserView.as_view(), name="register"),
     path("token/", views.CreateTokenView.as_view(), name="token"),
-    path("me/", views.ManageUserView.as_view(), name="me")
+    path("me/", views.ManageUserView.as_view(), name="me"),
+    path("async/me/", views.async_manage_user, name="async-me"),
 ]
@@ -1,4 +1,5 @@
 from django.contrib.auth import authenticate
+from django.http import JsonResponse
 from rest_framework import generics, authentication, permissions
 from rest_framework.views import APIView
 from rest_framework import viewsets
@@ -9,14 +10,19 @@ from rest_framework.response import Response
 from rest_framework import status
 from .serializers import UserSerializer, AuthTokenSerializer
 from core.models import User
+from core.async_api import async_require_GET, async_token_required
+from core.db import routers
+from core.throttling import LoginThrottle
+from core.tracing import TracedViewMixin
 
 
 # Register user explicitly via APIView
-class RegisterUserView(APIView):
-    serizalizer_class = UserSerializer
+class RegisterUserView(TracedViewMixin, APIView):
+    serializer_class = UserSerializer
+    throttle_classes = [LoginThrottle]
 
     def post(self, request):
-        user_serializer = self.serizalizer_class(data=request.data)
+        user_serializer = self.serializer_class(data=request.data)
         user_serializer.is_valid(raise_exception=True)
         user_serializer.save()
         return Response(user_serializer.data, status.HTTP_201_CREATED)
@@ -28,14 +34,19 @@ class RegisterUserView(APIView):
 
 
 # Create token explicitly via APIView
-class CreateTokenView(APIView):
+class CreateTokenView(TracedViewMixin, APIView):
     serializer_class = AuthTokenSerializer
+    throttle_classes = [LoginThrottle]
 
     def post(self, request):
         token_serializer = self.serializer_class(data=request.data)
         token_serializer.is_valid(raise_exception=True)
         user = token_serializer.validated_data["user"]
         token, created = Token.objects.get_or_create(user=user)
+        # Login request has no Authorization yet, so ReplicaRoutingMiddleware
+        # can't pin the client. Pin it for the token, so its next requests
+        # don't authenticate against a replica missing the user or token
+        routers.pin_to_primary(routers.get_token_client_key(token.key))
         return Response({"token": token.key}, status.HTTP_200_OK)
 
 
@@ -46,10 +57,12 @@ class CreateTokenView(APIView):
 
 
 # Retrieve and update user profile explicitly via APIView
-class ManageUserView(APIView):
+class ManageUserView(TracedViewMixin, APIView):
     permission_classes = [permissions.IsAuthenticated]
     authentication_classes = [authentication.TokenAuthentication]
     serializer_class = UserSerializer
+    # Safe requests can read from database replicas
+    replica_reads = True
 
     def get(self, request):
         user = request.user
@@ -81,3 +94,11 @@ class ManageUserView(APIView):
 
 #     def get_object(self):
 #         return self.request.user
+
+
+# Async variant of ManageUserView.get for serving over ASGI
+@async_require_GET
+@async_token_required
+async def async_manage_user(request):
+    user_serializer = UserSerializer(instance=request.user)
+    return JsonResponse(user_serializer.data)